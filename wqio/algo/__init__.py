@@ -1,2 +1,5 @@
 from . import ros
 from . import bootstrap
+from . import km
+from . import mle
+from . import theil
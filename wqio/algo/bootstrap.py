@@ -3,8 +3,131 @@ import scipy.stats as stats
 import scipy.stats.distributions as dist
 import scipy.optimize as opt
 
+from . import ros
+from . import km
 
-__all__ = ['Stat', 'Fit']
+
+__all__ = ['Stat', 'ROSStat', 'KMStat', 'Fit', 't_interval',
+           'median_interval']
+
+
+def _stratified_index(strata, NIter):
+    '''
+    Generate a matrix of resampling indices that only draws from within
+        each stratum
+
+    Input:
+        strata (array-like) : labels (e.g., seasons or water years)
+            assigning each data point to a stratum
+        NIter (int) : number of resamples to generate
+
+    Writes:
+        None
+
+    Returns:
+        index (numpy array of ints) : NIter x N array of indices into the
+            data. Every row contains exactly as many members of each
+            stratum as the original dataset.
+    '''
+    # integer codes of each stratum and the positions of the
+    # data sorted (stably) so that each stratum is contiguous
+    codes = np.unique(np.asarray(strata), return_inverse=True)[1]
+    order = np.argsort(codes, kind='mergesort')
+
+    # size and starting offset of each stratum in `order`
+    sizes = np.bincount(codes)
+    offsets = np.cumsum(sizes) - sizes
+
+    # stratum of each column of the output
+    colcodes = codes[order]
+
+    # draw a position within the column's stratum for every
+    # resample at once, then map back into the original data
+    within = np.random.random_sample(size=(NIter, order.shape[0]))
+    within = np.floor(within * sizes[colcodes]).astype(int)
+    return order[offsets[colcodes] + within]
+
+
+def _percentile_by_column(sorted_stats, percentiles):
+    '''
+    Linearly interpolated percentiles (like `stats.scoreatpercentile`) of
+        each column of a sorted array, with a separate percentile for
+        every column
+
+    Input:
+        sorted_stats (numpy array) : N x K array, sorted along axis 0
+        percentiles (array of K floats) : percentile (0-100) to evaluate
+            in each column
+
+    Writes:
+        None
+
+    Returns:
+        scores (numpy array of K floats)
+    '''
+    N, K = sorted_stats.shape
+    position = np.asarray(percentiles) / 100.0 * (N - 1)
+    lower = np.clip(np.floor(position).astype(int), 0, N - 1)
+    upper = np.clip(lower + 1, 0, N - 1)
+    fraction = position - lower
+
+    columns = np.arange(K)
+    low = sorted_stats[lower, columns]
+    high = sorted_stats[upper, columns]
+    return low + (high - low) * fraction
+
+
+def t_interval(data, alpha=0.05):
+    '''
+    Normal-theory (Student's t) confidence interval around the mean.
+        Useful in place of a bootstrapped interval for large datasets.
+
+    Input:
+        data (array-like) : the data that we're describing
+        alpha (float, default = 0.05) : the uncertainty level e.g., for
+            95% confidence intervals, `alpha` = 0.05
+
+    Writes:
+        None
+
+    Returns:
+        result (float) : mean of the data
+        CI (numpy array of floats) : confidence intervals of the mean
+    '''
+    data = np.asarray(data, dtype=np.float64)
+    N = data.shape[0]
+    result = data.mean()
+    halfwidth = dist.t.ppf(1 - alpha/2.0, N - 1) * data.std(ddof=1) / np.sqrt(N)
+    CI = np.array([result - halfwidth, result + halfwidth])
+    return result, CI
+
+
+def median_interval(data, alpha=0.05):
+    '''
+    Distribution-free confidence interval around the median from the
+        order statistics of the data and the binomial distribution.
+        Useful in place of a bootstrapped interval for large datasets.
+
+    Input:
+        data (array-like) : the data that we're describing
+        alpha (float, default = 0.05) : the uncertainty level e.g., for
+            95% confidence intervals, `alpha` = 0.05
+
+    Writes:
+        None
+
+    Returns:
+        result (float) : median of the data
+        CI (numpy array of floats) : confidence intervals of the median
+    '''
+    data = np.sort(np.asarray(data, dtype=np.float64))
+    N = data.shape[0]
+
+    # rank of the lower limit such that P(B < rank) <= alpha/2 for
+    # B ~ Binomial(N, 0.5). The upper limit is symmetric.
+    rank = int(max(dist.binom.ppf(alpha/2.0, N, 0.5), 1))
+    CI = np.array([data[rank - 1], data[N - rank]])
+    return np.median(data), CI
 
 
 class _bootstrapMixin(object):
@@ -18,12 +141,28 @@ class _bootstrapMixin(object):
         The data that we're describing
     statfxn : optional function or lambda (default is numpy.median)
         Function that takes `inputdata` as the sole argument and return
-        a single float value.
+        a single float value. `Stat` also accepts a list of functions,
+        in which case all of the statistics are estimated from the same
+        resamples and the results and confidence intervals are arrays
+        with one element (row) per function.
     alpha : optional float (default = 0.05)
         The uncertainty level e.g., for 95% confidence intervals,
         `alpha` = 0.05
     NIter : optional int (default = 5000)
         The number of interation to use in the bootstrapping routine
+    strata : optional array-like or None (default)
+        Labels (e.g., seasons, water years, storm categories) of the same
+        length as `inputdata`. When provided, each resample is drawn
+        within the strata so that the size of each stratum is preserved.
+    chunksize : optional int or None (default)
+        Maximum number of resamples passed to `statfxn` at once. Limits
+        the memory used by the resampled data for large datasets.
+    keep_index : optional bool (default = False)
+        Toggles holding on to the NIter x N matrix of resampling indices
+        once the bootstrapped statistics have been computed. Otherwise
+        only the vector of bootstrapped statistics is retained and
+        `_boot_index` and `_boot_array` raise a ValueError, since the
+        resamples behind the statistics are gone.
 
     Attributes
     ----------
@@ -39,6 +178,12 @@ class _bootstrapMixin(object):
     prelim_result : float
         Estimate of the statistic based on the original dataset
 
+    Notes
+    -----
+    Nothing is resampled when the object is created. The resamples are
+    drawn and evaluated the first time that the bootstrapped statistics
+    are needed (e.g., calling `BCA` or `percentile`).
+
     Methods (see individual docstrings):
     -----------------------------------
     _setup
@@ -71,6 +216,43 @@ class _bootstrapMixin(object):
         acc = SSD / (6 * SCD**1.5)
         return acc
 
+    def _check_strata(self):
+        '''
+        Raise a ValueError if `self.strata` doesn't line up with the data
+        '''
+        strata = getattr(self, 'strata', None)
+        if strata is not None:
+            if np.asarray(strata).shape[0] != np.asarray(self.data).shape[0]:
+                raise ValueError("`strata` must be the same length as the data")
+
+    def _make_bootstrap_index(self):
+        '''
+        Generate a matrix of indices defining the bootstrap sample sets
+
+        Input:
+            None
+
+        Writes:
+            None
+
+        Returns:
+            index (numpy array of ints) : NIter x N array of indices into
+                the dataset. Resamples are stratified if `self.strata` is
+                not None.
+        '''
+        # number of data points
+        N = self.data.shape[0]
+
+        strata = getattr(self, 'strata', None)
+        if strata is None:
+            # random samples (with replacement) for every
+            # iteration in a single call
+            index = np.random.randint(low=0, high=N, size=(self.NIter, N))
+        else:
+            index = _stratified_index(strata, self.NIter)
+
+        return index
+
     def _make_bootstrap_array(self):
         '''
         Generate an array of bootstrap sample sets
@@ -91,26 +273,47 @@ class _bootstrapMixin(object):
         if hasattr(self, 'outputdata'):
             data = np.vstack([self.data, self.outputdata]).T
         else:
-            data = self.data
-
-        # number of data points
-        N = data.shape[0]
-
-        # shape of the output array
-        shape = [self.NIter]
-        shape.extend(data.shape)
-
-        # create the output array
-        bootArray = np.empty(shape, dtype=np.float64)
-
-        # stuff a random samples (with replacement)
-        # into the each row of the output array
-        for n in range(self.NIter):
-            index = np.random.random_integers(low=0, high=N-1, size=N)
-            bootArray[n] = data[index]
+            data = np.asarray(self.data)
+
+        return data[self._boot_index]
+
+    @property
+    def _boot_index(self):
+        # the index that produced (or will produce) `_boot_stats`. It's
+        # only dropped once the statistics exist and `keep_index` is
+        # False, at which point it can't be recovered.
+        if getattr(self, '_index', None) is None:
+            if getattr(self, '_stats', None) is not None:
+                raise ValueError("the resampling index was discarded after "
+                                 "bootstrapping; use `keep_index=True`")
+            self._index = self._make_bootstrap_index()
+        return self._index
+
+    @property
+    def _boot_array(self):
+        return self._make_bootstrap_array()
+
+    @property
+    def _boot_stats(self):
+        if getattr(self, '_stats', None) is None:
+            try:
+                self._setup()
+            finally:
+                if not getattr(self, 'keep_index', False):
+                    self._index = None
+        return self._stats
+
+    def _chunks(self, index):
+        '''
+        Iterate through the rows of the bootstrap index in blocks of at
+            most `self.chunksize` resamples
+        '''
+        chunksize = getattr(self, 'chunksize', None)
+        if chunksize is None:
+            chunksize = self.NIter
 
-        # we're done
-        return bootArray
+        for start in range(0, index.shape[0], chunksize):
+            yield index[start:start + chunksize]
 
     def _eval_BCA(self, prelim_result, boot_stats):
         '''
@@ -118,55 +321,70 @@ class _bootstrapMixin(object):
             statistic
 
         Input:
-            prelim_result (float) : estimate of the statistic computed from the
-                full dataset
+            prelim_result (float or array of K floats) : estimate of the
+                statistic(s) computed from the full dataset
             boot_stats (numpy array of floats) : estimates of the statistic
-                computed from iteratively resampling the dataset
+                computed from iteratively resampling the dataset. Either a
+                vector of NIter values or an NIter x K matrix with one
+                column per statistic (or fit parameter).
 
         Writes:
             None
 
         Returns:
-            result (float) : refined(?) estimate of the statistic
-            CI (numpy array of floats) : confidence intervals of statistic
+            result (float or array of K floats) : refined(?) estimate of
+                the statistic(s)
+            CI (numpy array of floats) : confidence intervals of
+                statistic. Shape is (2,) for a single statistic or (K, 2)
+                for a matrix of `boot_stats`
 
         TODO: fallback to percentile method should raise a warning
         '''
+        boot_stats = np.asarray(boot_stats, dtype=np.float64)
+        vector = boot_stats.ndim == 1
+        if vector:
+            boot_stats = boot_stats[:, None]
+        prelim_result = np.atleast_1d(prelim_result)
 
         # number of results below the premlinary estimate
-        NumBelow = np.sum(boot_stats < prelim_result)
-        if NumBelow == 0:
-            NumBelow = 0.00001
+        NumBelow = np.sum(boot_stats < prelim_result, axis=0).astype(float)
+        NumBelow[NumBelow == 0] = 0.00001
 
-        # compute the acceleration
+        # compute the acceleration (same for every statistic)
         a_hat = self._acceleration()
 
         # z-stats on the % of `NumBelow` and the confidence limits
-        if NumBelow != self.NIter:
-            z0 = dist.norm.ppf(float(NumBelow)/self.NIter)
-            z1 = dist.norm.ppf(self.alpha/2.0)
-            z2 = dist.norm.ppf(1-self.alpha/2.0)
-
-            # refine the confidence limits (alphas)
-            z1Total = (z0 + (z0 + z1)) / (1 - a_hat*(z0+z1))
-            z2Total = (z0 + (z0 + z2)) / (1 - a_hat*(z0+z2))
-            alpha1 = dist.norm.cdf(z1Total)*100.0
-            alpha2 = dist.norm.cdf(z2Total)*100.0
-
-            # take the mean of the `boot_stats`
-            result = boot_stats.mean()
-
-            # confidence intervals from the new alphas
-            CI = np.array([stats.scoreatpercentile(boot_stats, alpha1),
-                          stats.scoreatpercentile(boot_stats, alpha2)])
-
-            # fall back to the standard percentile method if the results
-            # don't make any sense
-            if result < CI[0] or CI[1] < result:
-                result, CI = self._eval_percentile(boot_stats)
-        else:
-            result, CI = self._eval_percentile(boot_stats)
+        valid = NumBelow != self.NIter
+        z0 = dist.norm.ppf(np.where(valid, NumBelow / self.NIter, 0.5))
+        z1 = dist.norm.ppf(self.alpha/2.0)
+        z2 = dist.norm.ppf(1-self.alpha/2.0)
+
+        # refine the confidence limits (alphas)
+        z1Total = (z0 + (z0 + z1)) / (1 - a_hat*(z0+z1))
+        z2Total = (z0 + (z0 + z2)) / (1 - a_hat*(z0+z2))
+        alpha1 = dist.norm.cdf(z1Total)*100.0
+        alpha2 = dist.norm.cdf(z2Total)*100.0
+
+        # take the mean of the `boot_stats`
+        result = boot_stats.mean(axis=0)
+
+        # confidence intervals from the new alphas
+        sorted_stats = np.sort(boot_stats, axis=0)
+        CI = np.column_stack([
+            _percentile_by_column(sorted_stats, alpha1),
+            _percentile_by_column(sorted_stats, alpha2),
+        ])
 
+        # fall back to the standard percentile method if the results
+        # don't make any sense
+        fallback = ~valid | (result < CI[:, 0]) | (CI[:, 1] < result)
+        if np.any(fallback):
+            pct_result, pct_CI = self._eval_percentile(boot_stats[:, fallback])
+            result[fallback] = pct_result
+            CI[fallback] = pct_CI
+
+        if vector:
+            return result[0], CI[0]
         return result, CI
 
     def _eval_percentile(self, boot_stats):
@@ -176,44 +394,251 @@ class _bootstrapMixin(object):
 
         Input:
             boot_stats (numpy array of floats) : estimates of the statistic
-                computed from iteratively resampling the dataset
+                computed from iteratively resampling the dataset. Either a
+                vector of NIter values or an NIter x K matrix with one
+                column per statistic (or fit parameter).
 
         Writes:
             None
 
         Returns:
-            result (float) : refined(?) estimate of the statistic
-            CI (numpy array of floats) : confidence intervals of statistic
+            result (float or array of K floats) : refined(?) estimate of
+                the statistic(s)
+            CI (numpy array of floats) : confidence intervals of
+                statistic. Shape is (2,) for a single statistic or (K, 2)
+                for a matrix of `boot_stats`
         '''
-        # compute the `alpha/2` and `1-alpha/2` percentiles of `boot_stats`
-        CI = np.array([
-            np.percentile(boot_stats, self.alpha*50, axis=0),
-            np.percentile(boot_stats, 100-self.alpha*50, axis=0),
-        ])
-
-        # median of `boot_stats`
-        result = np.percentile(boot_stats, 50, axis=0)
+        # compute the `alpha/2` and `1-alpha/2` percentiles and the
+        # median of `boot_stats` in a single pass
+        pctls = np.percentile(boot_stats, [self.alpha*50, 100-self.alpha*50, 50],
+                              axis=0)
+        CI = pctls[:2].T
+        result = pctls[2]
 
         return result, CI
 
 
 class Stat(_bootstrapMixin):
 
-    def __init__(self, inputdata, statfxn=np.median, alpha=0.05, NIter=5000):
+    def __init__(self, inputdata, statfxn=np.median, alpha=0.05, NIter=5000,
+                 strata=None, chunksize=None, keep_index=False):
         self.data = inputdata
         self.statfxn = statfxn
         self.alpha = alpha
         self.NIter = NIter
-        self._boot_array = self._make_bootstrap_array()
-        self._setup()
+        self.strata = strata
+        self.chunksize = chunksize
+        self.keep_index = keep_index
+        self._index = None
+        self._stats = None
+        self._check_strata()
+        self.prelim_result = self._evaluate(self.data)
+
+    def _evaluate(self, data, **kwargs):
+        '''
+        Apply `self.statfxn` (or each of a sequence of them) to `data`.
+            Multiple statistics are returned along the last axis.
+        '''
+        if isinstance(self.statfxn, (list, tuple)):
+            return np.array([fxn(data, **kwargs) for fxn in self.statfxn]).T
+        return self.statfxn(data, **kwargs)
+
+    def _setup(self):
+        '''
+        Utility method to setup the _bootstrapMixin object's attribute of
+            the boot strapped statistics
+        '''
+        data = np.asarray(self.data)
+        self._stats = np.concatenate([
+            self._evaluate(data[index], axis=1)
+            for index in self._chunks(self._boot_index)
+        ])
+
+    def BCA(self):
+        '''
+        BCA method of aquiring confidence intervals
+        '''
+        return self._eval_BCA(self.prelim_result, self._boot_stats)
+
+    def percentile(self):
+        '''
+        percentile method of aquiring confidence intervals
+        '''
+        return self._eval_percentile(self._boot_stats)
+
+
+class ROSStat(Stat):
+    '''
+    Bootstrap a statistic of censored data. Resamples are drawn from the
+        raw (result, censored) pairs and the non-detects of every resample
+        are re-estimated with ROS, so the confidence intervals include the
+        uncertainty of the censored values. All resamples are ROS'd in
+        vectorized batches (see `chunksize`).
+
+    Parameters (in addition to those of `Stat`)
+    ----------
+    inputdata : array-like
+        Raw results. The values of non-detects should be the detection
+        limits.
+    censored : array-like of bools
+        True where the corresponding value in `inputdata` is a non-detect.
+    transform : optional function or None (default)
+        Function (e.g., numpy.log) applied to the ROS'd data before
+        `statfxn`.
+    dist : optional string (default = 'norm')
+        Distribution used by the ROS estimates (see `ros.MR`)
+    fitlogs : optional bool (default = True)
+        Toggles fitting the logs of the detected data (see `ros.MR`)
+
+    Attributes
+    ----------
+    rawdata : numpy array
+        Same as `inputdata`.
+    censored : numpy array of bools
+        Same as input
+    data : numpy array
+        (Transformed) ROS'd values of the full dataset
+
+    '''
+    def __init__(self, inputdata, censored, statfxn=np.median, alpha=0.05,
+                 NIter=5000, strata=None, chunksize=None, keep_index=False,
+                 transform=None, dist='norm', fitlogs=True):
+        self.rawdata = np.asarray(inputdata, dtype=np.float64)
+        self.censored = np.asarray(censored, dtype=bool)
+        if self.censored.shape != self.rawdata.shape:
+            raise ValueError("`censored` must be the same shape as `inputdata`")
+
+        self.transform = transform
+        self.dist = dist
+        self.fitlogs = fitlogs
+
+        # ROS the full dataset
+        rosdata, fit = ros.ros_estimate(self.rawdata, self.censored,
+                                        dist=dist, fitlogs=fitlogs)
+        if transform is not None:
+            rosdata = transform(rosdata)
+
+        super(ROSStat, self).__init__(rosdata, statfxn=statfxn, alpha=alpha,
+                                      NIter=NIter, strata=strata,
+                                      chunksize=chunksize,
+                                      keep_index=keep_index)
+
+    def _ros(self, index):
+        '''
+        ROS'd (and transformed) values of each row of resampling indices
+            in `index`, estimated in a single call with each row as its
+            own group.
+        '''
+        nrows, N = index.shape
+        rosdata = ros._ros_kernel(
+            self.rawdata[index].ravel(),
+            self.censored[index].ravel(),
+            groups=np.repeat(np.arange(nrows), N),
+            dist=self.dist,
+            fitlogs=self.fitlogs
+        )['final'].reshape(nrows, N)
+
+        if self.transform is not None:
+            rosdata = self.transform(rosdata)
+
+        return rosdata
+
+    def _make_bootstrap_array(self):
+        return self._ros(self._boot_index)
+
+    def _setup(self):
+        '''
+        Utility method to setup the _bootstrapMixin object's attribute of
+            the boot strapped statistics
+        '''
+        self._stats = np.concatenate([
+            self._evaluate(self._ros(index), axis=1)
+            for index in self._chunks(self._boot_index)
+        ])
+
+
+class KMStat(_bootstrapMixin):
+    '''
+    Bootstrap a statistic of the Kaplan-Meier estimate of censored data.
+        Resamples are drawn from the raw (result, censored) pairs and the
+        Kaplan-Meier estimate of every resample is computed in vectorized
+        batches (see `chunksize`), so the confidence intervals belong to
+        the same estimator as the point estimate.
+
+    Parameters
+    ----------
+    inputdata : array-like
+        Raw results. The values of non-detects should be the detection
+        limits.
+    censored : array-like of bools
+        True where the corresponding value in `inputdata` is a non-detect.
+    statistic : optional string or float (default = 'median')
+        'mean', 'std', 'median', or a quantile (between 0 and 1) of the
+        estimated distribution.
+    alpha, NIter, strata, chunksize, keep_index : optional
+        Same as `Stat`
+
+    Attributes
+    ----------
+    data : numpy array
+        Same as `inputdata`.
+    censored : numpy array of bools
+        Same as input
+    prelim_result : float
+        The statistic of the Kaplan-Meier estimate of the full dataset
+
+    '''
+    def __init__(self, inputdata, censored, statistic='median', alpha=0.05,
+                 NIter=5000, strata=None, chunksize=None, keep_index=False):
+        self.data = np.asarray(inputdata, dtype=np.float64)
+        self.censored = np.asarray(censored, dtype=bool)
+        if self.censored.shape != self.data.shape:
+            raise ValueError("`censored` must be the same shape as `inputdata`")
+
+        if statistic == 'median':
+            statistic = 0.5
+        elif statistic not in ('mean', 'std'):
+            try:
+                statistic = float(statistic)
+            except (TypeError, ValueError):
+                statistic = np.nan
+            if not 0 <= statistic <= 1:
+                raise ValueError("`statistic` must be 'mean', 'std', "
+                                 "'median', or a quantile")
+
+        self.statistic = statistic
+        self.alpha = alpha
+        self.NIter = NIter
+        self.strata = strata
+        self.chunksize = chunksize
+        self.keep_index = keep_index
+        self._index = None
+        self._stats = None
+        self._check_strata()
+        self.prelim_result = self._km(np.arange(self.data.shape[0])[None, :])[0]
+
+    def _km(self, index):
+        '''
+        The statistic of the Kaplan-Meier estimate of each row of
+            resampling indices in `index`, estimated in a single call with
+            each row as its own group.
+        '''
+        nrows, N = index.shape
+        kmfit = km._km_kernel(self.data[index].ravel(),
+                              self.censored[index].ravel(),
+                              groups=np.repeat(np.arange(nrows), N))
+        if self.statistic in ('mean', 'std'):
+            return kmfit[self.statistic]
+        return km._km_quantiles(kmfit, self.statistic)[:, 0]
 
     def _setup(self):
         '''
-        Utility method to setup the _bootstrapMixin object's attributes of the
-            preliminary results and the boot strapped
+        Utility method to setup the _bootstrapMixin object's attribute of
+            the boot strapped statistics
         '''
-        self.prelim_result = self.statfxn(self.data)
-        self._boot_stats = self.statfxn(self._boot_array, axis=1)
+        self._stats = np.concatenate([
+            self._km(index) for index in self._chunks(self._boot_index)
+        ])
 
     def BCA(self):
         '''
@@ -230,65 +655,53 @@ class Stat(_bootstrapMixin):
 
 class Fit(_bootstrapMixin):
     def __init__(self, inputdata, outputdata, curvefitfxn,
-                 statfxn=opt.curve_fit, alpha=0.05, NIter=5000):
+                 statfxn=opt.curve_fit, alpha=0.05, NIter=5000,
+                 strata=None, chunksize=None, keep_index=False):
         self.data = np.array(inputdata, dtype=np.float64)
         self.outputdata = np.array(outputdata, dtype=np.float64)
         self.curvefitfxn = curvefitfxn
         self.statfxn = statfxn
         self.alpha = alpha
         self.NIter = NIter
-        self._boot_array = self._make_bootstrap_array()
-        self._setup()
+        self.strata = strata
+        self.chunksize = chunksize
+        self.keep_index = keep_index
+        self._index = None
+        self._stats = None
+        self._check_strata()
 
-    def _setup(self):
-        '''
-        Utility method to setup the _boot_strap object's attributes of the
-            preliminary results and the boot strapped
-        '''
         # prelim results
         self.prelim_result, pcov = self.statfxn(self.curvefitfxn,
                                                 self.data,
                                                 self.outputdata)
 
+    def _setup(self):
+        '''
+        Utility method to setup the _boot_strap object's attribute of the
+            boot strapped statistics
+        '''
         # setup bootstrap stats array
-        self._boot_stats = np.empty([self.NIter, self.prelim_result.shape[0]])
+        boot_stats = np.empty([self.NIter, self.prelim_result.shape[0]])
 
         # fill in the results
-        for r, boot in enumerate(self._boot_array):
+        for r, index in enumerate(self._boot_index):
             fitparams, covariance = self.statfxn(self.curvefitfxn,
-                                                 boot[:, 0], boot[:, 1])
-            self._boot_stats[r] = fitparams
+                                                 self.data[index],
+                                                 self.outputdata[index])
+            boot_stats[r] = fitparams
+
+        self._stats = boot_stats
 
     def BCA(self):
         '''
-        BCA method of aquiring confidence intervals
+        BCA method of aquiring confidence intervals for every fit
+            parameter at once
         '''
-        # empty arrays of results and CIs for each
-        # fit parameter
-        results = np.empty(self.prelim_result.shape[0])
-        CI = np.empty([self.prelim_result.shape[0], 2])
-
-        # use BCA to estimate each parameter
-        for n, param in enumerate(self.prelim_result):
-            res, ci = self._eval_BCA(param, self._boot_stats[:, n])
-            results[n] = res
-            CI[n] = ci
-
-        return results, CI
+        return self._eval_BCA(self.prelim_result, self._boot_stats)
 
     def percentile(self):
         '''
-        percentile method of aquiring confidence intervals
+        percentile method of aquiring confidence intervals for every fit
+            parameter at once
         '''
-        # empty arrays of results and CIs for each
-        # fit parameter
-        results = np.empty([self._boot_stats.shape[1]])
-        CI = np.empty([self._boot_stats.shape[1], 2])
-
-        # use percentiles to estimate each parameter
-        for n, bstat in enumerate(self._boot_stats.T):
-            res, ci = self._eval_percentile(bstat)
-            results[n] = res
-            CI[n] = ci
-
-        return results, CI
+        return self._eval_percentile(self._boot_stats)
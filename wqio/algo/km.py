@@ -0,0 +1,287 @@
+from __future__ import division
+
+import numpy as np
+import pandas
+
+from .ros import _segment_suffix_prod, _group_codes, censored_mask
+
+
+__all__ = ['KaplanMeier', 'km_groups']
+
+
+# tolerance when comparing quantiles to the steps of the CDF
+_EPS = 1e-10
+
+
+def _km_kernel(values, censored, groups=None):
+    '''
+    Array-level Kaplan-Meier estimate of the distribution of left-
+    censored data applied independently to any number of groups in a
+    single sorted pass.
+
+    Parameters
+    ----------
+    values : array-like of floats
+        Results (detection limits for non-detects).
+    censored : array-like of bools
+        True where the result is a non-detect.
+    groups : array-like or None (default)
+        Labels assigning each result to a group. All results belong to
+        a single group if None.
+
+    Returns
+    -------
+    km : dict of numpy arrays
+        Steps of the CDF (sorted by group, then value): group, value, d
+        (number of detects), n (number of results at or below the
+        value), cdf (probability of a result at or below the value),
+        mass (probability of a result equal to the value). Groups:
+        N_tot, N_nd, mean, std.
+
+    Notes
+    -----
+    The lowest result of each group is always treated as a detect so
+    that all of the probability is assigned to the steps (Helsel, 2012).
+    Otherwise the mean and lower quantiles would be undefined whenever
+    the lowest result is a non-detect.
+
+    '''
+    x = np.asarray(values, dtype=np.float64)
+    c = np.asarray(censored, dtype=bool)
+    if c.shape != x.shape:
+        raise ValueError('`censored` must be the same shape as `values`')
+
+    if groups is None:
+        codes = np.zeros(x.shape[0], dtype=np.int64)
+    else:
+        codes = np.unique(np.asarray(groups), return_inverse=True)[1]
+        codes = codes.astype(np.int64).ravel()
+    G = codes.max() + 1 if codes.shape[0] > 0 else 0
+
+    N_tot = np.bincount(codes, minlength=G)
+    N_nd = np.bincount(codes, weights=c, minlength=G).astype(np.int64)
+
+    # sort by group, then value
+    order = np.lexsort((x, codes))
+    g = codes[order]
+    x = x[order]
+    c = c[order]
+
+    # the lowest result(s) of each group count as detects
+    starts = np.cumsum(N_tot) - N_tot
+    gmin = np.minimum.reduceat(x, starts) if G > 0 else np.zeros(0)
+    c = c & (x > gmin[g])
+
+    # integer keys that compare exactly like values within a group
+    xvals, xcode = np.unique(x, return_inverse=True)
+    M = xvals.shape[0] + 1
+    key = g * M + xcode.ravel()
+
+    # distinct detected values of each group and their counts
+    stepkey, stepcode = np.unique(key[~c], return_inverse=True)
+    d = np.bincount(stepcode.ravel(), minlength=stepkey.shape[0])
+    step_g = stepkey // M
+    step_x = xvals[stepkey % M]
+
+    # results at or below each step, detected or not
+    n = np.searchsorted(key, stepkey, side='right') - \
+        np.searchsorted(key, step_g * M, side='left')
+
+    # P(X <= value) is the product of (1 - d/n) over the larger steps
+    factor = 1.0 - d / n.astype(np.float64)
+    survival = _segment_suffix_prod(factor, step_g)
+    samegroup = np.append(step_g[1:] == step_g[:-1], False)
+    cdf = np.where(samegroup, np.append(survival[1:], 1.0), 1.0)
+    mass = cdf * d / n
+
+    # moments of the estimated distribution
+    mean = np.bincount(step_g, weights=mass * step_x, minlength=G)
+    sqdev = mass * (step_x - mean[step_g]) ** 2
+    std = np.sqrt(np.bincount(step_g, weights=sqdev, minlength=G))
+
+    return dict(
+        group=step_g, value=step_x, d=d, n=n, cdf=cdf, mass=mass,
+        N_tot=N_tot, N_nd=N_nd, mean=mean, std=std,
+    )
+
+
+def _km_quantiles(kmfit, quantiles):
+    '''
+    Looks up quantiles of every group of a `_km_kernel` estimate.
+    Returns a (groups x quantiles) array. Where the CDF equals the
+    quantile over an interval, the midpoint of the interval is used.
+    '''
+    q = np.atleast_1d(np.asarray(quantiles, dtype=np.float64))
+    if np.any((q < 0) | (q > 1)):
+        raise ValueError('quantiles must be between 0 and 1')
+
+    G = kmfit['N_tot'].shape[0]
+    step_g = kmfit['group']
+    value = kmfit['value']
+    cdf = kmfit['cdf']
+    S = value.shape[0]
+
+    # the CDFs of all groups as one increasing sequence
+    keys = 2 * step_g + cdf
+    target = (2 * np.arange(G)[:, None] + q[None, :]).ravel()
+    idx = np.minimum(np.searchsorted(keys, target - _EPS, side='left'), S - 1)
+
+    # first step where the CDF reaches the quantile
+    result = value[idx]
+
+    # flat spots of the CDF
+    nxt = np.minimum(idx + 1, S - 1)
+    flat = (np.abs(cdf[idx] - target % 2) < _EPS) & \
+           (step_g[nxt] == step_g[idx]) & (nxt > idx)
+    result = np.where(flat, 0.5 * (value[idx] + value[nxt]), result)
+
+    return result.reshape(G, q.shape[0])
+
+
+class KaplanMeier(object):
+    '''Kaplan-Meier estimate of left-censored data
+    Estimates the distribution of a dataset with non-detects by flipping
+    the Kaplan-Meier product-limit estimator for left censoring. Unlike
+    the MR method, there is no regression and the non-detects are not
+    imputed. The medians and percentiles come straight from the
+    estimated CDF.
+
+    Parameters
+    ----------
+    values : array-like of floats
+        The results of the dataset. Non-detect values should be set to
+        the detection limit.
+
+    censored : array-like of bools
+        True where the corresponding result is a non-detect.
+
+    Attributes
+    ----------
+    N_tot, N_nd : int
+        Total number of results and non-detects in the dataset.
+
+    value, cdf : numpy arrays
+        Distinct detected values and the estimated probability of a
+        result being at or below them.
+
+    mean, std, median : float
+        Moments and median of the estimated distribution.
+
+    Notes
+    -----
+    The lowest result is always treated as a detect so that all of the
+    probability is assigned to the detected values (Helsel, 2012). This
+    biases the mean high when the lowest result is a non-detect.
+
+    See also
+    --------
+    km_groups
+
+    '''
+
+    def __init__(self, values, censored):
+        kmfit = _km_kernel(values, censored)
+        if kmfit['N_tot'].shape[0] == 0:
+            raise ValueError("KaplanMeier requires at least one result")
+
+        self._kmfit = kmfit
+        self.N_tot = int(kmfit['N_tot'][0])
+        self.N_nd = int(kmfit['N_nd'][0])
+        self.value = kmfit['value']
+        self.cdf = kmfit['cdf']
+        self.mean = kmfit['mean'][0]
+        self.std = kmfit['std'][0]
+        self.median = self.quantile(0.5)
+
+    def quantile(self, q):
+        '''
+        Quantile(s) of the estimated distribution
+
+        Parameters
+        ----------
+        q : float or array-like of floats
+            Quantile(s) to compute (between 0 and 1).
+
+        Returns
+        -------
+        quantile : float or numpy array
+
+        '''
+        result = _km_quantiles(self._kmfit, q)[0]
+        if np.isscalar(q):
+            return result[0]
+        else:
+            return result
+
+    def percentile(self, p):
+        '''
+        Percentile(s) of the estimated distribution (between 0 and 100)
+        '''
+        if np.isscalar(p):
+            return self.quantile(p / 100.)
+        else:
+            return self.quantile(np.asarray(p) / 100.)
+
+
+def km_groups(dataframe, groupcols, rescol='res', qualcol='qual',
+              ndsymbol='ND', quantiles=(0.10, 0.25, 0.50, 0.75, 0.90)):
+    '''
+    Kaplan-Meier summary statistics of every group of a dataframe,
+    estimated all at once.
+
+    Parameters
+    ----------
+    dataframe : pandas DataFrame
+        Tidy data with the results, qualifiers, and grouping columns.
+
+    groupcols : string or list of strings
+        The columns defining the groups.
+
+    rescol : optional string (default='res')
+        The name of the column containing the results. Non-detect
+        values should be set to the detection limit.
+
+    qualcol : optional string (default='qual')
+        The name of the column containing the qualifiers.
+
+    ndsymbol : optional string or list of strings (default='ND')
+        The qualifier(s) that mark a result as a non-detect.
+
+    quantiles : optional sequence of floats
+        The quantiles to compute for each group.
+
+    Returns
+    -------
+    stats : pandas DataFrame
+        Indexed by `groupcols` with columns for the number of results
+        (`count`), the number of non-detects (`ND`), the `mean`, `std`,
+        and `median`, and one column for each of the `quantiles` (e.g.,
+        'pctl 25').
+
+    See also
+    --------
+    KaplanMeier
+
+    '''
+    codes, index = _group_codes(dataframe, groupcols)
+    kmfit = _km_kernel(dataframe[rescol].values,
+                       censored_mask(dataframe[qualcol], ndsymbol),
+                       groups=codes)
+
+    quantiles = list(quantiles)
+    ptiles = _km_quantiles(kmfit, quantiles + [0.5])
+
+    columns = ['count', 'ND', 'mean', 'std', 'median']
+    data = {
+        'count': kmfit['N_tot'],
+        'ND': kmfit['N_nd'],
+        'mean': kmfit['mean'],
+        'std': kmfit['std'],
+        'median': ptiles[:, -1],
+    }
+    for n, q in enumerate(quantiles):
+        name = 'pctl {:g}'.format(100 * q)
+        data[name] = ptiles[:, n]
+        columns.append(name)
+
+    return pandas.DataFrame(data, index=index, columns=columns)
@@ -0,0 +1,356 @@
+from __future__ import division
+
+import numpy as np
+import scipy.stats as stats
+import pandas
+
+from .ros import _group_codes, censored_mask
+
+
+__all__ = ['CensoredMLE', 'mle_groups']
+
+
+def _group_sum(values, groups, G):
+    return np.bincount(groups, weights=values, minlength=G)
+
+
+def _mle_terms(y, c, mu, tau, g):
+    '''
+    Log-likelihood, gradient, and Hessian terms of each result with
+    respect to the mean (`mu`) and log of the standard deviation (`tau`)
+    of a normal distribution. Non-detects contribute the log of the CDF
+    at their detection limit; detects the log of the PDF.
+    '''
+    sigma = np.exp(tau)[g]
+    z = (y - mu[g]) / sigma
+
+    # detects
+    ll = np.where(c, 0.0, -np.log(sigma) - 0.5 * z ** 2)
+    d_mu = np.where(c, 0.0, z / sigma)
+    d_tau = np.where(c, 0.0, z ** 2 - 1)
+    h_mumu = np.where(c, 0.0, -1 / sigma ** 2)
+    h_mutau = np.where(c, 0.0, -2 * z / sigma)
+    h_tautau = np.where(c, 0.0, -2 * z ** 2)
+
+    # non-detects (with the inverse Mills ratio computed in log space)
+    zc = z[c]
+    logcdf = stats.norm.logcdf(zc)
+    lam = np.exp(stats.norm.logpdf(zc) - logcdf)
+    curve = 1 - zc * (zc + lam)
+    ll[c] = logcdf
+    d_mu[c] = -lam / sigma[c]
+    d_tau[c] = -zc * lam
+    h_mumu[c] = -lam * (zc + lam) / sigma[c] ** 2
+    h_mutau[c] = lam * curve / sigma[c]
+    h_tautau[c] = zc * lam * curve
+
+    return ll, d_mu, d_tau, h_mumu, h_mutau, h_tautau
+
+
+def _em_step(y, c, mu, tau, g, G, N):
+    '''
+    Expectation-maximization update of the parameters. Always increases
+    the likelihood, so it's used when Newton's method can't.
+    '''
+    sigma = np.exp(tau)[g]
+    z = (y - mu[g]) / sigma
+    lam = np.exp(stats.norm.logpdf(z) - stats.norm.logcdf(z))
+
+    # expected values of the censored results (truncated normal)
+    ey = np.where(c, mu[g] - sigma * lam, y)
+    ey2 = np.where(c, mu[g] ** 2 + sigma ** 2 - sigma * lam * (y + mu[g]),
+                   y ** 2)
+
+    new_mu = _group_sum(ey, g, G) / N
+    var = _group_sum(ey2, g, G) / N - new_mu ** 2
+    return new_mu, 0.5 * np.log(var)
+
+
+def _mle_kernel(values, censored, groups=None, dist='lognorm', tol=1e-8,
+                maxiter=100):
+    '''
+    Maximum likelihood estimates of the parameters of a left-censored
+    normal or lognormal distribution fit independently to any number of
+    groups at once. All of the groups are iterated together with a
+    damped Newton's method on the mean and the log of the standard
+    deviation, falling back to an EM step for groups where the Newton
+    step doesn't increase the likelihood.
+
+    Parameters
+    ----------
+    values : array-like of floats
+        Results (detection limits for non-detects).
+    censored : array-like of bools
+        True where the result is a non-detect.
+    groups : array-like or None (default)
+        Labels assigning each result to a group. All results belong to
+        a single group if None.
+    dist : string ('lognorm' (default) or 'norm')
+        The distribution to fit.
+    tol : float (default = 1e-8)
+        Convergence tolerance of the parameter updates.
+    maxiter : int (default = 100)
+        Maximum number of iterations.
+
+    Returns
+    -------
+    mle : dict of numpy arrays
+        Groups: N_tot, N_nd, mu, sigma (parameters of the normal
+        distribution, fit to the logs if `dist` is 'lognorm'), mean,
+        std (in the units of `values`), loglike, converged, niter.
+        Groups with less than two distinct detected values can't be
+        fit and are NaN.
+
+    '''
+    if dist not in ('norm', 'lognorm'):
+        raise ValueError("`dist` must be 'norm' or 'lognorm'")
+
+    x = np.asarray(values, dtype=np.float64)
+    c = np.asarray(censored, dtype=bool)
+    if c.shape != x.shape:
+        raise ValueError('`censored` must be the same shape as `values`')
+
+    if dist == 'lognorm':
+        if np.any(x <= 0):
+            raise ValueError('All result values must be positive')
+        y = np.log(x)
+    else:
+        y = x
+
+    if groups is None:
+        g = np.zeros(x.shape[0], dtype=np.int64)
+    else:
+        g = np.unique(np.asarray(groups), return_inverse=True)[1]
+        g = g.astype(np.int64).ravel()
+    G = g.max() + 1 if g.shape[0] > 0 else 0
+
+    N = np.bincount(g, minlength=G).astype(np.float64)
+    N_nd = np.bincount(g, weights=c, minlength=G).astype(np.int64)
+
+    # groups that can be fit: at least two distinct detected values
+    det = ~c
+    dmin = np.full(G, np.inf)
+    dmax = np.full(G, -np.inf)
+    np.minimum.at(dmin, g[det], y[det])
+    np.maximum.at(dmax, g[det], y[det])
+    fit = dmax > dmin
+
+    # start from the moments with the NDs at half of their DLs
+    y0 = np.where(c, y - np.log(2) if dist == 'lognorm' else 0.5 * y, y)
+    mu = _group_sum(y0, g, G) / N
+    var = _group_sum(y0 ** 2, g, G) / N - mu ** 2
+    spread = np.where(fit, dmax - dmin, 1.0)
+    tau = 0.5 * np.log(np.maximum(var, (1e-3 * spread) ** 2))
+
+    # only iterate over the rows of the groups that can be fit
+    rows = fit[g]
+    y, c, g = y[rows], c[rows], g[rows]
+
+    ll = _group_sum(_mle_terms(y, c, mu, tau, g)[0], g, G)
+    active = fit.copy()
+    niter = np.zeros(G, dtype=np.int64)
+    for n in range(maxiter):
+        if not active.any():
+            break
+
+        # drop the rows of the groups that have converged
+        rows = active[g]
+        y, c, g = y[rows], c[rows], g[rows]
+
+        terms = _mle_terms(y, c, mu, tau, g)
+        g1, g2, a, b, d = [_group_sum(t, g, G) for t in terms[1:]]
+
+        # Newton step, solving the 2x2 systems in closed form
+        det_H = a * d - b ** 2
+        newton = active & (a < 0) & (det_H > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step_mu = -(d * g1 - b * g2) / det_H
+            step_tau = -(a * g2 - b * g1) / det_H
+
+        # don't let the log of sigma change by more than one at a time
+        scale = np.maximum(np.abs(step_tau), 1.0)
+        step_mu = np.where(newton, step_mu / scale, 0.0)
+        step_tau = np.where(newton, step_tau / scale, 0.0)
+
+        # halve steps that don't improve the likelihood
+        new_mu, new_tau = mu.copy(), tau.copy()
+        trial = newton.copy()
+        for halving in range(10):
+            new_mu[trial] = mu[trial] + step_mu[trial]
+            new_tau[trial] = tau[trial] + step_tau[trial]
+            sub = trial[g]
+            new_ll = _group_sum(
+                _mle_terms(y[sub], c[sub], new_mu, new_tau, g[sub])[0],
+                g[sub], G
+            )
+            trial &= new_ll < ll - 1e-12
+            if not trial.any():
+                break
+            step_mu *= 0.5
+            step_tau *= 0.5
+
+        # EM for everything else
+        em = active & (~newton | trial)
+        if em.any():
+            em_mu, em_tau = _em_step(y, c, mu, tau, g, G, N)
+            new_mu[em] = em_mu[em]
+            new_tau[em] = em_tau[em]
+
+        change = np.maximum(np.abs(new_mu - mu), np.abs(new_tau - tau))
+        mu, tau = new_mu, new_tau
+        ll = np.where(active, _group_sum(_mle_terms(y, c, mu, tau, g)[0], g, G),
+                      ll)
+        niter[active] += 1
+        active &= change > tol
+
+    converged = fit & ~active
+    sigma = np.exp(tau)
+    mu = np.where(fit, mu, np.nan)
+    sigma = np.where(fit, sigma, np.nan)
+    ll = np.where(fit, ll - 0.5 * np.log(2 * np.pi) * (N - N_nd), np.nan)
+
+    if dist == 'lognorm':
+        mean = np.exp(mu + 0.5 * sigma ** 2)
+        std = mean * np.sqrt(np.exp(sigma ** 2) - 1)
+    else:
+        mean, std = mu, sigma
+
+    return dict(
+        N_tot=N.astype(np.int64), N_nd=N_nd, mu=mu, sigma=sigma, mean=mean,
+        std=std, loglike=ll, converged=converged, niter=niter,
+    )
+
+
+class CensoredMLE(object):
+    '''Maximum likelihood estimate of left-censored data
+    Fits a normal or lognormal distribution to a dataset with
+    non-detects by maximizing the likelihood of the detected values
+    (PDF) and of the non-detects being below their detection limits
+    (CDF).
+
+    Parameters
+    ----------
+    values : array-like of floats
+        The results of the dataset. Non-detect values should be set to
+        the detection limit.
+
+    censored : array-like of bools
+        True where the corresponding result is a non-detect.
+
+    dist : optional string ('lognorm' (default) or 'norm')
+        The distribution to fit.
+
+    tol : optional float (default = 1e-8)
+        Convergence tolerance of the parameter updates.
+
+    maxiter : optional int (default = 100)
+        Maximum number of iterations.
+
+    Attributes
+    ----------
+    N_tot, N_nd : int
+        Total number of results and non-detects in the dataset.
+
+    mu, sigma : float
+        Parameters of the fitted normal distribution (of the logs of
+        the data if `dist` is 'lognorm').
+
+    mean, std : float
+        Mean and standard deviation of the fitted distribution in the
+        units of the data.
+
+    loglike : float
+        Log-likelihood of the fit.
+
+    converged : bool
+        Whether the solver converged.
+
+    Notes
+    -----
+    Datasets with less than two distinct detected values can't be fit,
+    and all of the estimates are NaN.
+
+    See also
+    --------
+    mle_groups
+
+    '''
+
+    def __init__(self, values, censored, dist='lognorm', tol=1e-8,
+                 maxiter=100):
+        mle = _mle_kernel(values, censored, dist=dist, tol=tol,
+                          maxiter=maxiter)
+        if mle['N_tot'].shape[0] == 0:
+            raise ValueError("CensoredMLE requires at least one result")
+
+        self.dist = dist
+        self.N_tot = int(mle['N_tot'][0])
+        self.N_nd = int(mle['N_nd'][0])
+        self.mu = mle['mu'][0]
+        self.sigma = mle['sigma'][0]
+        self.mean = mle['mean'][0]
+        self.std = mle['std'][0]
+        self.loglike = mle['loglike'][0]
+        self.converged = bool(mle['converged'][0])
+        self.niter = int(mle['niter'][0])
+
+
+def mle_groups(dataframe, groupcols, rescol='res', qualcol='qual',
+               ndsymbol='ND', dist='lognorm', tol=1e-8, maxiter=100):
+    '''
+    Censored maximum likelihood estimates of every group of a
+    dataframe, fit all at once.
+
+    Parameters
+    ----------
+    dataframe : pandas DataFrame
+        Tidy data with the results, qualifiers, and grouping columns.
+
+    groupcols : string or list of strings
+        The columns defining the groups.
+
+    rescol : optional string (default='res')
+        The name of the column containing the results. Non-detect
+        values should be set to the detection limit.
+
+    qualcol : optional string (default='qual')
+        The name of the column containing the qualifiers.
+
+    ndsymbol : optional string or list of strings (default='ND')
+        The qualifier(s) that mark a result as a non-detect.
+
+    dist : optional string ('lognorm' (default) or 'norm')
+        The distribution to fit.
+
+    tol, maxiter : optional
+        Convergence tolerance and maximum number of iterations.
+
+    Returns
+    -------
+    stats : pandas DataFrame
+        Indexed by `groupcols` with columns for the number of results
+        (`count`), the number of non-detects (`ND`), the parameters of
+        the distribution (`mu`, `sigma`), the `mean` and `std`, and
+        whether the fit `converged`.
+
+    See also
+    --------
+    CensoredMLE
+
+    '''
+    codes, index = _group_codes(dataframe, groupcols)
+    mle = _mle_kernel(dataframe[rescol].values,
+                      censored_mask(dataframe[qualcol], ndsymbol),
+                      groups=codes, dist=dist, tol=tol, maxiter=maxiter)
+
+    columns = ['count', 'ND', 'mu', 'sigma', 'mean', 'std', 'converged']
+    data = {
+        'count': mle['N_tot'],
+        'ND': mle['N_nd'],
+        'mu': mle['mu'],
+        'sigma': mle['sigma'],
+        'mean': mle['mean'],
+        'std': mle['std'],
+        'converged': mle['converged'],
+    }
+    return pandas.DataFrame(data, index=index, columns=columns)
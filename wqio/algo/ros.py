@@ -3,6 +3,8 @@ from __future__ import division
 import pdb
 import os
 import sys
+import hashlib
+from collections import OrderedDict
 
 if sys.version_info.major == 3:
     from io import StringIO
@@ -15,7 +17,45 @@ import scipy.stats as stats
 import pandas
 
 
-__all__ = ['rosSort', 'MR']
+__all__ = ['censored_mask', 'rosSort', 'ros_estimate', 'ros_groups',
+           'ros_impute', 'ROSMemo', 'ROSState', 'MR']
+
+
+def censored_mask(qualifiers, ndsymbol='ND'):
+    '''
+    Encodes qualifiers as a boolean mask of the censored (non-detect)
+    results.
+
+    The qualifiers are factorized once (or their codes are used
+    directly if they're already categorical), so each distinct flag is
+    only compared against the ND symbols a single time no matter how
+    many results there are.
+
+    Input:
+        qualifiers : array-like or pandas.Series of qualifiers
+        ndsymbol (default = 'ND') : the value, or a list/set of values,
+            of the qualifiers that indicate a non-detect (e.g.,
+            ``['ND', '<', 'U']``). Any other value (including missing
+            values) is a detect.
+
+    Output:
+        numpy array of bools that is True where the result is censored.
+    '''
+    if np.isscalar(ndsymbol):
+        symbols = [ndsymbol]
+    else:
+        symbols = list(ndsymbol)
+
+    if hasattr(qualifiers, 'cat'):
+        codes = np.asarray(qualifiers.cat.codes)
+        flags = np.asarray(qualifiers.cat.categories)
+    else:
+        codes, flags = pandas.factorize(np.asarray(qualifiers).ravel())
+        flags = np.asarray(flags)
+
+    # missing values get a code of -1, i.e., the extra False at the end
+    lookup = np.append(np.in1d(flags, symbols), False)
+    return lookup[codes]
 
 
 def rosSort(dataframe, rescol='res', qualcol='qual', ndsymbol='ND'):
@@ -34,16 +74,17 @@ def rosSort(dataframe, rescol='res', qualcol='qual', ndsymbol='ND'):
         qualcol (default = 'qual') : name of the column in the dataframe
             that containes qualifiers. There must be a single, unique
             qualifer that indicates that a result is non-detect.
-        ndsymbol (default = 'ND' : the value in `qualcol` that indicates
-            that a value in nondetect. *Important*: any other value will
-            be treated as a detection.
+        ndsymbol (default = 'ND' : the value (or list of values) in
+            `qualcol` that indicates that a value in nondetect.
+            *Important*: any other value will be treated as a detection.
 
     Output:
         Sorted dataframe with a dropped index.
     '''
     # separate detects from non-detects
-    nondetects = dataframe[dataframe[qualcol] == ndsymbol].sort(columns=rescol)
-    detects = dataframe[dataframe[qualcol] != ndsymbol].sort(columns=rescol)
+    censored = censored_mask(dataframe[qualcol], ndsymbol)
+    nondetects = dataframe[censored].sort(columns=rescol)
+    detects = dataframe[~censored].sort(columns=rescol)
 
     # remerge the separated values
     ros_data = nondetects.append(detects)
@@ -51,6 +92,988 @@ def rosSort(dataframe, rescol='res', qualcol='qual', ndsymbol='ND'):
     return ros_data #.reset_index(drop=True)
 
 
+def _segment_suffix_sum(values, segments):
+    '''
+    Sums of `values` from each element to the end of its segment.
+    `segments` must be sorted so that each segment is contiguous.
+    '''
+    total = np.cumsum(values[::-1])[::-1]
+    ends = np.searchsorted(segments, segments, side='right')
+    return total - np.append(total, 0)[ends]
+
+
+def _segment_suffix_prod(values, segments):
+    '''
+    Products of `values` from each element to the end of its segment.
+    Zeros and NaNs are counted separately so they do not leak across
+    segment boundaries.
+    '''
+    iszero = values == 0
+    isnan = np.isnan(values)
+    logs = np.log(np.where(iszero | isnan, 1.0, values))
+
+    prod = np.exp(_segment_suffix_sum(logs, segments))
+    prod[_segment_suffix_sum(iszero.astype(int), segments) > 0] = 0.0
+    prod[_segment_suffix_sum(isnan.astype(int), segments) > 0] = np.nan
+    return prod
+
+
+def _dl_index(DLs, values):
+    '''
+    Index of the highest detection limit that is less than or equal to
+    each value (-1 below the lowest one). `DLs` must be sorted, so this
+    is a single binary search (O(N log D)) instead of comparing every
+    value to every detection limit.
+    '''
+    return np.searchsorted(DLs, values, side='right') - 1
+
+
+def _cohn_counts(detects, nondetects, DLs, upper, floor):
+    '''
+    The Cohn `A`, `B`, and `C` quantities of each detection limit,
+    counted with binary searches of the sorted detects and non-detects
+    in O((N + D) log N):
+
+        A : detects at or above the DL and below `upper` (the next DL)
+        B : non-detects at or below the DL plus detects below it
+        C : non-detects equal to the DL
+
+    Only values at or above `floor` are counted, which keeps stacked
+    groups apart (use -inf for a single group).
+    '''
+    d_lo = np.searchsorted(detects, DLs, side='left')
+    n_hi = np.searchsorted(nondetects, DLs, side='right')
+    A = np.searchsorted(detects, upper, side='left') - d_lo
+    B = (n_hi - np.searchsorted(nondetects, floor, side='left')) + \
+        (d_lo - np.searchsorted(detects, floor, side='left'))
+    C = n_hi - np.searchsorted(nondetects, DLs, side='left')
+    return A, B, C
+
+
+def _run_ranks(newrun):
+    '''
+    "Normal" ROS ranks: the position of each value within its run, where
+    `newrun` is True at the first value of every run of the same
+    qualifier and detection limit (and group).
+    '''
+    positions = np.arange(newrun.shape[0])
+    starts = np.maximum.accumulate(np.where(newrun, positions, 0))
+    return (positions - starts + 1).astype(np.float64)
+
+
+def _ros_kernel(values, censored, groups=None, dist='norm', fitlogs=True):
+    '''
+    Array-level implementation of the MR method applied independently
+    to any number of groups in a single pass.
+
+    Parameters
+    ----------
+    values : array-like of floats
+        Results (detection limits for non-detects). Must be positive.
+    censored : array-like of bools
+        True where the result is a non-detect.
+    groups : array-like or None (default)
+        Labels assigning each result to a group. All results belong to
+        a single group if None.
+    dist : string or scipy.stats distribution (default = 'norm')
+        Distribution used to compute the Z-scores of the plotting
+        positions.
+    fitlogs : bool (default = True)
+        Toggles fitting the regression to the logs of the detects.
+
+    Returns
+    -------
+    ros : dict of numpy arrays
+        Row-wise quantities are given in "ROS order": sorted by group,
+        then with non-detects before detects, then by value. `order`
+        maps them back to the input (i.e., ``out[order] = final``).
+        Rows: order, group, res, censored, DLIndex (local to group),
+        rank, plot_pos, Zprelim, modeled, final. Detection limits
+        (sorted by group, then value): DL_group, DL, upper, A, B, C, PE.
+        Groups: N_tot, N_nd, mode (0: no NDs, 1: half-DL substitution,
+        2: ROS), slope, intercept.
+
+    '''
+    if isinstance(dist, str):
+        dist = getattr(stats, dist)
+
+    res = np.asarray(values, dtype=np.float64)
+    cens = np.asarray(censored, dtype=bool)
+    if groups is None:
+        codes = np.zeros(res.shape[0], dtype=np.int64)
+    else:
+        codes = np.unique(np.asarray(groups), return_inverse=True)[1]
+        codes = codes.astype(np.int64).ravel()
+    G = codes.max() + 1 if codes.shape[0] > 0 else 0
+
+    # sort by group, NDs first, then value (same as `rosSort`)
+    order = np.lexsort((res, ~cens, codes))
+    g = codes[order]
+    x = res[order]
+    c = cens[order]
+    det = ~c
+
+    # integer keys that compare exactly like values within a group
+    xvals, xcode = np.unique(x, return_inverse=True)
+    M = xvals.shape[0] + 1
+    key = g * M + xcode.ravel()
+
+    # basic counts per group
+    N_tot = np.bincount(g, minlength=G)
+    N_nd = np.bincount(g, weights=c, minlength=G).astype(np.int64)
+    starts = np.cumsum(N_tot) - N_tot
+
+    # unique detection limits of each group plus the group's minimum
+    # value when it is smaller than the lowest detection limit
+    dlkey = np.unique(key[c])
+    hasND = N_nd > 0
+    minkey = np.zeros(G, dtype=np.int64)
+    if G > 0:
+        minkey = np.minimum.reduceat(key, starts)
+    firstdl = np.zeros(G, dtype=np.int64)
+    if dlkey.shape[0] > 0:
+        dlgroups, first = np.unique(dlkey // M, return_index=True)
+        firstdl[dlgroups] = dlkey[first]
+    dlkey = np.union1d(dlkey, minkey[hasND & (minkey < firstdl)])
+
+    dl_g = dlkey // M
+    dl_x = xvals[dlkey % M]
+    D = dlkey.shape[0]
+
+    # the upper bound of each DL is the next DL in the same group
+    samegroup = np.append(dl_g[1:] == dl_g[:-1], False)
+    upperkey = np.where(samegroup, np.append(dlkey[1:], 0), (dl_g + 1) * M)
+    upper = np.where(samegroup, np.append(dl_x[1:], 0), np.inf)
+    groupkey = dl_g * M
+
+    # A, B, and C from the counts of sorted (non-)detects
+    A, B, C = _cohn_counts(key[det], key[c], dlkey, upperkey, groupkey)
+
+    # exceedance probabilities:
+    # 1 - PE[j] = prod_{k >= j} B[k] / (A[k] + B[k])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = B / (A + B).astype(np.float64)
+    PE = 1.0 - _segment_suffix_prod(ratio, dl_g)
+    PE_next = np.where(samegroup, np.append(PE[1:], 0), 0.0)
+
+    # index of the DL of each result (-1 if the group has no DLs)
+    DLIndex = _dl_index(dlkey, key)
+    valid = DLIndex >= 0
+    valid[valid] = dl_g[DLIndex[valid]] == g[valid]
+    DLIndex[~valid] = -1
+    dlstart = np.searchsorted(dl_g, np.arange(G), side='left')
+    localDL = np.where(valid, DLIndex - dlstart[g], 0)
+
+    # ranks within runs of (group, qualifier, DL)
+    N = x.shape[0]
+    newrun = np.ones(N, dtype=bool)
+    newrun[1:] = (g[1:] != g[:-1]) | (c[1:] != c[:-1]) | \
+                 (DLIndex[1:] != DLIndex[:-1])
+    rank = _run_ranks(newrun)
+
+    # groups to which the MR method applies
+    mode = np.where(N_nd == 0, 0, 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fewdetects = (N_tot - N_nd < 2) | (N_nd / N_tot.astype(float) > 0.8)
+    mode[(N_nd > 0) & fewdetects] = 1
+    useros = (mode == 2)[g] & valid
+
+    # plotting positions and Z-scores
+    j = np.where(useros, DLIndex, 0)
+    plot_pos = np.full(N, np.nan)
+    if D > 0:
+        pe = PE[j]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            nd_pp = (1 - pe) * rank / (C[j] + 1)
+            det_pp = (1 - pe) + (pe - PE_next[j]) * rank / (A[j] + 1)
+        plot_pos = np.where(useros, np.where(c, nd_pp, det_pp), np.nan)
+    with np.errstate(invalid='ignore'):
+        Zprelim = dist.ppf(plot_pos)
+
+    # least-squares fit of each group's detects
+    fitrows = useros & det
+    y = np.log(x) if fitlogs else x
+    n = np.bincount(g, weights=fitrows, minlength=G)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zbar = np.bincount(g, weights=np.where(fitrows, Zprelim, 0), minlength=G) / n
+        ybar = np.bincount(g, weights=np.where(fitrows, y, 0), minlength=G) / n
+        dz = np.where(fitrows, Zprelim - zbar[g], 0)
+        dy = np.where(fitrows, y - ybar[g], 0)
+        slope = np.bincount(g, weights=dz * dy, minlength=G) / \
+                np.bincount(g, weights=dz * dz, minlength=G)
+        intercept = ybar - slope * zbar
+
+        # model the non-detects and select the final data
+        modeled = slope[g] * Zprelim + intercept[g]
+    if fitlogs:
+        modeled = np.exp(modeled)
+    modeled[~(useros & c)] = np.nan
+
+    rowmode = mode[g]
+    final = np.where(rowmode == 1, np.where(c, 0.5 * x, x), x)
+    final = np.where(rowmode == 2, np.where(c, modeled, x), final)
+
+    return dict(
+        order=order, group=g, res=x, censored=c, DLIndex=localDL,
+        rank=rank, plot_pos=plot_pos, Zprelim=Zprelim, modeled=modeled,
+        final=final, DL_group=dl_g, DL=dl_x, upper=upper, A=A, B=B, C=C,
+        PE=np.where((mode == 2)[dl_g], PE, 0.0), N_tot=N_tot, N_nd=N_nd,
+        mode=mode, slope=slope, intercept=intercept,
+    )
+
+
+# fields of the `_ros_kernel` output by what they are indexed with
+_ROW_FIELDS = ['res', 'censored', 'DLIndex', 'rank', 'plot_pos', 'Zprelim',
+               'modeled', 'final']
+_DL_FIELDS = ['DL', 'upper', 'A', 'B', 'C', 'PE']
+_GROUP_FIELDS = ['N_tot', 'N_nd', 'mode', 'slope', 'intercept']
+
+
+def _split_rosfit(rosfit):
+    '''
+    Splits the output of `_ros_kernel` for several groups into the
+    outputs that each group would have produced on its own. The groups
+    must have been passed to the kernel contiguously and in order.
+    '''
+    N_tot = rosfit['N_tot']
+    starts = np.cumsum(N_tot) - N_tot
+    dlbounds = np.searchsorted(rosfit['DL_group'], np.arange(N_tot.shape[0] + 1))
+    for k in range(N_tot.shape[0]):
+        rows = slice(starts[k], starts[k] + N_tot[k])
+        dls = slice(dlbounds[k], dlbounds[k+1])
+
+        part = dict((name, rosfit[name][rows]) for name in _ROW_FIELDS)
+        part.update((name, rosfit[name][dls]) for name in _DL_FIELDS)
+        part.update((name, rosfit[name][k:k+1]) for name in _GROUP_FIELDS)
+        part['order'] = rosfit['order'][rows] - starts[k]
+        part['group'] = np.zeros(N_tot[k], dtype=np.int64)
+        part['DL_group'] = np.zeros(dls.stop - dls.start, dtype=np.int64)
+        yield part
+
+
+class ROSMemo(object):
+    '''Memoization of ROS estimates
+    Keeps the results of the MR method for each dataset it has seen,
+    keyed by a hash of the results, their censoring, the distribution,
+    and `fitlogs`, so that the same data are never estimated twice.
+    The most recently used datasets are held in memory. Optionally,
+    every result is also saved to (and looked up from) a directory so
+    that they persist across sessions.
+
+    Parameters
+    ----------
+    maxsize : optional int (default = 128)
+        Maximum number of datasets held in memory.
+
+    cachedir : optional string or None (default)
+        Directory of the on-disk tier. Created if it doesn't exist.
+        Nothing is written to disk when None.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of lookups that were and were not found in the memo.
+
+    Examples
+    --------
+    >>> from wqio.algo import ros
+    >>> memo = ros.ROSMemo(cachedir='ros_cache')
+    >>> mr = ros.MR(dataframe, memo=memo)
+
+    '''
+
+    def __init__(self, maxsize=128, cachedir=None):
+        self.maxsize = maxsize
+        self.cachedir = cachedir
+        if cachedir is not None and not os.path.exists(cachedir):
+            os.makedirs(cachedir)
+
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+
+    @staticmethod
+    def key(values, censored, dist='norm', fitlogs=True):
+        '''
+        Hash of a dataset and the options of its estimation
+        '''
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        censored = np.ascontiguousarray(censored, dtype=bool)
+        options = str((getattr(dist, 'name', dist), bool(fitlogs)))
+
+        sha = hashlib.sha1(values.tobytes())
+        sha.update(censored.tobytes())
+        sha.update(options.encode('utf-8'))
+        return sha.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, key + '.npz')
+
+    def _remember(self, key, rosfit):
+        self._memory.pop(key, None)
+        self._memory[key] = rosfit
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        '''
+        Returns (a copy of) the stored `_ros_kernel` output for `key` or
+        None if the dataset hasn't been seen
+        '''
+        if key in self._memory:
+            rosfit = self._memory[key]
+            self._remember(key, rosfit)
+        elif self.cachedir is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as stored:
+                rosfit = dict((name, stored[name]) for name in stored.files)
+            self._remember(key, rosfit)
+        else:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return dict((name, value.copy()) for name, value in rosfit.items())
+
+    def set(self, key, rosfit):
+        '''
+        Stores the `_ros_kernel` output of a single dataset
+        '''
+        rosfit = dict((name, np.array(value)) for name, value in rosfit.items())
+        self._remember(key, rosfit)
+        if self.cachedir is not None:
+            np.savez(self._path(key), **rosfit)
+
+    def clear(self):
+        '''
+        Empties the in-memory tier (files on disk are left alone)
+        '''
+        self._memory.clear()
+
+    def kernel(self, values, censored, dist='norm', fitlogs=True):
+        '''
+        Memoized `_ros_kernel` for a single dataset
+        '''
+        key = self.key(values, censored, dist=dist, fitlogs=fitlogs)
+        rosfit = self.get(key)
+        if rosfit is None:
+            rosfit = _ros_kernel(values, censored, dist=dist, fitlogs=fitlogs)
+            self.set(key, rosfit)
+        return rosfit
+
+    def groups(self, values, censored, codes, dist='norm', fitlogs=True):
+        '''
+        Memoized `_ros_kernel` for many groups. Only the groups that
+        aren't in the memo are estimated (together, in one batch).
+
+        Returns
+        -------
+        order : numpy array of ints
+            Positions of the input sorted by group, then in ROS order
+        final : numpy array
+            Final values in the order of `order`
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        censored = np.asarray(censored, dtype=bool)
+
+        # input positions of each group (in input order)
+        grouporder = np.argsort(codes, kind='mergesort')
+        sizes = np.bincount(codes) if codes.shape[0] > 0 else np.array([], dtype=int)
+        rows = np.split(grouporder, np.cumsum(sizes)[:-1])
+
+        results = {}
+        missing = []
+        for n, index in enumerate(rows):
+            key = self.key(values[index], censored[index], dist=dist,
+                           fitlogs=fitlogs)
+            rosfit = self.get(key)
+            if rosfit is None:
+                missing.append((n, index, key))
+            else:
+                results[n] = rosfit
+
+        if len(missing) > 0:
+            index = np.concatenate([m[1] for m in missing])
+            batch = np.repeat(np.arange(len(missing)), [m[1].shape[0] for m in missing])
+            rosfit = _ros_kernel(values[index], censored[index], groups=batch,
+                                 dist=dist, fitlogs=fitlogs)
+            for (n, index, key), part in zip(missing, _split_rosfit(rosfit)):
+                self.set(key, part)
+                results[n] = part
+
+        if len(rows) == 0:
+            return np.array([], dtype=int), np.array([])
+
+        order = np.concatenate([rows[n][results[n]['order']] for n in range(len(rows))])
+        final = np.concatenate([results[n]['final'] for n in range(len(rows))])
+        return order, final
+
+
+class ROSState(object):
+    '''Incrementally updatable MR estimate
+    Holds the fitted state of the MR method for a single dataset (the
+    sorted results, their detection limit indices and the `A`, `B`,
+    and `C` counts of each detection limit) so that new results can be
+    added without starting over.
+
+    Appending finds where the new results go with binary searches and
+    updates the counts of the detection limits from the new results
+    alone. It is still an O(N) refit, not an update proportional to
+    the new data: inserting into the sorted arrays copies them, and the
+    exceedance probabilities, plotting positions and regression depend
+    on every result, so they are re-evaluated for all of them. What it
+    saves compared to a new estimate is the sort, the detection limit
+    searches and the counting. When the new results introduce a new
+    detection limit (or a new minimum below the lowest one), the state
+    is refit from scratch.
+
+    Parameters
+    ----------
+    values : array-like of floats
+        Results (detection limits for non-detects). Must be positive.
+
+    censored : array-like of bools
+        True where the result is a non-detect.
+
+    dist : optional string or scipy.stats distribution (default = 'norm')
+        Distribution used to compute the Z-scores of the plotting
+        positions.
+
+    fitlogs : optional bool (default = True)
+        Toggles fitting the regression to the logs of the detected data.
+
+    Attributes
+    ----------
+    rosfit : dict of numpy arrays
+        The current estimate in the same layout as returned by the
+        array-level ROS kernel (e.g., `order`, `res`, `censored`,
+        `final`, `DL`, `A`, `B`, `C`, `PE`, `slope`, `intercept`). `order`
+        refers to the positions of all of the results in the order in
+        which they were given.
+
+    Examples
+    --------
+    >>> state = ros.ROSState(values, censored)
+    >>> rosfit = state.append(new_values, new_censored)
+
+    '''
+
+    def __init__(self, values, censored, dist='norm', fitlogs=True):
+        if isinstance(dist, str):
+            dist = getattr(stats, dist)
+        self.dist = dist
+        self.fitlogs = fitlogs
+        self._refit(values, censored)
+
+    @classmethod
+    def _from_sorted(cls, res, censored, DL, A, B, C, dist='norm',
+                     fitlogs=True):
+        '''
+        Creates the state from already sorted results and the counts of
+        their detection limits (e.g., from an existing `MR` object)
+        without refitting. `order` is relative to the sorted results.
+        '''
+        state = cls.__new__(cls)
+        if isinstance(dist, str):
+            dist = getattr(stats, dist)
+        state.dist = dist
+        state.fitlogs = fitlogs
+
+        state.res = np.asarray(res, dtype=np.float64)
+        state.censored = np.asarray(censored, dtype=bool)
+        state.order = np.arange(state.res.shape[0])
+        state.DL = np.asarray(DL, dtype=np.float64)
+        state.A = np.asarray(A, dtype=np.int64)
+        state.B = np.asarray(B, dtype=np.int64)
+        state.C = np.asarray(C, dtype=np.int64)
+        state.DLIndex = state._DL_index(state.res)
+        state.rosfit = None
+        return state
+
+    def _refit(self, values, censored):
+        rosfit = _ros_kernel(values, censored, dist=self.dist,
+                             fitlogs=self.fitlogs)
+        self.res = rosfit['res']
+        self.censored = rosfit['censored']
+        self.order = rosfit['order']
+        self.DL = rosfit['DL']
+        self.A = rosfit['A']
+        self.B = rosfit['B']
+        self.C = rosfit['C']
+        self.DLIndex = self._DL_index(self.res)
+        self.rosfit = rosfit
+        return rosfit
+
+    def _DL_index(self, values):
+        if self.DL.shape[0] > 0:
+            return _dl_index(self.DL, values)
+        else:
+            return np.zeros(values.shape[0], dtype=np.int64)
+
+    def append(self, values, censored):
+        '''
+        Adds new results to the estimate. This is an O(N) refit of all
+        of the results that skips the sort (see the class docstring).
+
+        Parameters
+        ----------
+        values : array-like of floats
+            New results (detection limits for non-detects). Must be
+            positive.
+
+        censored : array-like of bools
+            True where the new result is a non-detect.
+
+        Returns
+        -------
+        rosfit : dict of numpy arrays
+            The updated estimate (same as `self.rosfit`)
+
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        censored = np.asarray(censored, dtype=bool)
+        if censored.shape != values.shape:
+            raise ValueError('`censored` must be the same shape as `values`')
+        if np.any(values <= 0):
+            raise ValueError('All result values must be positive')
+        if values.shape[0] == 0:
+            if self.rosfit is None:
+                self.rosfit = self._estimate()
+            return self.rosfit
+
+        N = self.res.shape[0]
+        D = self.DL.shape[0]
+
+        # new detection limits (or a new minimum) change the intervals
+        # of every result, so just start over
+        newDL = np.any(~np.in1d(values[censored], self.DL))
+        if (censored.any() and D == 0) or newDL or \
+                (D > 0 and values.min() < self.DL[0]):
+            allvalues = np.empty(N)
+            allvalues[self.order] = self.res
+            allcensored = np.empty(N, dtype=bool)
+            allcensored[self.order] = self.censored
+            return self._refit(np.hstack([allvalues, values]),
+                               np.hstack([allcensored, censored]))
+
+        # sort the new results like the existing ones (NDs first, then
+        # by value) and find where they go in the sorted arrays
+        neworder = np.lexsort((values, ~censored))
+        values = values[neworder]
+        censored = censored[neworder]
+        N_nd = self.censored.sum()
+        position = np.where(
+            censored,
+            np.searchsorted(self.res[:N_nd], values, side='right'),
+            N_nd + np.searchsorted(self.res[N_nd:], values, side='right')
+        )
+
+        # update the counts of each DL from the new results alone
+        newDLIndex = self._DL_index(values)
+        if D > 0:
+            nd_counts = np.bincount(newDLIndex[censored], minlength=D)
+            det_counts = np.bincount(newDLIndex[~censored], minlength=D)
+            self.A = self.A + det_counts
+            self.C = self.C + nd_counts
+            self.B = self.B + np.cumsum(nd_counts) + \
+                np.cumsum(np.append(0, det_counts[:-1]))
+
+        # merge the new results into the sorted arrays
+        self.res = np.insert(self.res, position, values)
+        self.censored = np.insert(self.censored, position, censored)
+        self.DLIndex = np.insert(self.DLIndex, position, newDLIndex)
+        self.order = np.insert(self.order, position, N + neworder)
+
+        self.rosfit = self._estimate()
+        return self.rosfit
+
+    def _estimate(self):
+        '''
+        Evaluates the exceedance probabilities, plotting positions,
+        regression and final values of the current state
+        '''
+        res = self.res
+        c = self.censored
+        det = ~c
+        DLIndex = self.DLIndex
+        N_tot = res.shape[0]
+        N_nd = int(c.sum())
+        D = self.DL.shape[0]
+
+        # which method applies
+        if N_nd == 0:
+            mode = 0
+        elif N_tot - N_nd < 2 or N_nd / float(N_tot) > 0.8:
+            mode = 1
+        else:
+            mode = 2
+
+        # exceedance probabilities:
+        # 1 - PE[j] = prod_{k >= j} B[k] / (A[k] + B[k])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = self.B / (self.A + self.B).astype(np.float64)
+        PE = 1.0 - np.cumprod(ratio[::-1])[::-1]
+        PE_next = np.append(PE[1:], 0.0)
+        upper = np.append(self.DL[1:], np.inf)
+
+        # ranks within runs of (qualifier, DL)
+        newrun = np.ones(N_tot, dtype=bool)
+        newrun[1:] = (c[1:] != c[:-1]) | (DLIndex[1:] != DLIndex[:-1])
+        rank = _run_ranks(newrun)
+
+        plot_pos = np.full(N_tot, np.nan)
+        Zprelim = np.full(N_tot, np.nan)
+        modeled = np.full(N_tot, np.nan)
+        slope, intercept = np.nan, np.nan
+        final = res.copy()
+        if mode == 1:
+            final[c] = 0.5 * res[c]
+        elif mode == 2:
+            j = DLIndex
+            with np.errstate(divide='ignore', invalid='ignore'):
+                plot_pos = np.where(
+                    c,
+                    (1 - PE[j]) * rank / (self.C[j] + 1),
+                    (1 - PE[j]) + (PE[j] - PE_next[j]) * rank / (self.A[j] + 1)
+                )
+                Zprelim = self.dist.ppf(plot_pos)
+
+            # least-squares fit of the detects
+            y = np.log(res[det]) if self.fitlogs else res[det]
+            z = Zprelim[det]
+            dz = z - z.mean()
+            slope = np.sum(dz * (y - y.mean())) / np.sum(dz * dz)
+            intercept = y.mean() - slope * z.mean()
+
+            # model the non-detects and select the final data
+            modeled[c] = slope * Zprelim[c] + intercept
+            if self.fitlogs:
+                modeled[c] = np.exp(modeled[c])
+            final[c] = modeled[c]
+
+        if mode != 2:
+            PE = np.zeros(D)
+
+        return dict(
+            order=self.order, group=np.zeros(N_tot, dtype=np.int64),
+            res=res, censored=c, DLIndex=DLIndex,
+            rank=rank, plot_pos=plot_pos, Zprelim=Zprelim, modeled=modeled,
+            final=final, DL_group=np.zeros(D, dtype=np.int64), DL=self.DL,
+            upper=upper, A=self.A, B=self.B, C=self.C, PE=PE,
+            N_tot=np.array([N_tot]), N_nd=np.array([N_nd]),
+            mode=np.array([mode]), slope=np.array([slope]),
+            intercept=np.array([intercept]),
+        )
+
+
+def ros_estimate(values, censored, dist='norm', fitlogs=True, memo=None):
+    '''
+    Estimates the censored (non-detect) values of a dataset with the MR
+    method using nothing but array arithmetic.
+
+    Parameters
+    ----------
+    values : array-like of floats
+        The results of the dataset. Non-detect values should be set to
+        the detection limit. All values must be positive.
+
+    censored : array-like of bools
+        True where the corresponding result is a non-detect.
+
+    dist : optional string or scipy.stats distribution (default = 'norm')
+        Distribution used to compute the Z-scores of the plotting
+        positions.
+
+    fitlogs : optional bool (default = True)
+        Toggles fitting the regression to the logs of the detected data.
+
+    memo : optional ROSMemo or None (default)
+        Memo in which previous estimates are looked up and new
+        estimates are stored.
+
+    Returns
+    -------
+    final : numpy array
+        The results with the non-detects replaced by their estimates in
+        the same order as `values`.
+
+    fit : tuple of floats
+        The slope and intercept of the regression used to estimate the
+        non-detects. Both are NaN when the MR method was not applied
+        (i.e., there are no non-detects or too few detects).
+
+    See also
+    --------
+    MR
+
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    censored = np.asarray(censored, dtype=bool)
+    if censored.shape != values.shape:
+        raise ValueError('`censored` must be the same shape as `values`')
+
+    if np.any(values <= 0):
+        raise ValueError('All result values must be positive')
+
+    if memo is None:
+        rosfit = _ros_kernel(values, censored, dist=dist, fitlogs=fitlogs)
+    else:
+        rosfit = memo.kernel(values, censored, dist=dist, fitlogs=fitlogs)
+
+    final = np.empty(values.shape[0])
+    final[rosfit['order']] = rosfit['final']
+
+    fit = (np.nan, np.nan)
+    if values.shape[0] > 0 and rosfit['mode'][0] == 2:
+        fit = (rosfit['slope'][0], rosfit['intercept'][0])
+
+    return final, fit
+
+
+def _group_codes(dataframe, groupcols):
+    '''
+    Integer codes of the groups of a dataframe (sorted like `groupby`
+    would sort them) and an index of the group labels
+    '''
+    if np.isscalar(groupcols):
+        groupcols = [groupcols]
+    else:
+        groupcols = list(groupcols)
+
+    codes = np.zeros(dataframe.shape[0], dtype=np.int64)
+    for col in groupcols:
+        labels, uniques = pandas.factorize(dataframe[col], sort=True)
+        codes = pandas.factorize(codes * len(uniques) + labels, sort=True)[0]
+
+    firsts = np.unique(codes, return_index=True)[1]
+    if len(groupcols) == 1:
+        col = groupcols[0]
+        index = pandas.Index(dataframe[col].values[firsts], name=col)
+    else:
+        index = pandas.MultiIndex.from_arrays(
+            [dataframe[col].values[firsts] for col in groupcols],
+            names=groupcols
+        )
+
+    return codes, index
+
+
+def ros_groups(dataframe, groupcols, rescol='res', qualcol='qual',
+               ndsymbol='ND', fitlogs=True, dist='norm', memo=None):
+    '''
+    Estimates the censored (non-detect) values of every group of a
+    dataset with the MR method in a single, vectorized pass instead of
+    building an `MR` object for each group.
+
+    Parameters
+    ----------
+    dataframe : pandas DataFrame
+        The censored dataset. Must contain `rescol`, `qualcol` and all
+        of the `groupcols` as columns.
+
+    groupcols : string or list of strings
+        Column(s) defining the groups that are estimated independently.
+
+    rescol : optional string (default='res')
+        The name of the column containing the numerical values of the
+        dataset. Non-detect values should be set to the detection limit.
+
+    qualcol : optional string (default='qual')
+        The name of the column containing the qualifiers marking the
+        results as censored.
+
+    ndsymbol : optional string or list of strings (default='ND')
+        The value(s) of the `qualcol` column of `dataframe` that mark a
+        result as being censored.
+
+    fitlogs : optional bool (default = True)
+        Toggles fitting the regression to the logs of the detected data.
+
+    dist : optional string or scipy.stats distribution (default = 'norm')
+        Distribution used to compute the Z-scores of the plotting
+        positions.
+
+    memo : optional ROSMemo or None (default)
+        Memo in which previous estimates of each group are looked up
+        and new estimates are stored. Only the groups that aren't found
+        are estimated.
+
+    Returns
+    -------
+    rosdata : pandas DataFrame
+        A copy of `dataframe` sorted by the groups (in the same order as
+        `dataframe.groupby(groupcols)`) and then, within each group,
+        with the non-detects before the detects and by value. The
+        estimated values are in a new `final_data` column.
+
+    '''
+    values = np.asarray(dataframe[rescol], dtype=np.float64)
+    if np.any(values <= 0):
+        raise ValueError('All result values of `dataframe` must be positive')
+    censored = censored_mask(dataframe[qualcol], ndsymbol)
+    codes = _group_codes(dataframe, groupcols)[0]
+
+    if memo is None:
+        rosfit = _ros_kernel(values, censored, groups=codes, dist=dist,
+                             fitlogs=fitlogs)
+        order, final = rosfit['order'], rosfit['final']
+    else:
+        order, final = memo.groups(values, censored, codes, dist=dist,
+                                   fitlogs=fitlogs)
+
+    rosdata = dataframe.iloc[order].copy()
+    rosdata['final_data'] = final
+    return rosdata
+
+
+def _impute_kernel(rosfit, M, dist='norm', fitlogs=True):
+    '''
+    Stochastic imputations of the non-detects of a `_ros_kernel`
+    estimate. For every draw, the regression parameters of each group
+    are resampled from their sampling distribution and every non-detect
+    is drawn from the fitted distribution truncated at its detection
+    limit. Returns an M x N array in ROS order. Groups where the MR
+    method wasn't applied get their deterministic values in every draw.
+    '''
+    if isinstance(dist, str):
+        dist = getattr(stats, dist)
+
+    g = rosfit['group']
+    c = rosfit['censored']
+    res = rosfit['res']
+    G = rosfit['mode'].shape[0]
+    draws = np.tile(rosfit['final'], (M, 1))
+
+    useros = rosfit['mode'] == 2
+    if not useros.any():
+        return draws
+
+    # regression of the detects of each group (centered so that the
+    # slope and the mean are independent)
+    fitrows = useros[g] & ~c
+    y = np.log(res) if fitlogs else res
+    Z = np.where(fitrows, rosfit['Zprelim'], 0.0)
+    n = np.bincount(g, weights=fitrows, minlength=G)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zbar = np.bincount(g, weights=Z, minlength=G) / n
+        ybar = np.bincount(g, weights=np.where(fitrows, y, 0), minlength=G) / n
+        Szz = np.bincount(g, weights=np.where(fitrows, (Z - zbar[g]) ** 2, 0),
+                          minlength=G)
+        resid = y - (ybar[g] + rosfit['slope'][g] * (Z - zbar[g]))
+        SSE = np.bincount(g, weights=np.where(fitrows, resid ** 2, 0),
+                          minlength=G)
+
+        # residual variance: s^2 (n - 2) / chi^2 with n - 2 dof
+        dof = np.maximum(n - 2, 1)
+        chi2 = np.random.chisquare(dof, size=(M, G))
+        sigma2 = np.where(n > 2, SSE / chi2, 0.0)
+
+        # slope and mean of the detects
+        slope = rosfit['slope'] + np.sqrt(sigma2 / Szz) * \
+            np.random.standard_normal((M, G))
+        mean = ybar + np.sqrt(sigma2 / n) * np.random.standard_normal((M, G))
+        intercept = mean - slope * zbar
+
+    # draw the non-detects from below their detection limits
+    nd = np.nonzero(useros[g] & c)[0]
+    ndgroup = g[nd]
+    a = intercept[:, ndgroup]
+    b = np.maximum(slope[:, ndgroup], np.finfo(float).tiny)
+    upper = dist.cdf((y[nd] - a) / b)
+    u = upper * (1 - np.random.random_sample(a.shape))
+    imputed = a + b * dist.ppf(u)
+    if fitlogs:
+        imputed = np.exp(imputed)
+
+    draws[:, nd] = imputed
+    return draws
+
+
+def ros_impute(values, censored, M=1000, groups=None, dist='norm',
+               fitlogs=True):
+    '''
+    Multiple imputation of the censored (non-detect) values of a
+    dataset with the MR method.
+
+    Instead of the single deterministic estimate from `ros_estimate`,
+    this generates `M` stochastic fill-ins of the non-detects from the
+    same fit. For every draw, the slope, mean, and residual variance of
+    the regression are resampled from their sampling distributions and
+    every non-detect is drawn from the fitted distribution truncated
+    above at its detection limit.
+
+    Parameters
+    ----------
+    values : array-like of floats
+        The results of the dataset. Non-detect values should be set to
+        the detection limit. All values must be positive.
+
+    censored : array-like of bools
+        True where the corresponding result is a non-detect.
+
+    M : optional int (default = 1000)
+        Number of imputations to generate.
+
+    groups : optional array-like or None (default)
+        Labels assigning each result to a group. Each group is
+        estimated independently (but all at once). All results belong
+        to a single group if None.
+
+    dist : optional string or scipy.stats distribution (default = 'norm')
+        Distribution used to compute the Z-scores of the plotting
+        positions and to draw the imputations.
+
+    fitlogs : optional bool (default = True)
+        Toggles fitting the regression to the logs of the detected data.
+
+    Returns
+    -------
+    imputations : numpy array
+        M x N array of the results with the non-detects replaced by
+        their imputations in the same order as `values`. Detects are the
+        same in every draw, as are the non-detects of groups where the
+        MR method wasn't applied (i.e., too few detects).
+
+    See also
+    --------
+    ros_estimate, MR.impute
+
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    censored = np.asarray(censored, dtype=bool)
+    if censored.shape != values.shape:
+        raise ValueError('`censored` must be the same shape as `values`')
+
+    if np.any(values <= 0):
+        raise ValueError('All result values must be positive')
+
+    rosfit = _ros_kernel(values, censored, groups=groups, dist=dist,
+                         fitlogs=fitlogs)
+    draws = _impute_kernel(rosfit, M, dist=dist, fitlogs=fitlogs)
+
+    imputations = np.empty_like(draws)
+    imputations[:, rosfit['order']] = draws
+    return imputations
+
+
+def _average_ranks(rosfit):
+    '''
+    Averages the ranks (from `_ros_kernel`) of detects with the same
+    value and detection limit. Ranks of non-detects are unchanged.
+    '''
+    ranks = rosfit['rank'].copy()
+    detect = ~rosfit['censored']
+    if detect.any():
+        ranks[detect] = (
+            pandas.Series(ranks[detect])
+                  .groupby([rosfit['group'][detect],
+                            rosfit['DLIndex'][detect],
+                            rosfit['res'][detect]])
+                  .transform('mean')
+                  .values
+        )
+    return ranks
+
+
 class MR(object):
     '''Regressiong on Order Statistics
     This class implements the MR method outlined Hirsch and Stedinger (1987)
@@ -71,11 +1094,22 @@ class MR(object):
         The name of the column containing the qualifiers marking the
         results as censored.
 
-    ndsymbol : optional string (default='ND')
-        The value of the `qualcol` column of `data` that marks as result
-        as being censored. In processing, all qualifiers that are equal
-        to `ndsymbol` well be set to 'ND'. All other values will be set
-        to '='.
+    ndsymbol : optional string or list of strings (default='ND')
+        The value(s) of the `qualcol` column of `data` that mark a result
+        as being censored. In processing, all qualifiers that are in
+        `ndsymbol` well be set to 'ND'. All other values will be set to
+        '='.
+
+    memo : optional ROSMemo or None (default)
+        Memo in which previous estimates are looked up and new
+        estimates are stored.
+
+    lean : optional bool (default = False)
+        When True, only the compact arrays (`index`, `res`, `censored`,
+        `final`), the DLs and the fit are kept. `data` is assembled from
+        them on request and `debug` is recomputed from the original
+        `data` on request, so the DataFrame passed in shouldn't be
+        modified afterwards.
 
     Attributes
     ----------
@@ -103,6 +1137,19 @@ class MR(object):
         quantities computed during the estimation such as the "normal"
         and "averaged" ranks and the preliminary Z-score
 
+    index : pandas Index
+        Index of the original dataset in the sorted order of `data`.
+
+    res, final : numpy arrays
+        The original and final (estimated) values in the sorted order.
+
+    censored : numpy array of bools
+        True where the result is a non-detect (in the sorted order).
+
+    Notes
+    -----
+    The estimation itself is done by the same array-level code as
+    `ros_estimate`. This class only builds the DataFrames around it.
 
     Examples
     --------
@@ -113,21 +1160,7 @@ class MR(object):
     '''
 
     def __init__(self, data, rescol='res', qualcol='qual', ndsymbol='ND',
-                 fitlogs=True, dist='norm'):
-
-        def _ros_DL_index(row):
-            '''
-            Helper function to create an array of indices for the detection
-            limits (self.DLs) corresponding to each data point
-            '''
-            DLIndex = np.zeros(len(self.data.res))
-            if self.DLs.shape[0] > 0:
-                index, = np.where(self.DLs['DL'] <= row['res'])
-                DLIndex = index[-1]
-            else:
-                DLIndex = 0
-
-            return DLIndex
+                 fitlogs=True, dist='norm', memo=None, lean=False):
 
         if not isinstance(data, pandas.DataFrame):
             raise ValueError("Input `data` must be a pandas.DataFrame")
@@ -149,17 +1182,9 @@ class MR(object):
             raise ValueError('Result data is not uniformly numeric')
 
         # and get the basic info
+        censored = censored_mask(newdata['qual'], ndsymbol)
         self.N_tot = newdata.shape[0]
-        self.N_nd = newdata[newdata.qual == ndsymbol].shape[0]
-
-        # clear out all of the non-ND quals
-        newdata['qual'] = newdata['qual'].apply(lambda x: 'ND' if x == ndsymbol else '=')
-        #newdata.qual[newdata.qual != ndsymbol] = '='
-        #newdata.qual[newdata.qual == ndsymbol] = 'ND'
-
-        # sort the data
-        self.data = rosSort(newdata, rescol='res', qualcol='qual',
-                            ndsymbol=ndsymbol)
+        self.N_nd = int(censored.sum())
 
         self.fitlogs = fitlogs
         if isinstance(dist, str):
@@ -167,256 +1192,230 @@ class MR(object):
         else:
             self.dist = dist
 
+        # all of the actual work happens on the arrays
+        if memo is None:
+            rosfit = _ros_kernel(newdata['res'].values, censored,
+                                 dist=self.dist, fitlogs=self.fitlogs)
+        else:
+            rosfit = memo.kernel(newdata['res'].values, censored,
+                                 dist=self.dist, fitlogs=self.fitlogs)
+        useROS = self.N_tot > 0 and rosfit['mode'][0] == 2
+
         # create a dataframe of detection limits and their parameters
         # used in the ROS estimation
-        self.DLs = self.cohn()
-
-        # create a DLIndex column that references self.DLs
-        self.data['DLIndex'] = self.data.apply(_ros_DL_index, axis=1)
-
-        # compute the ranks of the data
-        self._ros_ranks()
-
-        # comput the plotting positions, z-scores, and final values
-        self.data = self.estimator()
+        self.DLs = self._DL_table(rosfit)
 
-        # create the debug attribute as a copy of the self.data attribute
-        self.debug = self.data.copy(deep=True)
+        # compact, sorted (NDs first, then by value) copy of the results
+        self.index = newdata.index[rosfit['order']]
+        self.res = rosfit['res']
+        self.censored = rosfit['censored']
+        self.final = rosfit['final']
 
-        # select out only the necessary columns for data
-        self.data = self.data[['final_data', 'res', 'qual']]
-
-    def cohn(self):
-        '''
-        Creates an array of unique detection limits in the dataset
-        '''
-
-        def _A(row):
-            '''
-            Helper function to compute the `A` quantity.
-            '''
-            # index of results above the lower DL
-            above = self.data.res >= row['lower']
-
-            # index of results below the upper DL
-            below = self.data.res < row['upper']
-
-            # index of non-detect results
-            detect = self.data.qual != 'ND'
-
-            # return the number of results where all condictions are True
-            return self.data[above & below & detect].shape[0]
-
-        def _B(row):
-            '''
-            Helper function to compute the `B` quantity
-            '''
-            # index of data less than the lower DL
-            less_than = self.data.res < row['lower']
-
-            # index of data less than or equal to the lower DL
-            less_thanequal = self.data.res <= row['lower']
-
-            # index of detects, non-detects
-            detect = self.data.qual != 'ND'
-            nondet = self.data.qual == 'ND'
-
-            # number results less than or equal to lower DL and non-detect
-            LTE_nondets = self.data[less_thanequal & nondet].shape[0]
-
-            # number of results less than lower DL and detected
-            LT_detects = self.data[less_than & detect].shape[0]
+        # save the fit params to an attribute
+        if useROS:
+            detects = ~self.censored
+            if self.fitlogs:
+                detect_vals = np.log(self.res[detects])
+            else:
+                detect_vals = self.res[detects]
+            self.fit = stats.linregress(rosfit['Zprelim'][detects], detect_vals)
+
+        self.lean = lean
+        if self.lean:
+            # everything else gets rebuilt when it's asked for
+            self._source = dict(data=data, rescol=rescol, qualcol=qualcol,
+                                ndsymbol=ndsymbol, memo=memo)
+            self._data = None
+            self._debug = None
+        else:
+            self._debug = self._debug_frame(newdata, rosfit, useROS)
+            self._data = self._debug[['final_data', 'res', 'qual']]
 
-            # return the sum
-            return LTE_nondets + LT_detects
+    @property
+    def data(self):
+        if self._data is not None:
+            return self._data
 
-        def _C(row):
-            '''
-            Helper function to compute the `C` quantity
-            '''
-            censored_below = self.data.res[self.data.qual == 'ND'] == row['lower']
-            return censored_below.sum()
+        qual = np.where(self.censored, 'ND', '=')
+        return pandas.DataFrame(
+            {'final_data': self.final, 'res': self.res, 'qual': qual},
+            index=self.index, columns=['final_data', 'res', 'qual']
+        )
 
-        # unique values
-        DLs = pandas.unique(self.data.res[self.data.qual == 'ND'])
+    @property
+    def debug(self):
+        if self._debug is not None:
+            return self._debug
 
-        # if there is a results smaller than the minimum detection limit,
-        # add that value to the array
-        if DLs.shape[0] > 0:
-            if self.data.res.min() < DLs.min():
-                DLs = np.hstack([self.data.res.min(), DLs])
+        full = MR(fitlogs=self.fitlogs, dist=self.dist, **self._source)
+        return full.debug
 
-            # create a dataframe
-            DLs = pandas.DataFrame(DLs, columns=['DL'])
+    def append(self, data):
+        '''
+        Adds new results to the estimate without sorting everything
+        again. The estimates, DL table and fit are still re-evaluated
+        for all of the results (an O(N) refit, see `ROSState`). Only
+        available for lean objects (i.e., ``lean=True``).
+
+        Parameters
+        ----------
+        data : pandas DataFrame
+            New results with the same result and qualifier columns as
+            the original dataset. Its index must not overlap the index
+            of the original dataset.
+
+        Returns
+        -------
+        None
+
+        See also
+        --------
+        ROSState
 
-            # copy the DLs in two columns. offset the 2nd (upper) column
-            DLs['lower'] = DLs['DL']
-            if DLs.shape[0] > 1:
-                DLs['upper'] = DLs['DL'].shift(-1)
+        '''
+        if not self.lean:
+            raise ValueError("Only lean MR objects can be appended to")
 
-                # fill in the missing values with infinity
-                DLs.fillna(value=np.inf, inplace=True)
+        source = self._source
+        newdata = data.rename(columns={source['rescol']: 'res',
+                                       source['qualcol']: 'qual'})
+        try:
+            values = np.asarray(newdata['res'].values, dtype=np.float64)
+        except ValueError:
+            raise ValueError('Result data is not uniformly numeric')
+        censored = censored_mask(newdata['qual'], source['ndsymbol'])
+
+        index = self.index.append(newdata.index)
+        if not index.is_unique:
+            raise ValueError("Index of appended `data` must not overlap the "
+                             "existing index")
+
+        # pick up from the sorted arrays and the DL table (minus its
+        # extra row where PE is zero)
+        DLs = self.DLs.iloc[:-1]
+        state = ROSState._from_sorted(
+            self.res, self.censored, DLs['DL'].values,
+            DLs['A'].values.astype(int), DLs['B'].values.astype(int),
+            DLs['C'].values.astype(int), dist=self.dist, fitlogs=self.fitlogs
+        )
+        rosfit = state.append(values, censored)
+
+        self.index = index[rosfit['order']]
+        self.res = rosfit['res']
+        self.censored = rosfit['censored']
+        self.final = rosfit['final']
+        self.N_tot = self.res.shape[0]
+        self.N_nd = int(self.censored.sum())
+        self.DLs = self._DL_table(rosfit)
+
+        if rosfit['mode'][0] == 2:
+            detects = ~self.censored
+            if self.fitlogs:
+                detect_vals = np.log(self.res[detects])
             else:
-                DLs['upper'] = np.inf
-
-            # compute A, B, and C
-            DLs['A'] = DLs.apply(_A, axis=1)
-            DLs['B'] = DLs.apply(_B, axis=1)
-            DLs['C'] = DLs.apply(_C, axis=1)
-
-            # add an extra row
-            DLs = DLs.reindex(range(DLs.shape[0]+1))
-
-            # add the 'PE' column, initialize with zeros
-            DLs['PE'] = 0.0
+                detect_vals = self.res[detects]
+            self.fit = stats.linregress(rosfit['Zprelim'][detects], detect_vals)
+        elif hasattr(self, 'fit'):
+            del self.fit
 
-        else:
-            dl_cols = ['DL', 'lower', 'upper', 'A', 'B', 'C', 'PE']
-            DLs = pandas.DataFrame(np.empty((0,7)), columns=dl_cols)
+        source['data'] = pandas.concat([source['data'], data])
 
-        return DLs
+    def cohn(self):
+        '''
+        Creates an array of unique detection limits in the dataset
+        along with their `A`, `B`, `C`, and `PE` quantities (a copy of
+        `DLs`)
+        '''
+        return self.DLs.copy()
 
     def _ros_ranks(self):
         '''
-        Determine the ranks of the data according to the following logic
-        rank[n] = rank[n-1] + 1 when:
-            n is 0 OR
-            n > 0 and d[n].masked is True and j[n] <> d[n-1] OR
-            n > 0 and d[n].masked is False and d[n-1].masked is True OR
-            n > 0 and d[n].masked is False and d[n-1].masked is False and j[n] <> j[n-1]
-
-        rank[n] = 1
-            n > 0 and d[n].masked is True and j[n] == d[n-1] OR
-            n > 0 and d[n].masked is False and d[n-1].masked is False and j[n] == j[n-1]
-
-        where j[n] is the index of the highest DL that is less than the current data value
-
-        Then the ranks of non-censored equivalent data values are averaged.
+        The "normal" ranks (within each run of the same qualifier and
+        detection limit) and the "averaged" ranks (of detects with equal
+        values) of the sorted data, as columns 'Norm Ranks' and
+        'Avg Ranks'
         '''
-        # get the length of the dataset and initialize the normal (raw) ranks
-        self.data['Norm Ranks'] = float(self.N_tot)
-
-        #norm_ranks = np.ones(self.N_tot, dtype='f2')
-
-        # loop through each value and compare to the previous value
-        # see docstring for more info on the logic behind all this
-        for n, index in enumerate(self.data.index):
-            if n == 0 \
-            or self.data['DLIndex'].iloc[n] != self.data['DLIndex'].iloc[n-1] \
-            or self.data.qual.iloc[n] != self.data.qual.iloc[n-1]:
-                self.data.loc[index, 'Norm Ranks'] = 1
-            else:
-                self.data.loc[index, 'Norm Ranks'] = self.data['Norm Ranks'].iloc[n-1] + 1
-
-        # go through each index and see if the value is a detection
-        # and average the ranks of all equivalent values,
-        def avgrank(r):
-            if r['qual'] != 'ND':
-                index = (self.data.DLIndex == r['DLIndex']) & \
-                        (self.data.res == r['res']) & \
-                        (self.data.qual != 'ND')
-                return self.data['Norm Ranks'][index].mean()
-            else:
-                return r['Norm Ranks']
-
-        self.data['Avg Ranks'] = self.data.apply(avgrank, axis=1)
+        return self.debug[['Norm Ranks', 'Avg Ranks']]
 
     def estimator(self):
         '''
-        Estimates the values of the censored data
+        Estimates the values of the censored data. Returns the sorted
+        data with the plotting positions, Z-scores, and final values
+        (same as `debug`).
         '''
+        return self.debug
 
-        def _ros_plotting_pos(row):
-            '''
-            Helper function to compute the ROS'd plotting position
-            '''
-            dl_1 = self.DLs.iloc[row['DLIndex']]
-            dl_2 = self.DLs.iloc[row['DLIndex']+1]
-            if row['qual'] == 'ND':
-                return (1 - dl_1['PE']) * row['Norm Ranks']/(dl_1['C']+1)
-            else:
-                return (1 - dl_1['PE']) + (dl_1['PE'] - dl_2['PE']) * \
-                        row['Norm Ranks'] / (dl_1['A']+1)
-
-        def _select_final_data(row):
-            '''
-            Helper fucntion to select "final" data from original detects
-            and estimated non-detects
-            '''
-            if row['qual'] == 'ND':
-                return row['modeled_data']
-            else:
-                return row['res']
-
-        def _select_half_DLs(row):
-            '''
-            Helper function to select half DLs when there are too few detects
-            '''
-            if row['qual'] == 'ND':
-                return 0.5 * row['res']
-            else:
-                return row['res']
-
-        # detect/non-detect selectors
-        detect_selector = self.data.qual != 'ND'
-        nondet_selector = self.data.qual == 'ND'
-
-        # if there are no non-detects, just spit everything back out
-        if self.N_nd == 0:
-            self.data['final_data'] = self.data['res']
-
-        # if there are too few detects, use half DL
-        elif self.N_tot - self.N_nd < 2 or self.N_nd/self.N_tot > 0.8:
-            self.data['final_data'] = self.data.apply(_select_half_DLs, axis=1)
-
-        # in most cases, actually use the MR method to estimate NDs
-        else:
-            # compute the PE values
-            for j in self.DLs.index[:-1][::-1]:
-                self.DLs.loc[j, 'PE'] = self.DLs.loc[j+1, 'PE'] + \
-                   self.DLs.loc[j, 'A'] / \
-                   (self.DLs.loc[j, 'A'] + self.DLs.loc[j, 'B']) * \
-                   (1 - self.DLs.loc[j+1, 'PE'])
-
-            # compute the plotting position of the data (uses the PE stuff)
-            self.data['plot_pos'] = self.data.apply(_ros_plotting_pos, axis=1)
-
-            # correctly sort the plotting positions of the ND data:
-            # ND_plotpos = self.data['plot_pos'][self.data['qual'] == 'ND']
-            # ND_plotpos.values.sort()
-
-            # NDs = (self.data.qual == 'ND').index
-            # self.data['plot_pos'].replace(ND_plotpos, inplace=True)
+    def impute(self, M=1000):
+        '''
+        Multiple imputation of the non-detects from the same fit
 
-            # estimate a preliminary value of the Z-scores
-            self.data['Zprelim'] = self.dist.ppf(self.data['plot_pos'])
+        Parameters
+        ----------
+        M : optional int (default = 1000)
+            Number of imputations to generate.
 
-            # fit a line to the logs of the detected data
-            if self.fitlogs:
-                detect_vals = np.log(self.data['res'][detect_selector])
-            else:
-                detect_vals = self.data['res'][detect_selector]
-            fit = stats.linregress(self.data['Zprelim'][detect_selector],
-                                   detect_vals)
+        Returns
+        -------
+        imputations : numpy array
+            M x N array of the final data with the non-detects replaced
+            by their imputations in the same (sorted) order as `final`.
 
-            # save the fit params to an attribute
-            self.fit = fit
+        See also
+        --------
+        ros_impute
 
-            # pull out the slope and intercept for use later
-            slope, intercept = fit[:2]
+        '''
+        return ros_impute(self.res, self.censored, M=M, dist=self.dist,
+                          fitlogs=self.fitlogs)
 
-            # model the data based on the best-fit curve
-            self.data['modeled_data'] = np.exp(
-                slope*self.data['Zprelim'][nondet_selector] + intercept
-            )
+    @staticmethod
+    def _debug_frame(newdata, rosfit, useROS):
+        '''
+        Creates the sorted dataframe of the data with all of the
+        intermediate quantities of the estimation
+        '''
+        # sort the data (NDs first, then by value) and clear out all
+        # of the non-ND quals
+        debug = newdata.iloc[rosfit['order']].copy()
+        debug['qual'] = np.where(rosfit['censored'], 'ND', '=')
+
+        # DL index, ranks, plotting positions, z-scores, and final values
+        debug['DLIndex'] = rosfit['DLIndex']
+        debug['Norm Ranks'] = rosfit['rank']
+        debug['Avg Ranks'] = _average_ranks(rosfit)
+        if useROS:
+            debug['plot_pos'] = rosfit['plot_pos']
+            debug['Zprelim'] = rosfit['Zprelim']
+            debug['modeled_data'] = rosfit['modeled']
+
+        debug['final_data'] = rosfit['final']
+        return debug
+
+    @staticmethod
+    def _DL_table(rosfit):
+        '''
+        Creates a dataframe of the unique detection limits in the dataset
+        and their `A`, `B`, `C`, and `PE` quantities
+        '''
+        dl_cols = ['DL', 'lower', 'upper', 'A', 'B', 'C', 'PE']
+        if rosfit['DL'].shape[0] > 0:
+            DLs = pandas.DataFrame({
+                'DL': rosfit['DL'],
+                'lower': rosfit['DL'],
+                'upper': rosfit['upper'],
+                'A': rosfit['A'],
+                'B': rosfit['B'],
+                'C': rosfit['C'],
+            }, columns=dl_cols[:-1])
+
+            # add an extra row where PE is zero
+            DLs = DLs.reindex(range(DLs.shape[0]+1))
+            DLs['PE'] = np.append(rosfit['PE'], 0.0)
 
-            # select out the final data
-            self.data['final_data'] = self.data.apply(
-                _select_final_data,
-                axis=1
-            )
+        else:
+            DLs = pandas.DataFrame(np.empty((0,7)), columns=dl_cols)
 
-        return self.data
+        return DLs
 
     def plot(self, filename):
         '''
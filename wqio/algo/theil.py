@@ -0,0 +1,300 @@
+from __future__ import division
+
+import numpy as np
+import scipy.stats as stats
+
+
+__all__ = ['theilslopes']
+
+
+# datasets up to this size go straight to scipy (all N^2 slopes)
+_DIRECT_MAX = 1000
+
+# number of random pairs used to bracket each order statistic
+_SAMPLE_SIZE = 20000
+
+
+def _count_inversions(ranks):
+    '''
+    Number of pairs i < j with ``ranks[i] >= ranks[j]``. Bottom-up
+    merge sort where each level is a couple of vectorized binary
+    searches, so it's O(N log^2 N) without any python-level loops over
+    the data.
+    '''
+    vals = np.asarray(ranks, dtype=np.int64).copy()
+    N = vals.shape[0]
+    if N < 2:
+        return 0
+
+    R = vals.max() + 1
+    pos = np.arange(N)
+    count = 0
+    width = 1
+    while width < N:
+        # blocks of `width` are sorted; pair them up (left, right)
+        block = pos // width
+        pair = block // 2
+        left = block % 2 == 0
+        right = ~left
+
+        left_keys = pair[left] * R + vals[left]
+        queries = pair[right] * R + vals[right]
+        ends = np.searchsorted(left_keys, (pair[right] + 1) * R, side='left')
+        count += np.sum(ends - np.searchsorted(left_keys, queries, side='left'))
+
+        # merge each pair of blocks (two sorted runs each)
+        keys = np.sort(pair * R + vals, kind='mergesort')
+        vals = keys - pair * R
+        width *= 2
+
+    return int(count)
+
+
+class _SlopeCounter(object):
+    '''
+    Counts the pairwise slopes (of pairs with different x-values) that
+    are less than or equal to a given value without computing them.
+
+    For x_i < x_j, the slope is <= t if and only if
+    ``y_j - t*x_j <= y_i - t*x_i``, so the count is the number of
+    inversions of ``y - t*x`` when the points are sorted by x.
+    '''
+    def __init__(self, x, y):
+        # sorted by x, then by decreasing y. Within a group of equal
+        # x-values, `y - t*x` is then always decreasing, so every tied
+        # pair counts as an inversion and can simply be subtracted.
+        order = np.lexsort((-y, x))
+        self.x = x[order]
+        self.y = y[order]
+
+        # centering keeps `y - t*x` as precise as possible
+        self.xc = self.x - np.median(x)
+        self.yc = self.y - np.median(y)
+
+        xcounts = np.unique(x, return_counts=True)[1]
+        self.tied_pairs = int(np.sum(xcounts * (xcounts - 1) // 2))
+        N = x.shape[0]
+        self.total = N * (N - 1) // 2 - self.tied_pairs
+
+    def _ranks(self, t):
+        # distinct ranks of `y - t*x`; ties go to the earlier point so
+        # they count as inversions
+        u = self.yc - t * self.xc
+        N = u.shape[0]
+        ranks = np.empty(N, dtype=np.int64)
+        ranks[N - 1 - np.argsort(u[::-1], kind='mergesort')] = np.arange(N)
+        return ranks
+
+    def __call__(self, t):
+        return _count_inversions(self._ranks(t)) - self.tied_pairs
+
+    def between(self, lo, hi, maxpoints=2000):
+        '''
+        The slopes greater than `lo` and less than or equal to `hi`,
+        computed from the pairs of points whose order changes between
+        `lo` and `hi`. None if too many points are involved.
+        '''
+        # order of the points at `lo`; their ranks at `hi`
+        order = np.argsort(self._ranks(lo))
+        v = self._ranks(hi)[order]
+
+        # points that are part of any inversion
+        N = v.shape[0]
+        before = np.concatenate([[-1], np.maximum.accumulate(v)[:-1]])
+        after = np.concatenate([np.minimum.accumulate(v[::-1])[::-1][1:], [N]])
+        points = order[(before > v) | (after < v)]
+        if points.shape[0] > maxpoints:
+            return None
+
+        points = np.sort(points)
+        dx = self.x[points][None, :] - self.x[points][:, None]
+        dy = self.y[points][None, :] - self.y[points][:, None]
+        valid = dx > 0
+        slopes = dy[valid] / dx[valid]
+        return slopes[(slopes > lo) & (slopes <= hi)]
+
+    def nearest(self, lo, hi):
+        '''
+        The actual pairwise slope closest to `hi` among the pairs of
+        neighboring points (sorted at `lo`) that swap places by `hi`.
+        For brackets too narrow to count reliably, e.g. when many pairs
+        share a slope and rounding in ``y - t*x`` moves the count away
+        from it by a few floats.
+        '''
+        order = np.argsort(self._ranks(lo))
+        v = self._ranks(hi)[order]
+        swapped = np.nonzero(v[:-1] > v[1:])[0]
+        a, b = order[swapped], order[swapped + 1]
+        i = np.where(self.x[a] < self.x[b], a, b)
+        j = np.where(self.x[a] < self.x[b], b, a)
+
+        dx = self.x[j] - self.x[i]
+        dy = self.y[j] - self.y[i]
+        valid = dx > 0
+        if not np.any(valid):
+            return hi
+        slopes = dy[valid] / dx[valid]
+        return slopes[np.argmin(np.abs(slopes - hi))]
+
+
+def _float_to_int(t):
+    # monotonic map of floats onto integers (adjacent floats differ by 1)
+    bits = int(np.array(t, dtype=np.float64).view(np.int64))
+    return bits if bits >= 0 else -(bits & 0x7FFFFFFFFFFFFFFF)
+
+
+def _int_to_float(i):
+    if i < 0:
+        i = (-i) | -0x8000000000000000
+    return float(np.array(i, dtype=np.int64).view(np.float64))
+
+
+def _select_slope(counter, k, sample, maxslopes=1000):
+    '''
+    k-th smallest (1-based) pairwise slope. The search is bracketed by
+    the quantiles of a random sample of the slopes and narrowed by
+    counting until few enough slopes are left in the bracket to compute
+    them directly.
+    '''
+    big = np.finfo(np.float64).max
+    q = k / counter.total
+    m = sample.shape[0]
+    margin = 4 * np.sqrt(q * (1 - q) / m) + 1. / m
+
+    lo = np.percentile(sample, 100 * max(q - margin, 0))
+    hi = np.percentile(sample, 100 * min(q + margin, 1))
+    n_lo, n_hi = counter(lo), counter(hi)
+    if n_lo >= k:
+        lo, n_lo = -big, 0
+    if n_hi < k:
+        hi, n_hi = big, counter.total
+
+    interpolate = True
+    while True:
+        if n_hi - n_lo <= maxslopes:
+            slopes = counter.between(lo, hi)
+            if slopes is not None and slopes.shape[0] == n_hi - n_lo:
+                return np.sort(slopes)[k - n_lo - 1]
+
+        # down to adjacent floats, so `hi` itself probably isn't a slope
+        lo_i, hi_i = _float_to_int(lo), _float_to_int(hi)
+        if hi_i - lo_i <= 1:
+            return counter.nearest(lo, hi)
+
+        # alternate between interpolating the counts and bisecting the
+        # floats in between
+        mid = None
+        if interpolate and -big < lo and hi < big:
+            frac = (k - n_lo - 0.5) / (n_hi - n_lo)
+            mid = lo + min(max(frac, 0.01), 0.99) * (hi - lo)
+            if not lo < mid < hi:
+                mid = None
+        if mid is None:
+            mid = _int_to_float((lo_i + hi_i) // 2)
+        interpolate = not interpolate
+
+        n_mid = counter(mid)
+        if n_mid >= k:
+            hi, n_hi = mid, n_mid
+        else:
+            lo, n_lo = mid, n_mid
+
+
+def _theilslopes_counting(y, x, alpha=0.95):
+    '''
+    Theil-Sen estimator that selects the median and confidence slopes
+    by counting instead of computing all N(N-1)/2 slopes. Same output
+    as `scipy.stats.mstats.theilslopes` (up to floating point rounding).
+    '''
+    counter = _SlopeCounter(x, y)
+    nt = counter.total
+    if nt == 0:
+        return np.nan, np.nan, np.nan, np.nan
+
+    # random pairs with different x-values to bracket the search
+    rs = np.random.RandomState(0)
+    i = rs.randint(0, x.shape[0], size=2 * _SAMPLE_SIZE)
+    j = rs.randint(0, x.shape[0], size=2 * _SAMPLE_SIZE)
+    keep = x[i] != x[j]
+    i, j = i[keep][:_SAMPLE_SIZE], j[keep][:_SAMPLE_SIZE]
+    sample = np.sort((y[j] - y[i]) / (x[j] - x[i]))
+
+    def select(k):
+        return _select_slope(counter, k, sample)
+
+    # median
+    if nt % 2 == 1:
+        medslope = select((nt + 1) // 2)
+    else:
+        medslope = 0.5 * (select(nt // 2) + select(nt // 2 + 1))
+    medinter = np.median(y) - medslope * np.median(x)
+
+    # confidence interval (Sen, 1968), exactly as scipy does it
+    if alpha > 0.5:
+        alpha = 1. - alpha
+    z = stats.norm.ppf(alpha / 2.)
+
+    def _ties(values):
+        counts = np.unique(values, return_counts=True)[1]
+        counts = counts[counts > 1]
+        return np.sum(counts * (counts - 1) * (2 * counts + 5))
+
+    ny = y.shape[0]
+    sigsq = 1 / 18. * (ny * (ny - 1) * (2 * ny + 5) - _ties(x) - _ties(y))
+    sigma = np.sqrt(sigsq)
+    Ru = min(int(np.round((nt - z * sigma) / 2.)), nt - 1)
+    Rl = max(int(np.round((nt + z * sigma) / 2.)) - 1, 0)
+
+    return medslope, medinter, select(Rl + 1), select(Ru + 1)
+
+
+def theilslopes(y, x=None, alpha=0.95):
+    '''
+    Theil-Sen estimate of the slope and intercept of a line through
+    (x, y), with the confidence interval of the slope. Small datasets
+    are handed to `scipy.stats.mstats.theilslopes`. Larger datasets
+    never compute all N(N-1)/2 pairwise slopes. Instead, the median and
+    the confidence slopes are selected by counting how many slopes fall
+    below a trial value, which is an inversion count of the data sorted
+    by x. That takes O(N log^2 N) time and O(N) memory.
+
+    Parameters
+    ----------
+    y : array-like
+        Dependent variable.
+
+    x : array-like or None (default)
+        Independent variable. Defaults to ``arange(len(y))``.
+
+    alpha : optional float (default = 0.95)
+        Confidence level of the interval of the slope.
+
+    Returns
+    -------
+    medslope, medintercept, lo_slope, up_slope : floats
+        Same as `scipy.stats.mstats.theilslopes`.
+
+    Notes
+    -----
+    Results of the counting method match scipy to within floating point
+    rounding. Usually the selected slopes are computed exactly like
+    scipy computes them. Masked values are dropped like they are in
+    scipy.
+
+    '''
+    y = np.ma.asarray(y).flatten()
+    if x is None:
+        x = np.ma.arange(len(y), dtype=float)
+    else:
+        x = np.ma.asarray(x).flatten()
+        if len(x) != len(y):
+            raise ValueError("Incompatible lengths ! (%s<>%s)" % (len(y), len(x)))
+
+    mask = np.ma.mask_or(np.ma.getmask(x), np.ma.getmask(y))
+    x = np.ma.masked_array(x, mask=mask).compressed().astype(np.float64)
+    y = np.ma.masked_array(y, mask=mask).compressed().astype(np.float64)
+
+    if x.shape[0] <= _DIRECT_MAX:
+        return tuple(stats.mstats.theilslopes(y, x=x, alpha=alpha))[:4]
+    else:
+        return _theilslopes_counting(y, x, alpha=alpha)
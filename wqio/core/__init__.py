@@ -2,6 +2,7 @@ from .features import (
     Parameter,
     DrainageArea,
     Location,
+    LocationArray,
     Dataset,
     DataCollection
 )
@@ -16,5 +17,10 @@ from . hydro import (
     Storm,
 )
 
+from .snapshot import (
+    save_snapshot,
+    load_snapshot,
+)
+
 from ..testing import NoseWrapper
 test = NoseWrapper().test
@@ -1,5 +1,7 @@
 from __future__ import division
 
+from collections import namedtuple
+
 import numpy as np
 from scipy import stats
 import matplotlib.pyplot as plt
@@ -26,6 +28,13 @@ markers = {
     'Reference Flow': ['D', 'd']
 }
 
+# fields of `Location.describe`
+LocationSummary = namedtuple('LocationSummary', [
+    'N', 'ND', 'NUnique', 'fractionND', 'min', 'pctl10', 'pctl25', 'median',
+    'pctl75', 'pctl90', 'max', 'mean', 'std', 'cov', 'skew', 'logmean',
+    'logstd', 'geomean', 'geostd',
+])
+
 palette = seaborn.color_palette(name='deep', n_colors=3, desat=0.88)
 colors = {
     'Influent': palette[0],
@@ -54,6 +63,16 @@ def _process_p_vals(pval):
     return out
 
 
+def _imputation_spread(stats, alpha=0.05):
+    # mean and percentile spread of a statistic computed on each of the
+    # multiple imputations. This is only the between-imputation
+    # variability (i.e., from the non-detects), not a confidence
+    # interval pooled with Rubin's rules, which would also need the
+    # sampling variance of the statistic within each imputation.
+    interval = np.percentile(stats, [50 * alpha, 100 - 50 * alpha])
+    return np.mean(stats), interval
+
+
 class Parameter(object):
     def __init__(self, name=None, units=None, usingTex=False):
         '''
@@ -197,9 +216,21 @@ class DrainageArea(object):
 
 
 class Location(object):
+    # no per-instance __dict__ (collections hold tens of thousands of these)
+    __slots__ = (
+        'station_type', 'station_name', '_plot_marker', 'scatter_marker',
+        '_color', '_name', '_include', '_definition', '_cache', '_caches',
+        '_bsIter',
+        '_useROS', '_rosBootstrap', '_analyticN', 'rosMemo', '_useKM',
+        '_rosImputations', '_rescol', '_qualcol', '_ndval', '_stratacol',
+        '_raw_data', '_filtered_data',
+    )
+
     def __init__(self, dataframe, rescol='res', qualcol='qual', ndval='ND',
                  bsIter=10000, station_type='inflow', useROS=True,
-                 include=True):
+                 include=True, stratacol=None, rosBootstrap=False,
+                 analyticN=None, rosMemo=None, useKM=False,
+                 rosImputations=None):
         '''
         Object providing convenient access to statics for data
 
@@ -208,7 +239,10 @@ class Location(object):
                 A dataframe that contains at least two columns: one for the
                 analytical values and another for the data qualfiers. Can
                 contain any type of row index, but the column index must be
-                simple (i.e., not a pandas.MultiIndex).
+                simple (i.e., not a pandas.MultiIndex). It is not copied,
+                so don't modify it in place afterwards: the cached
+                statistics won't notice and will be stale. Pass a copy
+                if the frame will keep changing.
 
             rescol : optional string (default = 'res')
                 Name of the column in `dataframe` that contains the analytical
@@ -217,9 +251,10 @@ class Location(object):
             qualcol : optional string (default = 'qual')
                 Name of the column in `dataframe` containing qualifiers.
 
-            ndval : optional string (default = 'ND')
-                The *only* value in the `qualcol` of `dataframe` that indicates
-                that the corresponding value in `rescol` in non-detect
+            ndval : optional string or list of strings (default = 'ND')
+                The value (or values, e.g. ['ND', '<', 'U']) in the
+                `qualcol` of `dataframe` that indicate that the
+                corresponding value in `rescol` in non-detect
 
             bsIter : optional int (default = 1e4)
                 Number of interations to use when using a bootstrap algorithm
@@ -236,6 +271,46 @@ class Location(object):
                 Toggles the inclusion of the location in figures generated
                 from `Datasets` compruised of this location
 
+            stratacol : optional string or None (default)
+                Name of the column (or index level) in `dataframe` that
+                assigns each result to a stratum (e.g., season or water
+                year). When provided, the bootstrapped statistics resample
+                within each stratum.
+
+            rosBootstrap : optional bool (default = False)
+                When True (and `useROS` is True), the bootstrapped
+                statistics resample the raw results and qualifiers and
+                re-estimate the non-detects of every resample with ROS
+                so that the confidence intervals include the uncertainty
+                of the censored values.
+
+            analyticN : optional int or None (default)
+                Minimum number of results for which the confidence
+                intervals of the mean, median, and log-mean are computed
+                analytically (Student's t and binomial order-statistic
+                intervals) instead of bootstrapped. When None, the
+                intervals are always bootstrapped.
+
+            rosMemo : optional algo.ros.ROSMemo or None (default)
+                Memo through which the ROS estimates are computed so that
+                the same data are never estimated twice (e.g., across
+                Locations, DataCollections, or after toggling `useROS`).
+
+            useKM : optional bool (default = False)
+                When True, the mean, standard deviation, median, and
+                percentiles are those of the Kaplan-Meier estimate of the
+                raw results and qualifiers (see `algo.km.KaplanMeier`)
+                instead of being computed from `self.data`. The confidence
+                intervals of the mean and median are bootstrapped from the
+                Kaplan-Meier estimate as well (see
+                `algo.bootstrap.KMStat`).
+
+            rosImputations : optional int or None (default)
+                Number of stochastic imputations of the non-detects to
+                generate from the ROS fit (see `algo.ros.MR.impute`) so
+                that statistics can be pooled across them with
+                `self.pooled_stat`. Only used when `useROS` is True.
+
         General Attributes:
             .station_type (string) : Same as input
             .station_name (string) : 'Influent' or 'Effluent' depending on
@@ -246,13 +321,33 @@ class Location(object):
                 in comparitive scatter plot methods
             .color (string) : matplotlib color for plotting
             .filtered_data (pandas.DataFrame) : full dataset with qualifiers
-            .ros (algo.ros.MR) : MR object of the ROS'd values
-            .data (pandas.Series) : Final data for use in stats and plotting
-                based on `useROS` (no qualiers)
+            .censored (numpy array) : True where `filtered_data` is a
+                non-detect
+            .ros (algo.ros.MR) : lean MR object of the ROS'd values
+            .data (numpy array) : Final data for use in stats and plotting
+                based on `useROS` (no qualiers). Shared with the cached
+                ROS estimate (or the input dataframe); copy it before
+                modifying it.
             .full_data (pandas.DataFrame) : Representation of `self.data`
                 that maintains the qualifiers associated with each result.
+            .strata (numpy array) : Stratum of each value in `self.data`
+                (None if `stratacol` was not provided)
             .bsIter (int) : Same as input
-            .useROS (bool) : Same as input
+            .useROS (bool) : Same as input. Switching it (or `useKM`)
+                keeps the stats already computed in the other mode.
+            .rosBootstrap (bool) : Same as input
+            .analyticN (int) : Same as input
+            .ci_method (string) : 'bootstrap' or 'analytic', depending on
+                how the confidence intervals of the mean, median, and
+                log-mean were computed. The intervals of the standard
+                deviations (and all of them when `useKM` is True) are
+                always bootstrapped.
+            .rosMemo (algo.ros.ROSMemo) : Same as input
+            .useKM (bool) : Same as input
+            .km (algo.km.KaplanMeier) : Kaplan-Meier estimate of the data
+            .rosImputations (int) : Same as input
+            .imputations (numpy array) : `rosImputations` x N array of
+                the data with stochastic imputations of the non-detects
             .include (bool) : Same as input
             .exclude (bool) : Opposite of `.include`
 
@@ -303,19 +398,38 @@ class Location(object):
         self._include = include
         self._definition = {}
 
-        # parameters of the stats analysis
-        self._cache = resettable_cache()
-
         # properties of the dataframe and analysis
         self._bsIter = bsIter
         self._useROS = useROS
+        self._rosBootstrap = rosBootstrap
+        self._analyticN = analyticN
+        self.rosMemo = rosMemo
+        self._useKM = useKM
+        self._rosImputations = rosImputations
         self._rescol = rescol
         self._qualcol = qualcol
         self._ndval = ndval
+        self._stratacol = stratacol
+
+        # cached stats, one set for each analysis mode (see `_mode`)
+        self._caches = {}
+        self._switch_cache()
 
-        # original data and quantity
+        # original data and quantity. `dataframe` is not copied: it's
+        # only ever replaced (e.g., by setting `filtered_data`), never
+        # modified in place.
         self._raw_data = dataframe
-        self._filtered_data = self._raw_data.copy()
+        self._filtered_data = None
+
+    # slots without a __getstate__ can't be pickled with protocols 0 and
+    # 1 on python 2
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__
+                    if hasattr(self, name))
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
 
     @property
     def color(self):
@@ -337,15 +451,67 @@ class Location(object):
     @bsIter.setter
     def bsIter(self, value):
         self._bsIter = value
-        self._cache.clear()
+        self._reset_caches()
 
     @property
     def useROS(self):
         return self._useROS
     @useROS.setter
     def useROS(self, value):
-        self._cache.clear()
         self._useROS = value
+        self._switch_cache()
+
+    @property
+    def rosBootstrap(self):
+        return self._rosBootstrap
+    @rosBootstrap.setter
+    def rosBootstrap(self, value):
+        self._reset_caches()
+        self._rosBootstrap = value
+
+    @property
+    def analyticN(self):
+        return self._analyticN
+    @analyticN.setter
+    def analyticN(self, value):
+        self._reset_caches()
+        self._analyticN = value
+
+    @property
+    def useKM(self):
+        return self._useKM
+    @useKM.setter
+    def useKM(self, value):
+        self._useKM = value
+        self._switch_cache()
+
+    @property
+    def rosImputations(self):
+        return self._rosImputations
+    @rosImputations.setter
+    def rosImputations(self, value):
+        self._reset_caches()
+        self._rosImputations = value
+
+    @property
+    def _mode(self):
+        return (self._useROS, self._useKM)
+
+    def _switch_cache(self):
+        '''
+        Activates the cache of the current analysis mode. The caches of
+        the other modes are kept so switching back doesn't recompute.
+        '''
+        if self._mode not in self._caches:
+            self._caches[self._mode] = resettable_cache()
+        self._cache = self._caches[self._mode]
+
+    def _reset_caches(self):
+        '''
+        Discards the cached stats of every analysis mode.
+        '''
+        self._caches.clear()
+        self._switch_cache()
 
     @property
     def filtered_data(self):
@@ -355,17 +521,64 @@ class Location(object):
             return self._filtered_data
     @filtered_data.setter
     def filtered_data(self, value):
-        self._cache.clear()
+        self._reset_caches()
         self._filtered_data = value
 
+    def append(self, dataframe):
+        '''
+        Adds new results to the Location.
+
+        The new results are added to both the raw and filtered data
+        (i.e., any filter previously applied to `filtered_data` is not
+        applied to them). All of the cached statistics (bootstrapped
+        intervals included) are reset and recomputed from all of the
+        data when they're needed again. An existing ROS estimate (from
+        any analysis mode) is updated with `algo.ros.MR.append`, which
+        refits every result but skips the sort. Nothing changes if the
+        new results can't be added.
+
+        Input:
+            dataframe : pandas.DataFrame
+                New results with the same columns as the original
+                dataframe and an index that doesn't overlap its index.
+        '''
+        overlap = self._raw_data.index.isin(dataframe.index).any()
+        if overlap or not dataframe.index.is_unique:
+            raise ValueError("Index of appended `dataframe` must be unique "
+                             "and not overlap the existing index")
+
+        ros, rosmode = None, None
+        for mode, cache in self._caches.items():
+            if mode[0] and 'ros' in cache:
+                ros, rosmode = cache['ros'], mode
+                break
+
+        raw_data = pandas.concat([self._raw_data, dataframe])
+        filtered_data = None
+        if self._filtered_data is not None:
+            filtered_data = pandas.concat([self._filtered_data, dataframe])
+
+        # this can still reject the results (e.g., non-positive values),
+        # so it goes before anything is changed
+        if ros is not None:
+            ros.append(dataframe)
+
+        self._raw_data = raw_data
+        self._filtered_data = filtered_data
+        self._reset_caches()
+
+        if ros is not None:
+            if rosmode not in self._caches:
+                self._caches[rosmode] = resettable_cache()
+            self._caches[rosmode]['ros'] = ros
+
     @property
     def data(self):
         if self.hasData:
             if self.useROS:
-               output = self.ros.data['final_data']
+                return self.ros.final
             else:
-                output = self.filtered_data[self._rescol]
-            return output.values
+                return self.filtered_data[self._rescol].values
 
     @property
     def full_data(self):
@@ -420,9 +633,14 @@ class Location(object):
         if self.hasData:
             return self.min > 0
 
+    @cache_readonly
+    def censored(self):
+        return algo.ros.censored_mask(self.filtered_data[self._qualcol],
+                                      self._ndval)
+
     @cache_readonly
     def ND(self):
-        return (self.filtered_data[self._qualcol] == self._ndval).sum()
+        return self.censored.sum()
 
     @cache_readonly
     def NUnique(self):
@@ -435,7 +653,40 @@ class Location(object):
     @cache_readonly
     def ros(self):
         if self.hasData:
-            return algo.ros.MR(self.filtered_data, rescol=self._rescol, qualcol=self._qualcol)
+            return algo.ros.MR(self.filtered_data, rescol=self._rescol,
+                               qualcol=self._qualcol, ndsymbol=self._ndval,
+                               memo=self.rosMemo, lean=True)
+
+    @cache_readonly
+    def km(self):
+        if self.hasData:
+            return algo.km.KaplanMeier(
+                self.filtered_data[self._rescol].values, self.censored
+            )
+
+    @cache_readonly
+    def imputations(self):
+        if self.hasData and self.useROS and self.rosImputations is not None:
+            return self.ros.impute(M=self.rosImputations)
+
+    @cache_readonly
+    def strata(self):
+        if self.hasData and self._stratacol is not None:
+            data = self.filtered_data
+            if self.useROS:
+                data = data.loc[self.ros.index]
+            return self._get_strata(data)
+
+    @cache_readonly
+    def ci_method(self):
+        # only the (log-)mean and median have analytic intervals, and
+        # not for the Kaplan-Meier estimates
+        if self.hasData:
+            if (not self.useKM and self.analyticN is not None and
+                    self.N >= self.analyticN):
+                return 'analytic'
+            else:
+                return 'bootstrap'
 
     @cache_readonly
     def pnorm(self):
@@ -472,12 +723,12 @@ class Location(object):
     @cache_readonly
     def min_detect(self):
         if self.hasData:
-            return self._filtered_data[self._rescol][self._filtered_data[self._qualcol] != self._ndval].min()
+            return self.filtered_data[self._rescol][~self.censored].min()
 
     @cache_readonly
     def min_DL(self):
         if self.hasData:
-            return self._filtered_data[self._rescol][self._filtered_data[self._qualcol] == self._ndval].min()
+            return self.filtered_data[self._rescol][self.censored].min()
 
     @cache_readonly
     def max(self):
@@ -492,27 +743,37 @@ class Location(object):
     @cache_readonly
     def pctl10(self):
         if self.hasData:
+            if self.useKM:
+                return self.km.percentile(10)
             return stats.scoreatpercentile(self.data, 10)
 
     @cache_readonly
     def pctl25(self):
         if self.hasData:
+            if self.useKM:
+                return self.km.percentile(25)
             return stats.scoreatpercentile(self.data, 25)
 
     @cache_readonly
     def pctl75(self):
         if self.hasData:
+            if self.useKM:
+                return self.km.percentile(75)
             return stats.scoreatpercentile(self.data, 75)
 
     @cache_readonly
     def pctl90(self):
         if self.hasData:
+            if self.useKM:
+                return self.km.percentile(90)
             return stats.scoreatpercentile(self.data, 90)
 
     # stats that we need
     @cache_readonly
     def median(self):
         if self.hasData:
+            if self.useKM:
+                return self.km.median
             return self._median_boostrap[0]
 
     @cache_readonly
@@ -523,6 +784,8 @@ class Location(object):
     @cache_readonly
     def mean(self):
         if self.hasData:
+            if self.useKM:
+                return self.km.mean
             return self._mean_boostrap[0]
 
     @cache_readonly
@@ -533,6 +796,8 @@ class Location(object):
     @cache_readonly
     def std(self):
         if self.hasData:
+            if self.useKM:
+                return self.km.std
             return np.std(self.data)
 
     @cache_readonly
@@ -568,30 +833,189 @@ class Location(object):
             return None
 
     # helper bootstrap objects
+    def _get_strata(self, data):
+        if self._stratacol in data.columns:
+            return data[self._stratacol].values
+        else:
+            return data.index.get_level_values(self._stratacol).values
+
+    def _bootstrap(self, statfxn, log=False):
+        if self.useROS and self.rosBootstrap:
+            data = self.filtered_data
+            strata = None
+            if self._stratacol is not None:
+                strata = self._get_strata(data)
+
+            bs = algo.bootstrap.ROSStat(
+                data[self._rescol].values, self.censored,
+                statfxn=statfxn, NIter=self.bsIter, strata=strata,
+                transform=np.log if log else None
+            )
+        else:
+            data = np.log(self.data) if log else self.data
+            bs = algo.bootstrap.Stat(data, statfxn, NIter=self.bsIter,
+                                     strata=self.strata)
+        return bs.BCA()
+
+    def _km_bootstrap(self, statistic):
+        strata = None
+        if self._stratacol is not None:
+            strata = self._get_strata(self.filtered_data)
+
+        bs = algo.bootstrap.KMStat(
+            self.filtered_data[self._rescol].values, self.censored,
+            statistic=statistic, NIter=self.bsIter, strata=strata
+        )
+        return bs.BCA()
+
     @cache_readonly
     def _median_boostrap(self):
         if self.hasData:
-            return algo.bootstrap.Stat(self.data, np.median, NIter=self.bsIter).BCA()
+            if self.useKM:
+                return self._km_bootstrap('median')
+            if self.ci_method == 'analytic':
+                return algo.bootstrap.median_interval(self.data)
+            return self._bootstrap(np.median)
 
     @cache_readonly
     def _mean_boostrap(self):
         if self.hasData:
-            return algo.bootstrap.Stat(self.data, np.mean, NIter=self.bsIter).BCA()
+            if self.useKM:
+                return self._km_bootstrap('mean')
+            if self.ci_method == 'analytic':
+                return algo.bootstrap.t_interval(self.data)
+            return self._bootstrap(np.mean)
 
     @cache_readonly
     def _std_boostrap(self):
         if self.hasData:
-            return algo.bootstrap.Stat(self.data, np.std, NIter=self.bsIter).BCA()
+            if self.useKM:
+                return self._km_bootstrap('std')
+            return self._bootstrap(np.std)
 
     @cache_readonly
     def _logmean_boostrap(self):
         if self.all_positive and self.hasData:
-            return algo.bootstrap.Stat(np.log(self.data), np.mean, NIter=self.bsIter).BCA()
+            if self.ci_method == 'analytic':
+                return algo.bootstrap.t_interval(np.log(self.data))
+            return self._bootstrap(np.mean, log=True)
 
     @cache_readonly
     def _logstd_boostrap(self):
         if self.all_positive and self.hasData:
-            return algo.bootstrap.Stat(np.log(self.data), np.std, NIter=self.bsIter).BCA()
+            return self._bootstrap(np.std, log=True)
+
+    def describe(self):
+        '''
+        Computes all of the summary statistics at once
+
+        The data are sorted once, all of the percentiles are interpolated
+        from the sorted array, and the moments of the data and their logs
+        are computed in the same pass. The results are also stored as the
+        corresponding individual attributes (e.g., `self.pctl25`) so
+        they aren't computed again.
+
+        Input:
+            None
+
+        Returns:
+            summary : LocationSummary (namedtuple)
+                N, ND, NUnique, fractionND, min, pctl10, pctl25, median,
+                pctl75, pctl90, max, mean, std, cov, skew, logmean,
+                logstd, geomean, and geostd. The mean and median are the
+                sample statistics (the attributes of the same name are
+                the bootstrapped estimates unless the confidence
+                intervals are analytic). Log statistics are None if any
+                data are non-positive. None if there are no data.
+        '''
+        if not self.hasData:
+            return None
+
+        x = np.sort(self.data)
+        N = x.shape[0]
+
+        # linearly interpolated percentiles (same as np.percentile)
+        position = np.array([10, 25, 50, 75, 90]) / 100. * (N - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, N - 1)
+        frac = position - lower
+        pctls = x[lower] + frac * (x[upper] - x[lower])
+
+        # moments
+        mean = x.mean()
+        dev = x - mean
+        m2 = np.mean(dev ** 2)
+        m3 = np.mean(dev ** 3)
+        std = np.sqrt(m2)
+        skew = m3 / m2 ** 1.5 if m2 > 0 else 0.0
+
+        stats = dict(
+            N=N, ND=self.ND, fractionND=self.ND / N,
+            NUnique=int(np.sum(x[1:] != x[:-1])) + 1,
+            min=x[0], max=x[-1], all_positive=x[0] > 0,
+            pctl10=pctls[0], pctl25=pctls[1], pctl75=pctls[3],
+            pctl90=pctls[4], std=std, cov=std / mean, skew=skew,
+            logmean=None, logstd=None, geomean=None, geostd=None,
+        )
+        if x[0] > 0:
+            logs = np.log(x)
+            stats['logmean'] = logs.mean()
+            stats['logstd'] = logs.std()
+            stats['geomean'] = np.exp(stats['logmean'])
+            stats['geostd'] = np.exp(stats['logstd'])
+
+        if self.useKM:
+            stats.update(
+                pctl10=self.km.percentile(10), pctl25=self.km.percentile(25),
+                pctl75=self.km.percentile(75), pctl90=self.km.percentile(90),
+                std=self.km.std,
+            )
+            mean, median = self.km.mean, self.km.median
+        else:
+            median = pctls[2]
+
+        # the point estimates only match the attributes when they
+        # don't come from the bootstrap
+        if self.useKM or self.ci_method == 'analytic':
+            stats.update(mean=mean, median=median)
+
+        for key, value in stats.items():
+            if value is not None:
+                self._cache.setdefault(key, value)
+
+        stats.update(mean=mean, median=median)
+        stats.pop('all_positive')
+        return LocationSummary(**stats)
+
+    def pooled_stat(self, statfxn, alpha=0.05):
+        '''
+        Pools a statistic across the multiple imputations of the data
+
+        Input:
+            statfxn : callable
+                Function computing the statistic. Like numpy's reductions
+                (e.g., `np.median`), it must accept an `axis` keyword.
+
+            alpha : optional float (default = 0.05)
+                The interval is the `alpha/2` and `1 - alpha/2`
+                percentiles of the statistic across the imputations.
+
+        Returns:
+            stat : float
+                Mean of the statistic across the imputations.
+
+            interval : numpy array
+                Lower and upper bounds of the statistic across the
+                imputations. This is the spread due to the imputed
+                non-detects alone, not a confidence interval of the
+                statistic (the sampling variability of the data isn't
+                included).
+        '''
+        if self.imputations is None:
+            raise ValueError("`useROS` must be True and `rosImputations` "
+                             "must be set to pool statistics")
+
+        return _imputation_spread(statfxn(self.imputations, axis=1), alpha)
 
     def boxplot_stats(self, log=True, bacteria=False):
         bxpstats = {
@@ -882,8 +1306,8 @@ class Location(object):
                     markerfacecolor=self.color, markeredgecolor='white',
                     linestyle='none', alpha=alpha)
         else:
-            y_nondet = self.filtered_data[self._rescol][self.filtered_data[self._qualcol]==self._ndval]
-            y_detect = self.filtered_data[self._rescol][self.filtered_data[self._qualcol]!=self._ndval]
+            y_nondet = self.filtered_data[self._rescol][self.censored]
+            y_detect = self.filtered_data[self._rescol][~self.censored]
 
             ax.plot(xvals[:self.ND], y_nondet, marker='v', markersize=markersize,
                     markerfacecolor='none', markeredgecolor=self.color,
@@ -931,6 +1355,314 @@ class Location(object):
         self.include = include
 
 
+def _pair_positions(left, right):
+    '''
+    Positions of the rows of two indexes that have the same label, in
+    sorted order of the labels (like an inner join of the two). The
+    labels are factorized together and the resulting integer keys are
+    merged with binary searches, so nothing gets copied.
+    '''
+    codes = pandas.factorize(left.append(right).values, sort=True)[0]
+    lkeys, rkeys = codes[:len(left)], codes[len(left):]
+    if lkeys.shape[0] == 0 or rkeys.shape[0] == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty.copy()
+
+    lorder = np.argsort(lkeys, kind='mergesort')
+    rorder = np.argsort(rkeys, kind='mergesort')
+    lsorted = lkeys[lorder]
+    rsorted = rkeys[rorder]
+
+    match = np.minimum(np.searchsorted(lsorted, rsorted), lsorted.shape[0] - 1)
+    found = lsorted[match] == rsorted
+    return lorder[match[found]], rorder[found]
+
+
+_DATASET_STATS = [
+    'n_pairs', 'wilcoxon_z', 'wilcoxon_p', 'mannwhitney_u', 'mannwhitney_p',
+    'kendall_tau', 'kendall_p', 'spearman_rho', 'spearman_p', 'ttest_t',
+    'ttest_p', 'levene_ks', 'levene_p', 'theil_medslope', 'theil_intercept',
+    'theil_loslope', 'theil_hislope'
+]
+
+
+def _dataset_tests(inputs):
+    '''
+    All of the hypothesis tests of a single Dataset, computed the same
+    way the Dataset properties compute them. `inputs` is a tuple of
+    plain arrays and flags (see `DataCollection._dataset_test_inputs`)
+    so that this can be handed off to a worker process.
+    '''
+    infl, effl, pinfl, peffl, paired, correlate, inverted = inputs
+    result = dict.fromkeys(_DATASET_STATS, np.nan)
+    result['n_pairs'] = pinfl.shape[0]
+
+    if infl is None or effl is None:
+        return result
+
+    result['mannwhitney_u'], p = stats.mannwhitneyu(infl, effl)
+    result['mannwhitney_p'] = p * 2.0
+    result['ttest_t'], result['ttest_p'] = stats.ttest_ind(infl, effl,
+                                                           equal_var=False)
+    result['levene_ks'], result['levene_p'] = stats.levene(infl, effl,
+                                                           center='median')
+    if not paired:
+        return result
+
+    # the Mann-Whitney and Wilcoxon tests rank different things (the
+    # pooled, unpaired results and the absolute paired differences) than
+    # the rank correlations below, so they rank their own data
+    result['wilcoxon_z'], result['wilcoxon_p'] = \
+        stats.wilcoxon(np.log(pinfl), np.log(peffl))
+
+    if correlate:
+        # rank once for both of the rank correlations (kendall's tau
+        # doesn't change when the data are replaced by their ranks)
+        rinfl = stats.rankdata(pinfl)
+        reffl = stats.rankdata(peffl)
+        result['kendall_tau'], result['kendall_p'] = \
+            stats.kendalltau(rinfl, reffl)
+
+        N = rinfl.shape[0]
+        rho = np.corrcoef(rinfl, reffl)[0, 1]
+        with np.errstate(divide='ignore'):
+            t = rho * np.sqrt((N - 2) / ((rho + 1.0) * (1.0 - rho)))
+        result['spearman_rho'] = rho
+        result['spearman_p'] = 2 * stats.t.sf(np.abs(t), N - 2)
+
+        if not inverted:
+            theil = algo.theil.theilslopes(peffl, x=pinfl)
+            result['theil_medslope'] = theil[0]
+            result['theil_intercept'] = theil[1]
+            result['theil_loslope'] = theil[2]
+            result['theil_hislope'] = theil[3]
+        else:
+            theil = algo.theil.theilslopes(pinfl, x=peffl)
+            result['theil_medslope'] = 1 / theil[0]
+            result['theil_intercept'] = -1 * theil[1] / theil[0]
+            result['theil_loslope'] = 1 / theil[2]
+            result['theil_hislope'] = 1 / theil[3]
+
+    return result
+
+
+class LocationArray(object):
+    '''Columnar collection of the data of many locations
+    The results of every location are concatenated into a single array
+    (sorted within each location) with the offsets of where each
+    location starts, so stats of all of the locations can be computed
+    at once instead of one Location at a time.
+
+    Parameters
+    ----------
+    values : array-like of floats
+        The concatenated results of all of the locations.
+
+    offsets : array-like of ints
+        Position in `values` where each location starts, followed by
+        the total number of values (i.e., location `k` is
+        ``values[offsets[k]:offsets[k+1]]``).
+
+    labels : optional sequence or None (default)
+        Label of each location. Defaults to their positions.
+
+    Attributes
+    ----------
+    values : numpy array
+        The results, sorted within each location.
+
+    offsets, N : numpy arrays
+        Start of each location in `values` and their number of results.
+
+    labels : list
+
+    See also
+    --------
+    LocationArray.from_locations, LocationArray.from_dataframe
+
+    '''
+
+    def __init__(self, values, offsets, labels=None):
+        values = np.asarray(values, dtype=np.float64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if offsets.ndim != 1 or offsets.shape[0] < 1 or offsets[0] != 0 or \
+                offsets[-1] != values.shape[0] or np.any(np.diff(offsets) < 0):
+            raise ValueError('`offsets` must increase from 0 to the number '
+                             'of values')
+
+        self.offsets = offsets
+        self.N = np.diff(offsets)
+        self._groups = np.repeat(np.arange(self.N.shape[0]), self.N)
+
+        order = np.lexsort((values, self._groups))
+        self.values = values[order]
+
+        if labels is None:
+            labels = list(range(self.N.shape[0]))
+        elif len(labels) != self.N.shape[0]:
+            raise ValueError('need one label for each location')
+        self.labels = list(labels)
+
+    @classmethod
+    def from_locations(cls, locations):
+        '''
+        Collects the data (i.e., `Location.data`) of Location objects.
+        Labels are the names of the locations.
+        '''
+        arrays = [np.asarray(loc.data if loc.hasData else [], dtype=np.float64)
+                  for loc in locations]
+        N = [a.shape[0] for a in arrays]
+        offsets = np.concatenate([[0], np.cumsum(N)]).astype(np.int64)
+        values = np.concatenate(arrays) if arrays else np.zeros(0)
+        return cls(values, offsets, labels=[loc.name for loc in locations])
+
+    @classmethod
+    def from_dataframe(cls, dataframe, groupcols, rescol='res'):
+        '''
+        Collects the results of every group of a tidy dataframe. Labels
+        are the group names (sorted like `groupby` would sort them).
+        '''
+        codes, index = algo.ros._group_codes(dataframe, groupcols)
+        order = np.argsort(codes, kind='mergesort')
+        N = np.bincount(codes, minlength=len(index))
+        offsets = np.concatenate([[0], np.cumsum(N)]).astype(np.int64)
+        values = dataframe[rescol].values[order]
+        return cls(values, offsets, labels=list(index))
+
+    def __len__(self):
+        return self.N.shape[0]
+
+    def data(self, k):
+        ''' Sorted results of the `k`-th location '''
+        return self.values[self.offsets[k]:self.offsets[k+1]]
+
+    def percentile(self, p, values=None):
+        '''
+        Percentile (0-100) of every location, interpolated linearly like
+        `scipy.stats.scoreatpercentile`. Locations without data are NaN.
+        '''
+        if values is None:
+            values = self.values
+
+        N = self.N
+        has = N > 0
+        start = self.offsets[:-1]
+        position = p / 100. * np.maximum(N - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        frac = position - lower
+
+        lo = np.where(has, start + lower, 0)
+        hi = np.where(has, start + np.minimum(lower + 1, N - 1), 0)
+        if values.shape[0] == 0:
+            return np.full(N.shape[0], np.nan)
+        pctl = values[lo] + frac * (values[hi] - values[lo])
+        return np.where(has, pctl, np.nan)
+
+    def boxplot_stats(self, log=True, bacteria=False):
+        '''
+        Boxplot stats of every location at once
+
+        Parameters
+        ----------
+        log : optional bool (default = True)
+            Determine the whiskers and fliers from the logs of the data
+            (like `Location.boxplot_stats`).
+
+        bacteria : optional bool (default = False)
+            Use the geometric mean instead of the arithmetic mean.
+
+        Returns
+        -------
+        bxpstats : list of dicts
+            One dict per location that can be passed directly to
+            `matplotlib.axes.Axes.bxp`. Locations without data are
+            skipped.
+
+        Notes
+        -----
+        Unlike `Location.boxplot_stats`, the notches (`cilo`, `cihi`)
+        are the usual analytical approximation of the confidence
+        interval of the median (med +/- 1.57 IQR / sqrt(N)) rather than
+        bootstrapped, and the median is the sample median.
+
+        '''
+        N = self.N
+        has = N > 0
+        groups = self._groups
+        start = self.offsets[:-1]
+        stop = self.offsets[1:]
+
+        q1 = self.percentile(25)
+        med = self.percentile(50)
+        q3 = self.percentile(75)
+        iqr = q3 - q1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            notch = 1.57 * iqr / np.sqrt(N)
+
+            if bacteria:
+                logsum = np.bincount(groups, weights=np.log(self.values),
+                                     minlength=N.shape[0])
+                mean = np.exp(logsum / N)
+            else:
+                mean = np.bincount(groups, weights=self.values,
+                                   minlength=N.shape[0]) / N
+
+            if log:
+                y = np.log(self.values)
+                yq1, yq3 = np.log(q1), np.log(q3)
+                transformout = np.exp
+            else:
+                y = self.values
+                yq1, yq3 = q1, q3
+                transformout = lambda x: x
+
+        # whiskers: the most extreme values within 1.5 IQR of the box,
+        # but never inside the box. The data are sorted, so these are
+        # found by counting.
+        yiqr = yq3 - yq1
+        loval = yq1 - 1.5 * yiqr
+        hival = yq3 + 1.5 * yiqr
+        nbelow = np.bincount(groups, weights=y < loval[groups],
+                             minlength=N.shape[0]).astype(np.int64)
+        nabove = np.bincount(groups, weights=y > hival[groups],
+                             minlength=N.shape[0]).astype(np.int64)
+
+        last = max(y.shape[0] - 1, 0)
+        lo_idx = np.minimum(start + nbelow, last)
+        hi_idx = np.maximum(np.minimum(stop - nabove - 1, last), 0)
+        if y.shape[0] > 0:
+            ylo, yhi = y[lo_idx], y[hi_idx]
+        else:
+            ylo = yhi = np.full(N.shape[0], np.nan)
+        whislo = np.where((nbelow >= N) | (ylo > yq1), yq1, ylo)
+        whishi = np.where((nabove >= N) | (yhi < yq3), yq3, yhi)
+
+        fliers = (y < whislo[groups]) | (y > whishi[groups])
+        flier_groups = np.split(transformout(y[fliers]),
+                                np.cumsum(np.bincount(groups[fliers],
+                                                      minlength=N.shape[0]))[:-1])
+
+        whislo = transformout(whislo)
+        whishi = transformout(whishi)
+
+        bxpstats = []
+        for k in np.flatnonzero(has):
+            bxpstats.append({
+                'label': self.labels[k],
+                'mean': mean[k],
+                'med': med[k],
+                'q1': q1[k],
+                'q3': q3[k],
+                'cilo': med[k] - notch[k],
+                'cihi': med[k] + notch[k],
+                'whislo': whislo[k],
+                'whishi': whishi[k],
+                'fliers': flier_groups[k],
+            })
+
+        return bxpstats
+
+
 class Dataset(object):
     # TODO: constructor should take dataframe, and build Location object,
     # not the other way around. This will allow Dataset.influent = None
@@ -948,27 +1680,40 @@ class Dataset(object):
         self._include = None
         self._useROS = useROS
         self._definition = {}
-        self._cache = resettable_cache()
+        self._caches = {}
 
     @property
     def useROS(self):
         return self._useROS
     @useROS.setter
     def useROS(self, value):
-        self._cache.clear()
         self.influent.useROS = value
         self.effluent.useROS = value
         self._useROS = value
 
+    @property
+    def _cache(self):
+        '''
+        Cached stats of the current analysis modes of the influent and
+        effluent. The caches of the other modes are kept so switching
+        back doesn't recompute.
+        '''
+        mode = tuple(getattr(loc, '_mode', None)
+                     for loc in (self.influent, self.effluent))
+        if mode not in self._caches:
+            self._caches[mode] = resettable_cache()
+        return self._caches[mode]
+
     @cache_readonly
     def data(self):
         if self.effluent.hasData:
-            effl = self.effluent._raw_data.copy()
+            effl = self.effluent._raw_data
         else:
             raise ValueError("effluent must have data")
 
+        # (adding the column level copies the frames)
         if self.influent.hasData:
-            infl = self.influent._raw_data.copy()
+            infl = self.influent._raw_data
         else:
             infl = pandas.DataFrame(
                 index=self.effluent._raw_data.index,
@@ -979,17 +1724,75 @@ class Dataset(object):
         effl = utils.addSecondColumnLevel('outflow', 'station', effl)
         return infl.join(effl, how='outer')
 
+    @cache_readonly
+    def _paired_positions(self):
+        # rows of the influent and effluent raw data that pair up (same
+        # index label and no missing values in either)
+        if not self.effluent.hasData:
+            raise ValueError("effluent must have data")
+
+        effl = self.effluent._raw_data
+        if not self.influent.hasData:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty.copy()
+
+        infl = self.influent._raw_data
+        if infl.index.is_unique and effl.index.is_unique:
+            ipos, epos = _pair_positions(infl.index, effl.index)
+        else:
+            # duplicate labels pair up every which way
+            pairs = pandas.merge(
+                pandas.DataFrame({'infl': np.arange(infl.shape[0])},
+                                 index=infl.index),
+                pandas.DataFrame({'effl': np.arange(effl.shape[0])},
+                                 index=effl.index),
+                left_index=True, right_index=True, how='inner'
+            ).sort_index()
+            ipos, epos = pairs['infl'].values, pairs['effl'].values
+
+        complete = (infl.notnull().all(axis=1).values[ipos] &
+                    effl.notnull().all(axis=1).values[epos])
+        return ipos[complete], epos[complete]
+
+    @cache_readonly
+    def paired_res(self):
+        '''Paired influent and effluent results (tuple of arrays)'''
+        ipos, epos = self._paired_positions
+        if ipos.shape[0] == 0:
+            return np.zeros(0), np.zeros(0)
+        return (self.influent._raw_data[self.influent._rescol].values[ipos],
+                self.effluent._raw_data[self.effluent._rescol].values[epos])
+
+    @cache_readonly
+    def paired_qual(self):
+        '''Qualifiers of the paired influent and effluent results'''
+        ipos, epos = self._paired_positions
+        if ipos.shape[0] == 0:
+            return np.zeros(0, dtype=object), np.zeros(0, dtype=object)
+        return (self.influent._raw_data[self.influent._qualcol].values[ipos],
+                self.effluent._raw_data[self.effluent._qualcol].values[epos])
+
     @cache_readonly
     def paired_data(self):
-        if self.data is not None:
-            return self.data.dropna()
+        ipos, epos = self._paired_positions
+        effl = self.effluent._raw_data.iloc[epos]
+        if self.influent.hasData:
+            infl = self.influent._raw_data.iloc[ipos]
+        else:
+            infl = pandas.DataFrame(index=effl.index, columns=effl.columns)
+
+        # the rows are already lined up, so just put them side by side
+        index = effl.index
+        infl = utils.addSecondColumnLevel('inflow', 'station', infl)
+        effl = utils.addSecondColumnLevel('outflow', 'station', effl)
+        paired = pandas.concat([infl.reset_index(drop=True),
+                                effl.reset_index(drop=True)], axis=1)
+        paired.index = index
+        return paired
 
     @cache_readonly
     def n_pairs(self):
-        if self.paired_data is not None:
-            return self.paired_data.shape[0]
-        else:
-            return 0
+        return self._paired_positions[0].shape[0]
 
     @cache_readonly
     def _non_paired_stats(self):
@@ -997,7 +1800,7 @@ class Dataset(object):
 
     @cache_readonly
     def _paired_stats(self):
-        return self._non_paired_stats and self.paired_data.shape[0] > 20
+        return self._non_paired_stats and self.n_pairs > 20
 
     def __repr__(self):
         x = "<openpybmp Dataset object>\n  N influent  {0}\n  N effluent = {1}".format(self.influent.N, self.effluent.N)
@@ -1208,8 +2011,8 @@ class Dataset(object):
     @cache_readonly
     def _wilcoxon_stats(self):
         if self._paired_stats:
-            return stats.wilcoxon(np.log(self.paired_data.inflow.res),
-                                  np.log(self.paired_data.outflow.res))
+            infl, effl = self.paired_res
+            return stats.wilcoxon(np.log(infl), np.log(effl))
 
     @cache_readonly
     def _mannwhitney_stats(self):
@@ -1222,21 +2025,20 @@ class Dataset(object):
         if self._paired_stats and \
         self.influent.fractionND <= 0.5 and \
         self.effluent.fractionND <= 0.5:
-            return stats.kendalltau(self.paired_data.inflow.res,
-                                    self.paired_data.outflow.res)
+            return stats.kendalltau(*self.paired_res)
 
     @cache_readonly
     def _spearman_stats(self):
         if self._paired_stats and \
         self.influent.fractionND <= 0.5 and \
         self.effluent.fractionND <= 0.5:
-            return stats.spearmanr(self.paired_data.inflow.res.values,
-                                   self.paired_data.outflow.res.values)
+            return stats.spearmanr(*self.paired_res)
 
     @cache_readonly
     def _ttest_stats(self):
         if self._non_paired_stats:
-            return stats.ttest_ind(self.influent.data, self.effluent.data, False)
+            return stats.ttest_ind(self.influent.data, self.effluent.data,
+                                   equal_var=False)
 
     @cache_readonly
     def _levene_stats(self):
@@ -1250,12 +2052,11 @@ class Dataset(object):
     def theilSlopes(self, log_infl=False, log_effl=False):
         output = None #default
         # influent data
-        infl = self.paired_data.inflow.res.values
+        infl, effl = self.paired_res
         if log_infl:
             infl = np.log(infl)
 
         # effluent data
-        effl = self.paired_data.outflow.res.values
         if log_effl:
             effl = np.log(effl)
 
@@ -1267,10 +2068,10 @@ class Dataset(object):
             # slope of zero if possible
             if self.influent.NUnique <= self.effluent.NUnique:
                 inverted = False
-                theilstats = stats.mstats.theilslopes(effl, x=infl)
+                theilstats = algo.theil.theilslopes(effl, x=infl)
             else:
                 inverted = True
-                theilstats = stats.mstats.theilslopes(infl, x=effl)
+                theilstats = algo.theil.theilslopes(infl, x=effl)
 
             # stuff things into a dictionary
             if not inverted:
@@ -1294,7 +2095,7 @@ class Dataset(object):
                 utils.estimateFromLineParams(infl, output['medslope'], output['intercept'],
                                              xlog=log_infl, ylog=log_effl)
 
-            output['estimate_error'] = self.paired_data.outflow.res.values - \
+            output['estimate_error'] = self.paired_res[1] - \
                                        output['estimated_effluent']
 
         return output
@@ -1686,37 +2487,38 @@ class Dataset(object):
         use_ros_cache = self.useROS
 
 
+        infl_qual, effl_qual = self.paired_qual
+        infl_nd = algo.ros.censored_mask(infl_qual, self.influent._ndval)
+        effl_nd = algo.ros.censored_mask(effl_qual, self.effluent._ndval)
+
         if which == 'both':
-            index = (self.paired_data[('inflow', 'qual')] == self.influent._ndval) & \
-                    (self.paired_data[('outflow', 'qual')] == self.effluent._ndval)
+            index = infl_nd & effl_nd
 
         elif which == 'influent':
-            index = (self.paired_data[('inflow', 'qual')] == self.influent._ndval) & \
-                    (self.paired_data[('outflow', 'qual')] != self.effluent._ndval)
+            index = infl_nd & ~effl_nd
 
         elif which == 'effluent':
-            index = (self.paired_data[('inflow', 'qual')] != self.influent._ndval) & \
-                    (self.paired_data[('outflow', 'qual')] == self.effluent._ndval)
+            index = ~infl_nd & effl_nd
 
         elif which == 'neither':
-            index = (self.paired_data[('inflow', 'qual')] != self.influent._ndval) & \
-                    (self.paired_data[('outflow', 'qual')] != self.effluent._ndval)
+            index = ~infl_nd & ~effl_nd
 
         else:
             msg = '`which` must be "both", "influent", ' \
                   '"effluent", or "neighter"'
             raise ValueError(msg)
 
-        x = self.paired_data.loc[index][('inflow', 'res')]
-        y = self.paired_data.loc[index][('outflow', 'res')]
-        ax.plot(x, y, label=label, **markerkwargs)
+        x, y = self.paired_res
+        ax.plot(x[index], y[index], label=label, **markerkwargs)
 
 
 class DataCollection(object):
     def __init__(self, dataframe, rescol='res', qualcol='qual',
                  stationcol='station', paramcol='parameter', ndval='ND',
                  othergroups=None, useROS=True, filterfxn=None,
-                 bsIter=10000):
+                 bsIter=10000, stratacol=None, rosBootstrap=False,
+                 analyticN=None, rosMemo=None, useKM=False,
+                 rosImputations=None):
 
         self._filterfxn = filterfxn
         self._raw_rescol = rescol
@@ -1734,6 +2536,12 @@ class DataCollection(object):
         self.paramcol = paramcol
         self.ndval = ndval
         self.bsIter = bsIter
+        self.stratacol = stratacol
+        self.rosBootstrap = rosBootstrap
+        self.analyticN = analyticN
+        self.rosMemo = rosMemo
+        self.useKM = useKM
+        self.rosImputations = rosImputations
 
         self.groupby = [stationcol, paramcol]
         if othergroups is not None:
@@ -1742,6 +2550,8 @@ class DataCollection(object):
             self.groupby.extend(othergroups)
 
         self.columns = self.groupby + [self._raw_rescol, self.qualcol]
+        if self.stratacol is not None:
+            self.columns.append(self.stratacol)
 
     @property
     def filterfxn(self):
@@ -1756,27 +2566,29 @@ class DataCollection(object):
 
     @cache_readonly
     def tidy(self):
-
-        if self.useROS:
-            def fxn(g):
-                return algo.ros.MR(g).data
-        else:
-            def fxn(g):
-                g[self.roscol] = np.nan
-                return g
-
         _tidy = (
             self.data
                 .reset_index()[self.columns]
                 .groupby(by=self.groupby)
                 .filter(self.filterfxn)
-                .groupby(by=self.groupby)
-                .apply(fxn)
-                .reset_index()
-                .rename(columns={'final_data': self.roscol})
-                .sort(columns=self.groupby)
         )
 
+        if self.useROS:
+            # estimate the NDs of every group at once
+            _tidy = (
+                algo.ros.ros_groups(_tidy, self.groupby,
+                                    rescol=self._raw_rescol,
+                                    qualcol=self.qualcol,
+                                    ndsymbol=self.ndval,
+                                    memo=self.rosMemo)
+                    .reset_index(drop=True)
+                    .rename(columns={'final_data': self.roscol})
+            )
+        else:
+            _tidy = _tidy.reset_index(drop=True)
+            _tidy[self.roscol] = np.nan
+            _tidy = _tidy.sort(columns=self.groupby)
+
         keep_cols = self.columns + [self.roscol]
         _tidy = _tidy[keep_cols]
 
@@ -1793,12 +2605,16 @@ class DataCollection(object):
         )
         for names, data in groups:
             loc_dict = dict(zip(self.groupby, names))
-            locdata = data.copy()
+            # each group is already its own frame, so no need to copy it
+            locdata = data
             locdata.index = locdata.index.droplevel(level=self.stationcol)
             loc = Location(
                 locdata, station_type=loc_dict[self.stationcol].lower(),
                 rescol=self._raw_rescol, qualcol=self.qualcol,
-                ndval=self.ndval, bsIter=self.bsIter, useROS=self.useROS
+                ndval=self.ndval, bsIter=self.bsIter, useROS=self.useROS,
+                stratacol=self.stratacol, rosBootstrap=self.rosBootstrap,
+                analyticN=self.analyticN, rosMemo=self.rosMemo,
+                useKM=self.useKM, rosImputations=self.rosImputations
             )
 
             loc.definition = loc_dict
@@ -1830,26 +2646,150 @@ class DataCollection(object):
 
         return _datasets
 
+    def _dataset_test_inputs(self, ds):
+        # everything `_dataset_tests` needs, pulled out of the dataset once
+        empty = np.zeros(0)
+        if ds.influent is None or ds.effluent is None:
+            return None, None, empty, empty, False, False, False
+
+        if not ds._non_paired_stats:
+            return None, None, empty, empty, False, False, False
+
+        pinfl, peffl = ds.paired_res
+        correlate = (ds.influent.fractionND <= 0.5 and
+                     ds.effluent.fractionND <= 0.5)
+        inverted = ds.influent.NUnique > ds.effluent.NUnique
+        return (ds.influent.data, ds.effluent.data, pinfl, peffl,
+                ds._paired_stats, correlate, inverted)
+
+    def dataset_stats(self, processes=None):
+        '''
+        Hypothesis tests comparing the influent and effluent of every
+        dataset, computed in one pass.
+
+        Parameters
+        ----------
+        processes : optional int or None (default)
+            Number of worker processes used to run the tests. Datasets
+            are tested one after the other when None or 1.
+
+        Returns
+        -------
+        stats : pandas.DataFrame
+            One row per dataset (indexed like the datasets are grouped)
+            and one column per statistic, named like the properties of
+            `Dataset` (e.g., wilcoxon_p, spearman_rho, theil_medslope).
+            Tests that don't apply to a dataset are NaN.
+
+        '''
+        groupcols = list(filter(lambda g: g != self.stationcol, self.groupby))
+        inputs = [self._dataset_test_inputs(ds) for ds in self.datasets]
+
+        if processes is not None and processes > 1:
+            import multiprocessing
+            pool = multiprocessing.Pool(processes)
+            try:
+                results = pool.map(_dataset_tests, inputs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_dataset_tests(i) for i in inputs]
+
+        names = [tuple(ds.definition[g] for g in groupcols)
+                 for ds in self.datasets]
+        if len(groupcols) == 1:
+            index = pandas.Index([n[0] for n in names], name=groupcols[0])
+        else:
+            index = pandas.MultiIndex.from_tuples(names, names=groupcols)
+
+        return pandas.DataFrame(results, index=index, columns=_DATASET_STATS)
+
+    @cache_readonly
+    def imputations(self):
+        # imputations of every group at once, aligned with `tidy`
+        if self.useROS and self.rosImputations is not None:
+            codes = algo.ros._group_codes(self.tidy, self.groupby)[0]
+            return algo.ros.ros_impute(
+                self.tidy[self._raw_rescol].values,
+                algo.ros.censored_mask(self.tidy[self.qualcol], self.ndval),
+                M=self.rosImputations, groups=codes
+            )
+
+    def pooled_stat(self, statfxn, statname=None, alpha=0.05):
+        # mean and spread of a statistic across the imputations of each
+        # group (see `Location.pooled_stat`)
+        if self.imputations is None:
+            raise ValueError("`useROS` must be True and `rosImputations` "
+                             "must be set to pool statistics")
+
+        # sort the columns by group once so that each group is a slice
+        codes, index = algo.ros._group_codes(self.tidy, self.groupby)
+        order = np.argsort(codes, kind='mergesort')
+        imputations = self.imputations[:, order]
+        bounds = np.searchsorted(codes[order], np.arange(index.shape[0] + 1))
+
+        pooled = []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            draws = statfxn(imputations[:, lo:hi], axis=1)
+            stat, (lci, uci) = _imputation_spread(draws, alpha)
+            pooled.append([lci, stat, uci])
+
+        stat = pandas.DataFrame(pooled, index=index,
+                                columns=['lower', 'stat', 'upper'])
+        stat = stat.unstack(level=self.stationcol)
+        stat.columns = stat.columns.swaplevel(0, 1)
+        if statname is not None:
+            stat.columns.names = ['station', statname]
+        stat.sort(axis=1, inplace=True)
+
+        return stat
+
+    @cache_readonly
+    def km_stats(self):
+        return self._km_groups()
+
+    @cache_readonly
+    def location_array(self):
+        # data of every location as one columnar array
+        rescol = self.roscol if self.useROS else self._raw_rescol
+        return LocationArray.from_dataframe(self.tidy, self.groupby,
+                                            rescol=rescol)
+
+    @cache_readonly
+    def mle_stats(self):
+        # lognormal censored MLEs of every group at once
+        return algo.mle.mle_groups(self.tidy, self.groupby,
+                                   rescol=self._raw_rescol,
+                                   qualcol=self.qualcol, ndsymbol=self.ndval,
+                                   dist='lognorm')
+
     @cache_readonly
     def medians(self):
-        return self._generic_stat(np.median, statname='median')
+        return self._generic_stat(np.median, statname='median',
+                                  analytic=algo.bootstrap.median_interval,
+                                  km='median')
 
     @cache_readonly
     def means(self):
-        return self._generic_stat(np.mean, statname='mean')
+        return self._generic_stat(np.mean, statname='mean',
+                                  analytic=algo.bootstrap.t_interval,
+                                  km='mean')
 
     @cache_readonly
     def std_devs(self):
-        return self._generic_stat(np.std, statname='std. dev.')
+        return self._generic_stat(np.std, statname='std. dev.', km='std')
 
     def percentiles(self, percentile):
         return self._generic_stat(lambda x: np.percentile(x, percentile),
                                   statname='pctl {}'.format(percentile),
-                                  bootstrap=False)
+                                  bootstrap=False,
+                                  km='pctl {:g}'.format(percentile))
 
     @cache_readonly
     def logmean(self):
-        return self._generic_stat(lambda x, axis=0: np.mean(np.log(x), axis=axis), statname='Log-mean')
+        return self._generic_stat(lambda x, axis=0: np.mean(np.log(x), axis=axis), statname='Log-mean',
+                                  analytic=lambda x: algo.bootstrap.t_interval(np.log(x)))
 
     @cache_readonly
     def logstd(self):
@@ -1857,13 +2797,13 @@ class DataCollection(object):
 
     @cache_readonly
     def geomean(self):
-        geomean = np.exp(self.logmean)
+        geomean = self._exp_stat(self.logmean)
         geomean.columns.names = ['station', 'Geo-mean']
         return geomean
 
     @cache_readonly
     def geostd(self):
-        geostd = np.exp(self.logstd)
+        geostd = self._exp_stat(self.logstd)
         geostd.columns.names = ['station', 'Geo-std. dev.']
         return geostd
 
@@ -1871,27 +2811,83 @@ class DataCollection(object):
     def count(self):
         return self._generic_stat(lambda x: x.count(), bootstrap=False, statname='Count')
 
-    def _generic_stat(self, statfxn, bootstrap=True, statname=None):
+    @staticmethod
+    def _exp_stat(logstat):
+        # back-transform everything but the CI method labels
+        stat = logstat.copy()
+        numeric = logstat.columns.get_level_values(1) != 'method'
+        stat.loc[:, numeric] = np.exp(logstat.loc[:, numeric])
+        return stat
+
+    def _km_groups(self, quantiles=(0.10, 0.25, 0.50, 0.75, 0.90)):
+        # Kaplan-Meier estimates of every group at once
+        return algo.km.km_groups(self.tidy, self.groupby,
+                                 rescol=self._raw_rescol,
+                                 qualcol=self.qualcol, ndsymbol=self.ndval,
+                                 quantiles=quantiles)
+
+    def _km_column(self, column):
+        if column in self.km_stats.columns:
+            return self.km_stats[column]
+
+        # some other percentile
+        quantile = float(column.split()[-1]) / 100.
+        return self._km_groups(quantiles=[quantile])[column]
+
+    def _generic_stat(self, statfxn, bootstrap=True, statname=None,
+                      analytic=None, km=None):
+        statnames = ['lower', 'stat', 'upper']
+        if self.analyticN is not None:
+            statnames.append('method')
+
         def CIs(x):
-            bs = algo.bootstrap.Stat(x[self.rescol].values, statfxn=statfxn)
+            usekm = self.useKM and km is not None
+            if (not usekm and analytic is not None and
+                    self.analyticN is not None and
+                    x.shape[0] >= self.analyticN):
+                stat, (lci, uci) = analytic(x[self.rescol].values)
+                return pandas.Series([lci, stat, uci, 'analytic'],
+                                     index=statnames)
+
+            strata = None
+            if self.stratacol is not None:
+                strata = x[self.stratacol].values
+
+            if usekm:
+                bs = algo.bootstrap.KMStat(
+                    x[self._raw_rescol].values,
+                    algo.ros.censored_mask(x[self.qualcol], self.ndval),
+                    statistic=km, strata=strata
+                )
+            elif self.useROS and self.rosBootstrap:
+                bs = algo.bootstrap.ROSStat(
+                    x[self._raw_rescol].values,
+                    algo.ros.censored_mask(x[self.qualcol], self.ndval),
+                    statfxn=statfxn, strata=strata
+                )
+            else:
+                bs = algo.bootstrap.Stat(x[self.rescol].values, statfxn=statfxn,
+                                         strata=strata)
             stat, (lci, uci) = bs.BCA()
-            statnames = ['lower', 'stat', 'upper']
-            return pandas.Series([lci, stat, uci], index=statnames)
+            return pandas.Series([lci, stat, uci, 'bootstrap'][:len(statnames)],
+                                 index=statnames)
 
         if bootstrap:
-            stat = (
-                self.tidy
-                    .groupby(by=self.groupby)
-                    .apply(CIs)
-                    .unstack(level=self.stationcol)
-            )
+            stat = self.tidy.groupby(by=self.groupby).apply(CIs)
+            if self.useKM and km is not None:
+                stat['stat'] = self._km_column(km)
+            stat = stat.unstack(level=self.stationcol)
+
+            # the CI method labels leave everything as objects
+            if self.analyticN is not None:
+                for col in stat.columns:
+                    if col[0] != 'method':
+                        stat[col] = stat[col].astype(float)
         else:
-            stat = (
-                self.tidy
-                    .groupby(by=self.groupby)
-                    .agg({self.rescol: statfxn})
-                    .unstack(level=self.stationcol)
-            )
+            stat = self.tidy.groupby(by=self.groupby).agg({self.rescol: statfxn})
+            if self.useKM and km is not None:
+                stat[self.rescol] = self._km_column(km)
+            stat = stat.unstack(level=self.stationcol)
 
         stat.columns = stat.columns.swaplevel(0, 1)
         if statname is not None:
@@ -0,0 +1,468 @@
+from __future__ import division
+
+import os
+import json
+from collections import OrderedDict
+
+import numpy as np
+import scipy.stats as stats
+import pandas
+from statsmodels.tools.decorators import resettable_cache
+
+from wqio import algo
+from .features import Location, Dataset, DataCollection
+
+
+__all__ = ['save_snapshot', 'load_snapshot']
+
+
+SNAPSHOT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+class _Unsupported(ValueError):
+    pass
+
+
+class _Store(object):
+    '''
+    Directory of .npy files (one per array) shared by everything in a
+    snapshot. Arrays are loaded memory-mapped if `mmap` is True (unless
+    overridden for a single `load`).
+    '''
+    def __init__(self, dirname, mmap=True):
+        self.dirname = dirname
+        self.mmap = mmap
+        self.count = 0
+
+    def save(self, values):
+        array = _as_storable(values)
+        filename = 'a{:06d}.npy'.format(self.count)
+        np.save(os.path.join(self.dirname, filename), array)
+        self.count += 1
+        return filename
+
+    def load(self, filename, mmap=None):
+        path = os.path.join(self.dirname, filename)
+        if mmap is None:
+            mmap = self.mmap
+
+        if mmap:
+            try:
+                # copy-on-write: pandas rejects read-only buffers, and
+                # changes never reach the file
+                return np.load(path, mmap_mode='c')
+            except ValueError:
+                # empty arrays can't be memory-mapped
+                pass
+        return np.load(path)
+
+
+def _as_storable(values):
+    '''
+    Numpy array that can be saved (and memory-mapped) without pickling.
+    Object arrays of strings are stored as unicode.
+    '''
+    array = np.asarray(values)
+    if array.dtype == object:
+        if all(isinstance(v, (str, type(u''))) for v in array.flat):
+            array = array.astype(np.unicode_)
+        else:
+            raise _Unsupported('object arrays must only contain strings')
+    return array
+
+
+def _encode_index(index, store):
+    return {
+        'names': [_encode(name, store) for name in index.names],
+        'levels': [store.save(index.get_level_values(n).values)
+                   for n in range(index.nlevels)],
+    }
+
+
+def _decode_index(obj, store):
+    # pandas can't build (Multi)Indexes from read-only buffers
+    names = [_decode(name, store) for name in obj['names']]
+    levels = [store.load(level, mmap=False) for level in obj['levels']]
+    if len(levels) == 1:
+        return pandas.Index(levels[0], name=names[0])
+    else:
+        return pandas.MultiIndex.from_arrays(levels, names=names)
+
+
+def _encode_frame(frame, store):
+    return {
+        'index': _encode_index(frame.index, store),
+        'columns': _encode_index(frame.columns, store),
+        'data': [store.save(frame.iloc[:, n].values)
+                 for n in range(frame.shape[1])],
+    }
+
+
+def _decode_frame(obj, store):
+    data = OrderedDict(
+        (n, store.load(col)) for n, col in enumerate(obj['data'])
+    )
+    frame = pandas.DataFrame(data, index=_decode_index(obj['index'], store),
+                             columns=list(data.keys()))
+    frame.columns = _decode_index(obj['columns'], store)
+    return frame
+
+
+def _encode_ros(mr, store):
+    if not mr.lean:
+        raise _Unsupported('only lean MR objects are saved')
+
+    fit = getattr(mr, 'fit', None)
+    return {
+        'index': _encode_index(mr.index, store),
+        'res': store.save(mr.res),
+        'censored': store.save(mr.censored),
+        'final': store.save(mr.final),
+        'DLs': _encode_frame(mr.DLs, store),
+        'fit': None if fit is None else [float(v) for v in tuple(fit)[:5]],
+        'N_tot': int(mr.N_tot),
+        'N_nd': int(mr.N_nd),
+        'fitlogs': bool(mr.fitlogs),
+        'dist': getattr(mr.dist, 'name', mr.dist),
+        'rescol': mr._source['rescol'],
+        'qualcol': mr._source['qualcol'],
+        'ndsymbol': _encode(mr._source['ndsymbol'], store),
+    }
+
+
+def _decode_ros(obj, store, data):
+    '''
+    Rebuilds a lean MR object around the saved arrays without
+    estimating anything. `data` is the original dataframe.
+    '''
+    mr = algo.ros.MR.__new__(algo.ros.MR)
+    mr.index = _decode_index(obj['index'], store)
+    mr.res = store.load(obj['res'])
+    mr.censored = store.load(obj['censored'])
+    mr.final = store.load(obj['final'])
+    mr.DLs = _decode_frame(obj['DLs'], store)
+    if obj['fit'] is not None:
+        mr.fit = tuple(obj['fit'])
+    mr.N_tot = obj['N_tot']
+    mr.N_nd = obj['N_nd']
+    mr.fitlogs = obj['fitlogs']
+    mr.dist = getattr(stats, obj['dist'])
+    mr.lean = True
+    mr._source = dict(data=data, rescol=obj['rescol'],
+                      qualcol=obj['qualcol'],
+                      ndsymbol=_decode(obj['ndsymbol'], store), memo=None)
+    mr._data = None
+    mr._debug = None
+    return mr
+
+
+def _encode(value, store):
+    '''
+    JSON-able representation of a cached value. Scalars are stored in
+    the manifest, arrays in their own files. Raises `_Unsupported` for
+    anything else.
+    '''
+    if value is None or isinstance(value, (bool, str, type(u''))):
+        return value
+    elif isinstance(value, (np.bool_,)):
+        return bool(value)
+    elif isinstance(value, (int, np.integer)):
+        return int(value)
+    elif isinstance(value, (float, np.floating)):
+        return float(value)
+    elif isinstance(value, np.ndarray):
+        return {'array': store.save(value)}
+    elif isinstance(value, pandas.DataFrame):
+        return {'frame': _encode_frame(value, store)}
+    elif isinstance(value, pandas.Series):
+        return {'series': {
+            'index': _encode_index(value.index, store),
+            'name': _encode(value.name, store),
+            'data': store.save(value.values),
+        }}
+    elif isinstance(value, pandas.Index):
+        return {'index': _encode_index(value, store)}
+    elif isinstance(value, algo.ros.MR):
+        return {'ros': _encode_ros(value, store)}
+    elif isinstance(value, tuple):
+        return {'tuple': [_encode(v, store) for v in value]}
+    elif isinstance(value, list):
+        return {'list': [_encode(v, store) for v in value]}
+    elif isinstance(value, dict):
+        return {'dict': [[_encode(k, store), _encode(v, store)]
+                         for k, v in value.items()]}
+    else:
+        raise _Unsupported(type(value).__name__)
+
+
+def _decode(obj, store, data=None):
+    if not isinstance(obj, dict):
+        return obj
+
+    kind, value = list(obj.items())[0]
+    if kind == 'array':
+        return store.load(value)
+    elif kind == 'frame':
+        return _decode_frame(value, store)
+    elif kind == 'series':
+        return pandas.Series(store.load(value['data']),
+                             index=_decode_index(value['index'], store),
+                             name=_decode(value['name'], store))
+    elif kind == 'index':
+        return _decode_index(value, store)
+    elif kind == 'ros':
+        return _decode_ros(value, store, data)
+    elif kind == 'tuple':
+        return tuple(_decode(v, store) for v in value)
+    elif kind == 'list':
+        return [_decode(v, store) for v in value]
+    elif kind == 'dict':
+        return dict((_decode(k, store), _decode(v, store)) for k, v in value)
+    else:
+        raise ValueError('unknown snapshot entry {!r}'.format(kind))
+
+
+def _encode_cache(cache, store, skip=()):
+    '''
+    Saves everything in a cache that can be. The rest (e.g., KM
+    estimates) gets recomputed when it's asked for after restoring.
+    '''
+    entries = {}
+    for name, value in cache.items():
+        if name in skip:
+            continue
+        try:
+            entries[name] = _encode(value, store)
+        except _Unsupported:
+            pass
+    return entries
+
+
+def _decode_cache(entries, store, data=None):
+    cache = resettable_cache()
+    cache.update(
+        (name, _decode(value, store, data=data))
+        for name, value in entries.items()
+    )
+    return cache
+
+
+def _encode_location(loc, store):
+    if loc._filtered_data is None:
+        filtered = None
+    else:
+        filtered = _encode_frame(loc._filtered_data, store)
+
+    return {
+        'options': dict(
+            rescol=loc._rescol, qualcol=loc._qualcol,
+            ndval=_encode(loc._ndval, store), bsIter=loc.bsIter,
+            station_type=loc.station_type, useROS=loc.useROS,
+            include=loc.include, stratacol=loc._stratacol,
+            rosBootstrap=loc.rosBootstrap, analyticN=loc.analyticN,
+            useKM=loc.useKM, rosImputations=loc.rosImputations,
+        ),
+        'name': _encode(loc.name, store),
+        'definition': _encode(loc.definition, store),
+        'color': _encode(loc.color, store),
+        'plot_marker': loc.plot_marker,
+        'raw_data': _encode_frame(loc._raw_data, store),
+        'filtered_data': filtered,
+        'caches': [
+            {'mode': list(mode), 'stats': _encode_cache(cache, store)}
+            for mode, cache in loc._caches.items()
+        ],
+    }
+
+
+def _decode_location(obj, store):
+    options = dict(obj['options'])
+    options['ndval'] = _decode(options['ndval'], store)
+    loc = Location(_decode_frame(obj['raw_data'], store), **options)
+    if obj['filtered_data'] is not None:
+        loc._filtered_data = _decode_frame(obj['filtered_data'], store)
+
+    loc.name = _decode(obj['name'], store)
+    loc.definition = _decode(obj['definition'], store)
+    loc.color = _decode(obj['color'], store)
+    loc.plot_marker = obj['plot_marker']
+
+    data = loc.filtered_data
+    loc._caches = dict(
+        (tuple(entry['mode']), _decode_cache(entry['stats'], store, data))
+        for entry in obj['caches']
+    )
+    loc._switch_cache()
+    return loc
+
+
+def _encode_dataset(ds, store, locations=None):
+    '''
+    `locations` is a list of Locations already in the snapshot. The
+    influent and effluent are referred to by their position in it if
+    they're there.
+    '''
+    def _loc(loc):
+        if loc is None:
+            return None
+        for n, other in enumerate(locations or []):
+            if other is loc:
+                return n
+        return _encode_location(loc, store)
+
+    return {
+        'influent': _loc(ds.influent),
+        'effluent': _loc(ds.effluent),
+        'useROS': ds.useROS,
+        'name': _encode(ds.name, store),
+        'definition': _encode(ds.definition, store),
+        'include': ds._include,
+        'dumpFile': ds.dumpFile,
+        'caches': [
+            {'mode': [None if m is None else list(m) for m in mode],
+             'stats': _encode_cache(cache, store)}
+            for mode, cache in ds._caches.items()
+        ],
+    }
+
+
+def _decode_dataset(obj, store, locations=None):
+    def _loc(entry):
+        if entry is None:
+            return None
+        elif isinstance(entry, int):
+            return locations[entry]
+        return _decode_location(entry, store)
+
+    ds = Dataset(_loc(obj['influent']), _loc(obj['effluent']),
+                 useROS=obj['useROS'], name=_decode(obj['name'], store),
+                 xlsDataDumpFile=obj['dumpFile'])
+    ds.definition = _decode(obj['definition'], store)
+    ds._include = obj['include']
+    ds._caches = dict(
+        (tuple(None if m is None else tuple(m) for m in entry['mode']),
+         _decode_cache(entry['stats'], store))
+        for entry in obj['caches']
+    )
+    return ds
+
+
+def _encode_collection(dc, store):
+    locations = dc._cache.get('locations')
+    datasets = dc._cache.get('datasets')
+    return {
+        'options': dict(
+            rescol=dc._raw_rescol, qualcol=dc.qualcol,
+            stationcol=dc.stationcol, paramcol=dc.paramcol,
+            ndval=_encode(dc.ndval, store), othergroups=dc.groupby[2:] or None,
+            useROS=dc.useROS, bsIter=dc.bsIter, stratacol=dc.stratacol,
+            rosBootstrap=dc.rosBootstrap, analyticN=dc.analyticN,
+            useKM=dc.useKM, rosImputations=dc.rosImputations,
+        ),
+        'data': _encode_frame(dc.data, store),
+        'locations': None if locations is None else [
+            _encode_location(loc, store) for loc in locations
+        ],
+        'datasets': None if datasets is None else [
+            _encode_dataset(ds, store, locations=locations)
+            for ds in datasets
+        ],
+        'stats': _encode_cache(dc._cache, store,
+                               skip=('locations', 'datasets')),
+    }
+
+
+def _decode_collection(obj, store):
+    options = dict(obj['options'])
+    options['ndval'] = _decode(options['ndval'], store)
+    dc = DataCollection(_decode_frame(obj['data'], store), **options)
+
+    dc._cache.update(_decode_cache(obj['stats'], store))
+    if obj['locations'] is not None:
+        dc._cache['locations'] = [
+            _decode_location(loc, store) for loc in obj['locations']
+        ]
+    if obj['datasets'] is not None:
+        dc._cache['datasets'] = [
+            _decode_dataset(ds, store, locations=dc._cache.get('locations'))
+            for ds in obj['datasets']
+        ]
+    return dc
+
+
+_ENCODERS = OrderedDict([
+    ('Location', (Location, _encode_location, _decode_location)),
+    ('Dataset', (Dataset, _encode_dataset, _decode_dataset)),
+    ('DataCollection', (DataCollection, _encode_collection,
+                        _decode_collection)),
+])
+
+
+def save_snapshot(obj, dirname):
+    '''
+    Saves a Location, Dataset, or DataCollection along with everything
+    it has computed so far to a directory
+
+    Input:
+        obj : Location, Dataset, or DataCollection
+            The object to save.
+
+        dirname : string
+            Directory of the snapshot. Created if it doesn't exist.
+            Arrays are saved as .npy files (no pickles) and everything
+            else is described by a JSON manifest.
+
+    Returns:
+        None
+
+    Notes:
+        The raw data and all cached stats (including the ROS estimates,
+        bootstrapped confidence intervals, and test statistics) are
+        saved. Cached objects that can't be stored as arrays (e.g.,
+        Kaplan-Meier estimates) are skipped and recomputed on demand.
+        Filter functions and ROS memos are not saved.
+    '''
+    for typename, (cls, encoder, decoder) in _ENCODERS.items():
+        if isinstance(obj, cls):
+            break
+    else:
+        raise ValueError('obj must be a Location, Dataset, or DataCollection')
+
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    store = _Store(dirname)
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'type': typename,
+        'object': encoder(obj, store),
+    }
+    with open(os.path.join(dirname, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+
+
+def load_snapshot(dirname, mmap=True):
+    '''
+    Restores an object saved with `save_snapshot` without recomputing
+    anything
+
+    Input:
+        dirname : string
+            Directory of the snapshot.
+
+        mmap : optional bool (default = True)
+            When True, arrays are memory-mapped (copy-on-write) and only
+            read from disk as they are used.
+
+    Returns:
+        obj : Location, Dataset, or DataCollection
+    '''
+    with open(os.path.join(dirname, MANIFEST), 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise ValueError('unsupported snapshot version')
+
+    decoder = _ENCODERS[manifest['type']][2]
+    return decoder(manifest['object'], _Store(dirname, mmap=mmap))
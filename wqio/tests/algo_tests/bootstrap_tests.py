@@ -5,6 +5,7 @@ import scipy.optimize as opt
 
 from wqio import testing
 from wqio.algo import bootstrap
+from wqio.algo import km
 
 
 def test__boot_strap():
@@ -151,3 +152,268 @@ class test_Fit:
     def test__acceleration(self):
         known_acceleration = 0.0
         assert_almost_equal(self.bsFit._acceleration(), known_acceleration, places=5)
+
+
+def test__stratified_index():
+    np.random.seed(0)
+    strata = np.array(list('aabbbbcccccccd'))
+    index = bootstrap._stratified_index(strata, 250)
+    assert_tuple_equal(index.shape, (250, strata.shape[0]))
+    for row in index:
+        nptest.assert_array_equal(np.sort(strata[row]), np.sort(strata))
+
+
+def test_t_interval():
+    data = np.array([4.0, 5.0, 6.0, 7.0, 8.0])
+    res, ci = bootstrap.t_interval(data, alpha=0.05)
+    assert_almost_equal(res, 6.0)
+    nptest.assert_array_almost_equal(ci, [4.036757, 7.963243])
+
+
+def test_median_interval():
+    data = np.arange(1.0, 101.0)
+    np.random.seed(0)
+    np.random.shuffle(data)
+    res, ci = bootstrap.median_interval(data, alpha=0.05)
+    assert_almost_equal(res, 50.5)
+    nptest.assert_array_equal(ci, [40.0, 61.0])
+
+
+class test_Stat_lazy:
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.NIter = 1000
+        np.random.seed(0)
+        self.bsStat = bootstrap.Stat(np.array(self.data.res), statfxn=np.mean,
+                                     NIter=self.NIter)
+        self.bsKeep = bootstrap.Stat(np.array(self.data.res), statfxn=np.mean,
+                                     NIter=self.NIter, keep_index=True)
+
+    def test_prelim_result(self):
+        assert_almost_equal(self.bsStat.prelim_result, self.data.res.mean())
+
+    def test_nothing_resampled(self):
+        assert_true(self.bsStat._stats is None)
+        assert_true(self.bsStat._index is None)
+
+    def test_stats_after_BCA(self):
+        self.bsStat.BCA()
+        assert_equal(self.bsStat._stats.shape[0], self.NIter)
+        assert_true(self.bsStat._index is None)
+
+    def test_stats_not_recomputed(self):
+        res1, ci1 = self.bsStat.BCA()
+        res2, ci2 = self.bsStat.BCA()
+        assert_equal(res1, res2)
+        nptest.assert_array_equal(ci1, ci2)
+
+    def test_index_before_stats(self):
+        index = self.bsStat._boot_index
+        assert_true(self.bsStat._boot_index is index)
+        nptest.assert_array_almost_equal(
+            self.bsStat._boot_stats,
+            self.data.res.values[index].mean(axis=1)
+        )
+        assert_true(self.bsStat._index is None)
+
+    @raises(ValueError)
+    def test_index_discarded(self):
+        self.bsStat.BCA()
+        self.bsStat._boot_index
+
+    @raises(ValueError)
+    def test_array_discarded(self):
+        self.bsStat.BCA()
+        self.bsStat._boot_array
+
+    def test_keep_index(self):
+        self.bsKeep.percentile()
+        index = self.bsKeep._index
+        assert_tuple_equal(index.shape, (self.NIter, self.data.shape[0]))
+        assert_true(self.bsKeep._boot_index is index)
+        nptest.assert_array_almost_equal(
+            self.bsKeep._boot_stats,
+            self.bsKeep._boot_array.mean(axis=1)
+        )
+
+
+class test_Stat_multiple:
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.NIter = 1000
+        np.random.seed(0)
+        self.bsMulti = bootstrap.Stat(np.array(self.data.res),
+                                      statfxn=[np.mean, np.median],
+                                      NIter=self.NIter, keep_index=True)
+
+    def test_prelim_result(self):
+        nptest.assert_array_almost_equal(
+            self.bsMulti.prelim_result,
+            [self.data.res.mean(), self.data.res.median()]
+        )
+
+    def test__boot_stats(self):
+        assert_tuple_equal(self.bsMulti._boot_stats.shape, (self.NIter, 2))
+
+    def test_BCA(self):
+        res, ci = self.bsMulti.BCA()
+        assert_tuple_equal(res.shape, (2,))
+        assert_tuple_equal(ci.shape, (2, 2))
+
+        # same as bootstrapping each statistic on its own
+        for n, fxn in enumerate([np.mean, np.median]):
+            single = bootstrap.Stat(np.array(self.data.res), statfxn=fxn,
+                                    NIter=self.NIter)
+            single._stats = self.bsMulti._boot_stats[:, n]
+            known_res, known_ci = single.BCA()
+            assert_almost_equal(res[n], known_res)
+            nptest.assert_array_almost_equal(ci[n], known_ci)
+
+    def test_percentile(self):
+        res, ci = self.bsMulti.percentile()
+        nptest.assert_array_almost_equal(
+            res, np.percentile(self.bsMulti._boot_stats, 50, axis=0)
+        )
+        assert_tuple_equal(ci.shape, (2, 2))
+        assert_true(np.all(ci[:, 0] <= ci[:, 1]))
+
+
+class test_Stat_strata:
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.strata = np.array(['wet', 'dry', 'dry', 'wet', 'dry'] * 7)
+        self.NIter = 1000
+        np.random.seed(0)
+        self.bsStat = bootstrap.Stat(np.array(self.data.res), statfxn=np.mean,
+                                     NIter=self.NIter, strata=self.strata)
+
+    def test_strata(self):
+        assert_true(hasattr(self.bsStat, 'strata'))
+        nptest.assert_array_equal(self.strata, self.bsStat.strata)
+
+    def test__boot_index(self):
+        assert_tuple_equal(self.bsStat._boot_index.shape,
+                           (self.NIter, self.data.shape[0]))
+        wet = (self.strata[self.bsStat._boot_index] == 'wet').sum(axis=1)
+        nptest.assert_array_equal(wet, np.ones(self.NIter) * 14)
+
+    def test__boot_stats(self):
+        assert_equal(self.bsStat._boot_stats.shape[0], self.NIter)
+
+    def test_BCA(self):
+        res, ci = self.bsStat.BCA()
+        assert_true(ci[0] < res < ci[1])
+
+    def test_chunksize(self):
+        bsChunked = bootstrap.Stat(np.array(self.data.res), statfxn=np.mean,
+                                   NIter=self.NIter, strata=self.strata,
+                                   chunksize=300)
+        np.random.seed(0)
+        known = self.bsStat._boot_stats
+        np.random.seed(0)
+        nptest.assert_array_almost_equal(bsChunked._boot_stats, known)
+
+    @raises(ValueError)
+    def test_bad_strata(self):
+        bootstrap.Stat(np.array(self.data.res), strata=self.strata[:-1])
+
+
+class test_ROSStat:
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.censored = (self.data.qual == 'ND').values
+        self.NIter = 1000
+        np.random.seed(0)
+        self.bsStat = bootstrap.ROSStat(np.array(self.data.res), self.censored,
+                                        statfxn=np.mean, NIter=self.NIter)
+
+    def test_rawdata(self):
+        nptest.assert_array_equal(self.bsStat.rawdata, self.data.res.values)
+
+    def test_censored(self):
+        nptest.assert_array_equal(self.bsStat.censored, self.censored)
+
+    def test_data(self):
+        known_data = np.array([
+            2., 3.11029054, 3.60383412, 4.04355908, 4.04355908, 4.2, 4.62,
+            4.70773991, 5.57, 5.66, 5.86, 6.13826881, 6.65, 6.78, 6.79,
+            6.97698797, 7.5, 7.5, 7.5, 8.63, 8.71, 8.99, 9.85, 10.82, 11.25,
+            11.25, 12.2, 14.92, 16.77, 17.81, 19.16, 19.19, 19.64, 20.18, 22.97
+        ])
+        nptest.assert_array_almost_equal(np.sort(self.bsStat.data), known_data,
+                                         decimal=2)
+        nptest.assert_array_equal(self.bsStat.data[~self.censored],
+                                  self.data.res.values[~self.censored])
+
+    def test_prelim_result(self):
+        nptest.assert_almost_equal(self.bsStat.prelim_result, 9.5889, decimal=3)
+
+    def test__boot_stats(self):
+        assert_equal(self.bsStat._boot_stats.shape[0], self.NIter)
+
+    def test__boot_array(self):
+        assert_tuple_equal(self.bsStat._boot_array.shape,
+                           (self.NIter, self.data.shape[0]))
+
+    def test_BCA(self):
+        res, ci = self.bsStat.BCA()
+        assert_true(ci[0] < res < ci[1])
+
+    def test_transform(self):
+        np.random.seed(0)
+        bs = bootstrap.ROSStat(np.array(self.data.res), self.censored,
+                               statfxn=np.mean, NIter=250, transform=np.log)
+        nptest.assert_almost_equal(bs.prelim_result, 2.0896, decimal=3)
+
+    @raises(ValueError)
+    def test_bad_censored(self):
+        bootstrap.ROSStat(np.array(self.data.res), self.censored[:-1])
+
+
+class test_KMStat:
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.censored = (self.data.qual == 'ND').values
+        self.NIter = 1000
+        np.random.seed(0)
+        self.bsStat = bootstrap.KMStat(np.array(self.data.res), self.censored,
+                                       statistic='median', NIter=self.NIter,
+                                       keep_index=True)
+        self.km = km.KaplanMeier(self.data.res.values, self.censored)
+
+    def test_prelim_result(self):
+        assert_almost_equal(self.bsStat.prelim_result, self.km.median)
+
+    def test__boot_stats(self):
+        stats = self.bsStat._boot_stats
+        assert_equal(stats.shape[0], self.NIter)
+
+        # same as the KM estimate of each resample on its own
+        for index in self.bsStat._boot_index[:5]:
+            known = km.KaplanMeier(self.data.res.values[index],
+                                   self.censored[index])
+            assert_true(known.median in stats)
+
+    def test_statistics(self):
+        for statistic in ['mean', 'std', 0.25]:
+            bs = bootstrap.KMStat(np.array(self.data.res), self.censored,
+                                  statistic=statistic, NIter=100)
+            res, ci = bs.BCA()
+            assert_true(ci[0] <= ci[1])
+
+        bs = bootstrap.KMStat(np.array(self.data.res), self.censored,
+                              statistic='mean', NIter=100)
+        assert_almost_equal(bs.prelim_result, self.km.mean)
+
+    def test_BCA(self):
+        res, ci = self.bsStat.BCA()
+        assert_true(ci[0] <= self.km.median <= ci[1])
+
+    @raises(ValueError)
+    def test_bad_statistic(self):
+        bootstrap.KMStat(np.array(self.data.res), self.censored,
+                         statistic='junk')
+
+    @raises(ValueError)
+    def test_bad_censored(self):
+        bootstrap.KMStat(np.array(self.data.res), self.censored[:-1])
@@ -0,0 +1,112 @@
+from nose.tools import *
+import numpy as np
+import numpy.testing as nptest
+
+from wqio import testing
+
+import pandas as pd
+
+from wqio.algo import km
+
+
+class test_KaplanMeier(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.values = self.data['res'].values
+        self.censored = (self.data['qual'] == 'ND').values
+        self.km = km.KaplanMeier(self.values, self.censored)
+
+        self.known_mean = 9.59862896
+        self.known_std = 5.67967120
+        self.known_median = 7.5
+        self.known_quantiles = np.array([4.2, 5.57, 12.2, 19.19])
+
+    def test_counts(self):
+        assert_equal(self.km.N_tot, 35)
+        assert_equal(self.km.N_nd, 7)
+
+    def test_cdf(self):
+        # product-limit estimate done one step at a time
+        censored = self.censored & (self.values > self.values.min())
+        cdf = []
+        F = 1.0
+        for value in np.unique(self.values[~censored])[::-1]:
+            cdf.append(F)
+            d = np.sum((self.values == value) & ~censored)
+            n = np.sum(self.values <= value)
+            F *= 1 - d / float(n)
+
+        nptest.assert_array_almost_equal(self.km.cdf, cdf[::-1])
+        assert_almost_equal(F, 0.0)
+
+    def test_mean(self):
+        assert_almost_equal(self.km.mean, self.known_mean)
+
+    def test_std(self):
+        assert_almost_equal(self.km.std, self.known_std)
+
+    def test_median(self):
+        assert_almost_equal(self.km.median, self.known_median)
+
+    def test_quantile(self):
+        nptest.assert_array_almost_equal(
+            self.km.quantile([0.1, 0.25, 0.75, 0.9]),
+            self.known_quantiles
+        )
+
+    def test_percentile(self):
+        assert_almost_equal(self.km.percentile(25), self.known_quantiles[1])
+
+    def test_uncensored(self):
+        for N in [1, 2, 9, 10]:
+            x = self.values[:N]
+            uncensored = km.KaplanMeier(x, np.zeros(N, dtype=bool))
+            assert_almost_equal(uncensored.mean, np.mean(x))
+            assert_almost_equal(uncensored.std, np.std(x))
+            assert_almost_equal(uncensored.median, np.median(x))
+
+    @raises(ValueError)
+    def test_bad_quantile(self):
+        self.km.quantile(1.5)
+
+    @raises(ValueError)
+    def test_bad_censored(self):
+        km.KaplanMeier(self.values, self.censored[:-1])
+
+
+class test_km_groups(object):
+    def setup(self):
+        data = testing.getTestROSData()
+        other = data.copy()
+        other['res'] = other['res'] * 2
+        other.loc[other.index[:20], 'qual'] = 'ND'
+        data['site'] = 'B'
+        other['site'] = 'A'
+        self.data = pd.concat([data, other], ignore_index=True)
+        self.data['param'] = 'X'
+        self.stats = km.km_groups(self.data, ['site', 'param'])
+
+    def test_columns(self):
+        known = ['count', 'ND', 'mean', 'std', 'median', 'pctl 10',
+                 'pctl 25', 'pctl 50', 'pctl 75', 'pctl 90']
+        assert_list_equal(self.stats.columns.tolist(), known)
+
+    def test_index(self):
+        assert_list_equal(self.stats.index.names, ['site', 'param'])
+        assert_list_equal(self.stats.index.tolist(), [('A', 'X'), ('B', 'X')])
+
+    def test_same_as_KaplanMeier(self):
+        for (site, param), group in self.data.groupby(['site', 'param']):
+            known = km.KaplanMeier(group['res'].values,
+                                   (group['qual'] == 'ND').values)
+            row = self.stats.loc[(site, param)]
+            assert_equal(row['ND'], known.N_nd)
+            assert_almost_equal(row['mean'], known.mean)
+            assert_almost_equal(row['std'], known.std)
+            assert_almost_equal(row['median'], known.median)
+            assert_almost_equal(row['pctl 75'], known.quantile(0.75))
+
+    def test_single_groupcol(self):
+        stats = km.km_groups(self.data, 'site', quantiles=[0.5])
+        assert_list_equal(stats.index.tolist(), ['A', 'B'])
+        nptest.assert_array_almost_equal(stats['pctl 50'], stats['median'])
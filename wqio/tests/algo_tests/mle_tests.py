@@ -0,0 +1,113 @@
+from nose.tools import *
+import numpy as np
+import numpy.testing as nptest
+import scipy.optimize as opt
+import scipy.stats as stats
+
+from wqio import testing
+
+import pandas as pd
+
+from wqio.algo import mle
+
+
+class test_CensoredMLE(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.values = self.data['res'].values
+        self.censored = (self.data['qual'] == 'ND').values
+        self.mle = mle.CensoredMLE(self.values, self.censored)
+
+        self.known_mu = 2.08485212
+        self.known_sigma = 0.61477287
+        self.known_loglike = -31.60641632
+
+    def test_counts(self):
+        assert_equal(self.mle.N_tot, 35)
+        assert_equal(self.mle.N_nd, 7)
+
+    def test_converged(self):
+        assert_true(self.mle.converged)
+
+    def test_params(self):
+        assert_almost_equal(self.mle.mu, self.known_mu)
+        assert_almost_equal(self.mle.sigma, self.known_sigma)
+        assert_almost_equal(self.mle.loglike, self.known_loglike)
+
+    def test_mean_std(self):
+        mean = np.exp(self.known_mu + 0.5 * self.known_sigma ** 2)
+        std = mean * np.sqrt(np.exp(self.known_sigma ** 2) - 1)
+        assert_almost_equal(self.mle.mean, mean, places=6)
+        assert_almost_equal(self.mle.std, std, places=6)
+
+    def test_norm(self):
+        y = self.values
+        c = self.censored
+
+        def nll(params):
+            mu, sigma = params
+            return -(stats.norm.logpdf(y[~c], mu, sigma).sum() +
+                     stats.norm.logcdf((y[c] - mu) / sigma).sum())
+
+        known = opt.fmin(nll, [y.mean(), y.std()], xtol=1e-10, ftol=1e-12,
+                         disp=False)
+        result = mle.CensoredMLE(y, c, dist='norm')
+        nptest.assert_array_almost_equal([result.mean, result.std], known,
+                                         decimal=5)
+
+    def test_uncensored(self):
+        result = mle.CensoredMLE(self.values, np.zeros_like(self.censored))
+        logs = np.log(self.values)
+        assert_almost_equal(result.mu, logs.mean())
+        assert_almost_equal(result.sigma, logs.std())
+
+    def test_too_few_detects(self):
+        censored = np.ones_like(self.censored)
+        censored[0] = False
+        result = mle.CensoredMLE(self.values, censored)
+        assert_true(np.isnan(result.mean))
+        assert_false(result.converged)
+
+    @raises(ValueError)
+    def test_bad_dist(self):
+        mle.CensoredMLE(self.values, self.censored, dist='gamma')
+
+    @raises(ValueError)
+    def test_negative_values(self):
+        values = self.values.copy()
+        values[0] = -1
+        mle.CensoredMLE(values, self.censored)
+
+
+class test_mle_groups(object):
+    def setup(self):
+        np.random.seed(0)
+        groups = []
+        for n, site in enumerate('ABCDEFGH'):
+            values = np.random.lognormal(mean=n / 4., sigma=1.0, size=25)
+            DL = np.percentile(values, 10 * n)
+            groups.append(pd.DataFrame({
+                'site': site,
+                'res': np.maximum(values, DL),
+                'qual': np.where(values < DL, 'ND', '='),
+            }))
+        self.data = pd.concat(groups, ignore_index=True)
+        self.stats = mle.mle_groups(self.data, 'site')
+
+    def test_columns(self):
+        known = ['count', 'ND', 'mu', 'sigma', 'mean', 'std', 'converged']
+        assert_list_equal(self.stats.columns.tolist(), known)
+
+    def test_index(self):
+        assert_list_equal(self.stats.index.tolist(), list('ABCDEFGH'))
+
+    def test_converged(self):
+        assert_true(self.stats['converged'].all())
+
+    def test_same_as_CensoredMLE(self):
+        for site, group in self.data.groupby('site'):
+            known = mle.CensoredMLE(group['res'].values,
+                                    (group['qual'] == 'ND').values)
+            assert_almost_equal(self.stats.loc[site, 'mu'], known.mu)
+            assert_almost_equal(self.stats.loc[site, 'sigma'], known.sigma)
+            assert_equal(self.stats.loc[site, 'ND'], known.N_nd)
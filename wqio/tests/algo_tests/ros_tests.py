@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 
 from nose.tools import *
 import numpy as np
@@ -11,6 +13,7 @@ import matplotlib
 matplotlib.rcParams['text.usetex'] = usetex
 
 import pandas as pd
+import pandas.util.testing as pdtest
 
 from wqio.algo import ros
 
@@ -36,6 +39,36 @@ def test_rosSort():
     pass
 
 
+
+def test__dl_index():
+    DLs = np.array([2., 5., 5.5, 11.])
+    values = np.array([1., 2., 4.9, 5., 5.5, 6., 11., 30.])
+    known = np.array([-1, 0, 0, 1, 2, 2, 3, 3])
+    nptest.assert_array_equal(ros._dl_index(DLs, values), known)
+
+
+
+def test__cohn_counts():
+    data = testing.getTestROSData()
+    res = data['res'].values
+    censored = (data['qual'] == 'ND').values
+    DLs = np.array([2., 5., 5.5, 5.75, 9.5, 11.])
+    upper = np.append(DLs[1:], np.inf)
+    A, B, C = ros._cohn_counts(np.sort(res[~censored]),
+                               np.sort(res[censored]),
+                               DLs, upper, -np.inf)
+    nptest.assert_array_equal(A, [3, 0, 2, 10, 2, 11])
+    nptest.assert_array_equal(B, [0, 5, 6, 9, 21, 24])
+    nptest.assert_array_equal(C, [0, 2, 1, 1, 2, 1])
+
+
+
+def test__run_ranks():
+    newrun = np.array([True, False, True, True, False, False, True])
+    known = np.array([1., 2., 1., 1., 2., 3., 1.])
+    nptest.assert_array_equal(ros._run_ranks(newrun), known)
+
+
 class _baseMR_Mixin:
     @nottest
     def makePath(self, filename):
@@ -85,11 +118,27 @@ class _baseMR_Mixin:
     def test_DLs_values(self):
         nptest.assert_array_equal(self.mr.DLs.DL[:-1], np.array([2., 5., 5.5, 5.75, 9.5, 11.]))
 
+    def test_DLIndex(self):
+        DLIndex = self.mr.debug['DLIndex'].values
+        res = self.mr.debug['res'].values
+        lower = self.mr.DLs['lower'].values[DLIndex]
+        upper = self.mr.DLs['upper'].values[DLIndex]
+        assert_true(np.all(lower <= res))
+        assert_true(np.all(res < upper))
+
     def test_MR_ABC(self):
         known_abc = (0.0, 5.0, 2.0)
         abc = (self.mr.DLs.A[1], self.mr.DLs.B[1], self.mr.DLs.C[1])
         assert_tuple_equal(abc, known_abc)
 
+    def test_MR_ABC_all(self):
+        known_A = np.array([3., 0., 2., 10., 2., 11.])
+        known_B = np.array([0., 5., 6., 9., 21., 24.])
+        known_C = np.array([0., 2., 1., 1., 2., 1.])
+        nptest.assert_array_equal(self.mr.DLs.A[:-1], known_A)
+        nptest.assert_array_equal(self.mr.DLs.B[:-1], known_B)
+        nptest.assert_array_equal(self.mr.DLs.C[:-1], known_C)
+
     def test_MR_rosEstimator(self):
         known_z = np.array([
             -2.06188401, -1.66883254, -1.4335397, -1.25837339, -1.11509471,
@@ -122,6 +171,18 @@ class _baseMR_Mixin:
     #    assert_true(hasattr(self.mr, 'plot'))
     #    self.mr.plot(self.makePath('test_plot.png'))
 
+    def test_cohn(self):
+        pdtest.assert_frame_equal(self.mr.cohn(), self.mr.DLs)
+
+    def test_estimator(self):
+        pdtest.assert_frame_equal(self.mr.estimator(), self.mr.debug)
+
+    def test__ros_ranks(self):
+        ranks = self.mr._ros_ranks()
+        assert_list_equal(ranks.columns.tolist(), ['Norm Ranks', 'Avg Ranks'])
+        nptest.assert_array_equal(ranks['Avg Ranks'],
+                                  self.mr.debug['Avg Ranks'])
+
     @raises(ValueError)
     def test_dup_index_error(self):
         data = self.data.append(self.data)
@@ -143,6 +204,20 @@ class test_MR_baseline(_baseMR_Mixin):
         else:
             self.prefix = os.path.join('..', 'utils', 'tests', 'result_images')
 
+    def test_ranks(self):
+        known_norm = np.array([
+            1., 2., 1., 1., 1., 2., 1., 1., 2., 3., 1., 2., 1., 2., 3., 4.,
+            5., 6., 7., 8., 9., 10., 1., 2., 1., 2., 3., 4., 5., 6., 7., 8.,
+            9., 10., 11.
+        ])
+        known_avg = np.array([
+            1., 2., 1., 1., 1., 2., 1., 1., 2., 3., 1., 2., 1., 2., 3., 4.,
+            6., 6., 6., 8., 9., 10., 1., 2., 1.5, 1.5, 3., 4., 5., 6., 7., 8.,
+            9., 10., 11.
+        ])
+        nptest.assert_array_equal(self.mr.debug['Norm Ranks'], known_norm)
+        nptest.assert_array_equal(self.mr.debug['Avg Ranks'], known_avg)
+
 
 class test_MR_weirdNDsymbol(_baseMR_Mixin):
     def setup(self):
@@ -155,3 +230,403 @@ class test_MR_weirdNDsymbol(_baseMR_Mixin):
         else:
             self.prefix = os.path.join('..', 'utils', 'tests', 'result_images')
 
+
+class test_MR_lean(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.known = ros.MR(self.data)
+        self.mr = ros.MR(self.data, lean=True)
+
+    def test_lean(self):
+        assert_true(self.mr.lean)
+        assert_false(self.known.lean)
+        assert_true(self.mr._data is None)
+        assert_true(self.mr._debug is None)
+
+    def test_censored(self):
+        assert_equal(self.mr.censored.dtype, np.bool_)
+        nptest.assert_array_equal(self.mr.censored,
+                                  self.known.data['qual'].values == 'ND')
+
+    def test_arrays(self):
+        nptest.assert_array_equal(self.mr.index, self.known.data.index)
+        nptest.assert_array_equal(self.mr.res, self.known.data['res'])
+        nptest.assert_array_equal(self.mr.final, self.known.data['final_data'])
+
+    def test_fit(self):
+        nptest.assert_array_equal(self.mr.fit, self.known.fit)
+
+    def test_DLs(self):
+        pd.util.testing.assert_frame_equal(self.mr.DLs, self.known.DLs)
+
+    def test_data(self):
+        pd.util.testing.assert_frame_equal(self.mr.data, self.known.data)
+        assert_true(self.mr._data is None)
+
+    def test_debug(self):
+        pd.util.testing.assert_frame_equal(self.mr.debug, self.known.debug)
+        assert_true(self.mr._debug is None)
+
+
+class test_ros_estimate(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.values = self.data['res'].values
+        self.censored = (self.data['qual'] == 'ND').values
+        self.final, self.fit = ros.ros_estimate(self.values, self.censored)
+        self.mr = ros.MR(self.data)
+
+    def test_final_order(self):
+        known = self.mr.data['final_data'].sort_index().values
+        nptest.assert_array_almost_equal(self.final, known)
+
+    def test_detects_unchanged(self):
+        nptest.assert_array_equal(self.final[~self.censored],
+                                  self.values[~self.censored])
+
+    def test_fit(self):
+        nptest.assert_array_almost_equal(self.fit, self.mr.fit[:2])
+
+    def test_no_NDs(self):
+        final, fit = ros.ros_estimate(self.values, np.zeros_like(self.censored))
+        nptest.assert_array_equal(final, self.values)
+        assert_true(np.all(np.isnan(fit)))
+
+    def test_half_DL(self):
+        censored = np.ones_like(self.censored)
+        censored[0] = False
+        final, fit = ros.ros_estimate(self.values, censored)
+        nptest.assert_array_almost_equal(final[1:], 0.5 * self.values[1:])
+        assert_true(np.all(np.isnan(fit)))
+
+    def test_no_logs(self):
+        final, (slope, intercept) = ros.ros_estimate(self.values, self.censored,
+                                                     fitlogs=False)
+        nptest.assert_array_equal(final[~self.censored],
+                                  self.values[~self.censored])
+
+        # the regression is on the untransformed detects, so the
+        # estimates are linear in the same units as the data
+        mr = ros.MR(self.data, fitlogs=False)
+        Z = mr.debug['Zprelim'].sort_index().values
+        nptest.assert_array_almost_equal(final[self.censored],
+                                         slope * Z[self.censored] + intercept)
+
+    @raises(ValueError)
+    def test_negative_values(self):
+        values = self.values.copy()
+        values[0] = -1
+        ros.ros_estimate(values, self.censored)
+
+    @raises(ValueError)
+    def test_bad_censored(self):
+        ros.ros_estimate(self.values, self.censored[:-1])
+
+
+class test_ros_groups(object):
+    def setup(self):
+        data = testing.getTestROSData()
+        other = data.copy()
+        other['res'] = other['res'] * 2
+        other.loc[other.index[:20], 'qual'] = 'ND'
+        data['site'] = 'B'
+        other['site'] = 'A'
+        self.data = pd.concat([data, other], ignore_index=True)
+        self.rosdata = ros.ros_groups(self.data, 'site')
+
+    def test_columns(self):
+        assert_list_equal(self.rosdata.columns.tolist(),
+                          self.data.columns.tolist() + ['final_data'])
+
+    def test_group_order(self):
+        nptest.assert_array_equal(self.rosdata['site'].values[:35], ['A'] * 35)
+        nptest.assert_array_equal(self.rosdata['site'].values[35:], ['B'] * 35)
+
+    def test_same_as_MR(self):
+        for site, group in self.data.groupby('site'):
+            known = ros.MR(group.drop('site', axis=1)).data
+            result = self.rosdata[self.rosdata['site'] == site]
+            nptest.assert_array_equal(result.index, known.index)
+            nptest.assert_array_almost_equal(result['final_data'],
+                                             known['final_data'])
+
+    def test_custom_columns(self):
+        data = self.data.rename(columns={'res': 'conc', 'qual': 'flag'})
+        data['flag'] = data['flag'].replace({'ND': '<'})
+        rosdata = ros.ros_groups(data, ['site'], rescol='conc',
+                                 qualcol='flag', ndsymbol='<')
+        nptest.assert_array_almost_equal(rosdata['final_data'],
+                                         self.rosdata['final_data'])
+
+    @raises(ValueError)
+    def test_negative_values(self):
+        data = self.data.copy()
+        data.loc[0, 'res'] = -1
+        ros.ros_groups(data, 'site')
+
+
+class test_ROSMemo(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.values = self.data['res'].values
+        self.censored = (self.data['qual'] == 'ND').values
+        self.cachedir = tempfile.mkdtemp()
+        self.memo = ros.ROSMemo(maxsize=2)
+
+    def teardown(self):
+        shutil.rmtree(self.cachedir)
+
+    def test_key(self):
+        key1 = ros.ROSMemo.key(self.values, self.censored)
+        key2 = ros.ROSMemo.key(self.values.copy(), self.censored.copy())
+        assert_equal(key1, key2)
+
+        censored = self.censored.copy()
+        censored[-1] = True
+        assert_not_equal(key1, ros.ROSMemo.key(self.values, censored))
+        assert_not_equal(key1, ros.ROSMemo.key(self.values, self.censored,
+                                               fitlogs=False))
+
+    def test_hits(self):
+        final1, fit1 = ros.ros_estimate(self.values, self.censored, memo=self.memo)
+        final2, fit2 = ros.ros_estimate(self.values, self.censored, memo=self.memo)
+        mr = ros.MR(self.data, memo=self.memo)
+        assert_equal(self.memo.misses, 1)
+        assert_equal(self.memo.hits, 2)
+        nptest.assert_array_equal(final1, final2)
+        nptest.assert_array_almost_equal(
+            mr.data['final_data'].sort_index().values, final1
+        )
+
+    def test_copies(self):
+        ros.ros_estimate(self.values, self.censored, memo=self.memo)
+        final, fit = ros.ros_estimate(self.values, self.censored, memo=self.memo)
+        final[:] = -1
+        final, fit = ros.ros_estimate(self.values, self.censored, memo=self.memo)
+        assert_true(np.all(final > 0))
+
+    def test_lru(self):
+        for factor in [1, 2, 3]:
+            ros.ros_estimate(self.values * factor, self.censored, memo=self.memo)
+        assert_equal(len(self.memo._memory), 2)
+        ros.ros_estimate(self.values, self.censored, memo=self.memo)
+        assert_equal(self.memo.misses, 4)
+
+    def test_disk(self):
+        memo = ros.ROSMemo(cachedir=self.cachedir)
+        known, fit = ros.ros_estimate(self.values, self.censored, memo=memo)
+        assert_equal(len(os.listdir(self.cachedir)), 1)
+
+        memo = ros.ROSMemo(cachedir=self.cachedir)
+        final, fit = ros.ros_estimate(self.values, self.censored, memo=memo)
+        assert_equal(memo.hits, 1)
+        nptest.assert_array_equal(final, known)
+
+    def test_groups(self):
+        siteA = self.data.copy()
+        siteA['site'] = 'A'
+        siteB = self.data.copy()
+        siteB['site'] = 'B'
+        siteB['res'] *= 2
+        data = pd.concat([siteA, siteB], ignore_index=True)
+        known = ros.ros_groups(data, 'site')
+
+        # estimate one of the groups on its own first
+        ros.ros_estimate(self.values, self.censored, memo=self.memo)
+        result = ros.ros_groups(data, 'site', memo=self.memo)
+        assert_equal(self.memo.hits, 1)
+        assert_equal(self.memo.misses, 2)
+        pd.util.testing.assert_frame_equal(result, known)
+
+        # all groups are found the second time around
+        result = ros.ros_groups(data, 'site', memo=self.memo)
+        assert_equal(self.memo.hits, 3)
+        pd.util.testing.assert_frame_equal(result, known)
+
+
+class test_ROSState(object):
+    def setup(self):
+        data = testing.getTestROSData()
+        self.values = data['res'].values
+        self.censored = (data['qual'] == 'ND').values
+        self.DLs = np.unique(self.values[self.censored])
+        self.state = ros.ROSState(self.values, self.censored)
+        self.known_DL = self.state.DL.copy()
+
+    def check_append(self, values, censored):
+        result = self.state.append(values, censored)
+        known = ros._ros_kernel(np.hstack([self.values, values]),
+                                np.hstack([self.censored, censored]))
+        for key in ['order', 'res', 'censored', 'DLIndex', 'rank', 'final',
+                    'DL', 'A', 'B', 'C', 'PE', 'slope', 'intercept']:
+            nptest.assert_array_almost_equal(result[key], known[key])
+
+    def test_initial(self):
+        known = ros._ros_kernel(self.values, self.censored)
+        nptest.assert_array_almost_equal(self.state.rosfit['final'],
+                                         known['final'])
+
+    def test_append_same_DLs(self):
+        values = np.array([self.DLs[0], self.DLs[-1], 7.5, 30.])
+        censored = np.array([True, True, False, False])
+        self.check_append(values, censored)
+        nptest.assert_array_equal(self.state.DL, self.known_DL)
+
+    def test_append_new_DL(self):
+        values = np.array([self.DLs[0] * 1.5, 30.])
+        censored = np.array([True, False])
+        self.check_append(values, censored)
+        assert_equal(self.state.DL.shape[0], self.known_DL.shape[0] + 1)
+
+    def test_append_twice(self):
+        self.state.append([12.], [False])
+        self.values = np.append(self.values, 12.)
+        self.censored = np.append(self.censored, False)
+        self.check_append(np.array([self.DLs[1]]), np.array([True]))
+
+    def test_append_nothing(self):
+        known = self.state.rosfit
+        result = self.state.append([], [])
+        assert_true(result is known)
+
+    @raises(ValueError)
+    def test_negative_values(self):
+        self.state.append([-1.], [False])
+
+
+class test_MR_append(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.mr = ros.MR(self.data.iloc[:25], lean=True)
+        self.mr.append(self.data.iloc[25:])
+        self.known = ros.MR(self.data, lean=True)
+
+    def test_arrays(self):
+        nptest.assert_array_equal(self.mr.index, self.known.index)
+        nptest.assert_array_equal(self.mr.res, self.known.res)
+        nptest.assert_array_almost_equal(self.mr.final, self.known.final)
+
+    def test_counts(self):
+        assert_equal(self.mr.N_tot, self.known.N_tot)
+        assert_equal(self.mr.N_nd, self.known.N_nd)
+
+    def test_fit(self):
+        nptest.assert_array_almost_equal(self.mr.fit, self.known.fit)
+
+    def test_DLs(self):
+        pd.util.testing.assert_frame_equal(self.mr.DLs, self.known.DLs,
+                                           check_dtype=False)
+
+    def test_debug(self):
+        pd.util.testing.assert_frame_equal(self.mr.debug, self.known.debug)
+
+    @raises(ValueError)
+    def test_not_lean(self):
+        mr = ros.MR(self.data.iloc[:25])
+        mr.append(self.data.iloc[25:])
+
+    @raises(ValueError)
+    def test_overlapping_index(self):
+        self.mr.append(self.data.iloc[:5])
+
+
+class test_ros_impute(object):
+    def setup(self):
+        np.random.seed(0)
+        self.data = testing.getTestROSData()
+        self.values = self.data['res'].values
+        self.censored = (self.data['qual'] == 'ND').values
+        self.M = 500
+        self.imputations = ros.ros_impute(self.values, self.censored, M=self.M)
+
+    def test_shape(self):
+        assert_tuple_equal(self.imputations.shape, (self.M, 35))
+
+    def test_detects_unchanged(self):
+        detects = self.imputations[:, ~self.censored]
+        nptest.assert_array_equal(detects,
+                                  np.tile(self.values[~self.censored], (self.M, 1)))
+
+    def test_below_DLs(self):
+        NDs = self.imputations[:, self.censored]
+        assert_true(np.all(NDs > 0))
+        assert_true(np.all(NDs < self.values[self.censored]))
+
+    def test_stochastic(self):
+        NDs = self.imputations[:, self.censored]
+        assert_true(np.all(NDs.std(axis=0) > 0))
+
+    def test_close_to_estimate(self):
+        final, fit = ros.ros_estimate(self.values, self.censored)
+        nptest.assert_allclose(self.imputations.mean(axis=0), final, rtol=0.25)
+
+    def test_no_ros(self):
+        censored = np.ones_like(self.censored)
+        censored[0] = False
+        imputations = ros.ros_impute(self.values, censored, M=10)
+        final, fit = ros.ros_estimate(self.values, censored)
+        nptest.assert_array_equal(imputations, np.tile(final, (10, 1)))
+
+    def test_groups(self):
+        values = np.hstack([self.values, self.values * 2])
+        censored = np.hstack([self.censored, self.censored])
+        groups = np.repeat(['A', 'B'], 35)
+        imputations = ros.ros_impute(values, censored, M=10, groups=groups)
+        assert_tuple_equal(imputations.shape, (10, 70))
+        assert_true(np.all(imputations[:, 35:][:, self.censored] <
+                           2 * self.values[self.censored]))
+
+    def test_MR_impute(self):
+        mr = ros.MR(self.data, lean=True)
+        imputations = mr.impute(M=20)
+        assert_tuple_equal(imputations.shape, (20, 35))
+        nptest.assert_array_equal(imputations[:, ~mr.censored][0],
+                                  mr.final[~mr.censored])
+        assert_true(np.all(imputations[:, mr.censored] < mr.res[mr.censored]))
+
+    @raises(ValueError)
+    def test_negative_values(self):
+        values = self.values.copy()
+        values[0] = -1
+        ros.ros_impute(values, self.censored)
+
+
+class test_censored_mask(object):
+    def setup(self):
+        self.quals = np.array(['ND', '=', '<', 'U', 'J<', 'J', '=', 'ND'],
+                              dtype=object)
+        self.known = np.array([True, False, True, True, True, False, False, True])
+        self.symbols = ['ND', '<', 'U', 'J<']
+
+    def test_single_symbol(self):
+        mask = ros.censored_mask(self.quals, 'ND')
+        nptest.assert_array_equal(mask, self.quals == 'ND')
+        assert_equal(mask.dtype, np.bool_)
+
+    def test_multiple_symbols(self):
+        mask = ros.censored_mask(self.quals, self.symbols)
+        nptest.assert_array_equal(mask, self.known)
+
+    def test_set_of_symbols(self):
+        mask = ros.censored_mask(pd.Series(self.quals), set(self.symbols))
+        nptest.assert_array_equal(mask, self.known)
+
+    def test_categorical(self):
+        quals = pd.Series(self.quals).astype('category')
+        mask = ros.censored_mask(quals, self.symbols)
+        nptest.assert_array_equal(mask, self.known)
+
+    def test_missing(self):
+        quals = pd.Series(['ND', None, '=', np.nan])
+        mask = ros.censored_mask(quals, 'ND')
+        nptest.assert_array_equal(mask, [True, False, False, False])
+
+    def test_MR(self):
+        data = testing.getTestROSData()
+        known = ros.MR(data)
+
+        # spread the NDs over several different flags
+        flags = np.array(['ND', '<', 'U'] * 12)[:data.shape[0]]
+        data['qual'] = np.where(data['qual'] == 'ND', flags, data['qual'])
+        mr = ros.MR(data, ndsymbol=['ND', '<', 'U'])
+        pd.util.testing.assert_frame_equal(mr.data, known.data)
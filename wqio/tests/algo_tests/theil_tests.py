@@ -0,0 +1,119 @@
+from nose.tools import *
+import numpy as np
+import numpy.testing as nptest
+import scipy.stats as stats
+
+from wqio.algo import theil
+
+
+def test__count_inversions():
+    np.random.seed(0)
+    ranks = np.random.randint(0, 20, size=200)
+    known = sum(
+        1 for i in range(200) for j in range(i + 1, 200)
+        if ranks[i] >= ranks[j]
+    )
+    assert_equal(theil._count_inversions(ranks), known)
+
+
+def test__count_inversions_small():
+    assert_equal(theil._count_inversions([]), 0)
+    assert_equal(theil._count_inversions([3]), 0)
+    assert_equal(theil._count_inversions([0, 1, 2, 3]), 0)
+    assert_equal(theil._count_inversions([3, 2, 1, 0]), 6)
+
+
+class test__SlopeCounter(object):
+    def setup(self):
+        np.random.seed(0)
+        self.x = np.round(np.random.lognormal(size=100), 1)
+        self.y = np.round(2 * self.x + np.random.normal(size=100), 1)
+        self.counter = theil._SlopeCounter(self.x, self.y)
+
+        dx = self.x[None, :] - self.x[:, None]
+        dy = self.y[None, :] - self.y[:, None]
+        self.slopes = np.sort(dy[dx > 0] / dx[dx > 0])
+
+    def test_total(self):
+        assert_equal(self.counter.total, self.slopes.shape[0])
+
+    def test_counts(self):
+        # (away from slopes that exactly tie with `t`)
+        for t in [-100, -1.01, 0.013, 1.57, 2.03, 2.51, 100]:
+            assert_equal(self.counter(t), np.sum(self.slopes <= t))
+
+    def test_between(self):
+        slopes = self.counter.between(1.57, 2.51)
+        known = self.slopes[(self.slopes > 1.57) & (self.slopes <= 2.51)]
+        nptest.assert_array_almost_equal(np.sort(slopes), known)
+
+    def test_nearest(self):
+        t = self.slopes[1234]
+        lo = np.nextafter(t, -np.inf)
+        assert_equal(self.counter.nearest(lo, t), t)
+
+
+class _base_theilslopes_Mixin(object):
+    def test_matches_scipy(self):
+        result = theil._theilslopes_counting(self.y, self.x)
+        known = stats.mstats.theilslopes(self.y, x=self.x)
+        nptest.assert_allclose(result, tuple(known)[:4], rtol=1e-12)
+
+
+class test_theilslopes_continuous(_base_theilslopes_Mixin):
+    def setup(self):
+        np.random.seed(0)
+        self.x = np.random.lognormal(size=300)
+        self.y = 0.5 * self.x + np.random.normal(size=300)
+
+
+class test_theilslopes_ties(_base_theilslopes_Mixin):
+    def setup(self):
+        np.random.seed(0)
+        self.x = np.round(np.random.lognormal(size=301), 1)
+        self.y = np.round(0.5 * self.x + np.random.normal(size=301), 1)
+
+
+class test_theilslopes_flat_ties(_base_theilslopes_Mixin):
+    def setup(self):
+        # most pairs tie at a slope of exactly zero
+        np.random.seed(0)
+        self.x = np.random.randint(0, 20, size=1500).astype(float)
+        self.y = np.random.randint(0, 5, size=1500).astype(float)
+
+    def test_exact_zero(self):
+        result = theil._theilslopes_counting(self.y, self.x)
+        assert_equal(result[0], 0.0)
+
+
+class test_theilslopes_even(_base_theilslopes_Mixin):
+    def setup(self):
+        self.x = np.arange(6, dtype=float)
+        self.y = np.array([1.0, 2.5, 2.0, 4.5, 4.0, 6.5])
+
+
+def test_theilslopes_small_uses_scipy():
+    x = np.array([1., 2., 3., 4., 5.])
+    y = np.array([2., 4.1, 5.9, 8.2, 9.9])
+    known = stats.mstats.theilslopes(y, x=x)
+    nptest.assert_array_equal(theil.theilslopes(y, x=x), tuple(known)[:4])
+
+
+def test_theilslopes_large():
+    np.random.seed(0)
+    x = np.random.uniform(0, 100, size=5000)
+    y = 3 * x + np.random.normal(size=5000)
+    medslope, intercept, loslope, hislope = theil.theilslopes(y, x=x)
+    assert_true(loslope < medslope < hislope)
+    assert_almost_equal(medslope, 3, places=2)
+
+
+def test_theilslopes_no_x():
+    y = np.array([1.0, 2.5, 2.0, 4.5, 4.0, 6.5])
+    nptest.assert_array_equal(theil.theilslopes(y),
+                              theil.theilslopes(y, x=np.arange(6.)))
+
+
+@raises(ValueError)
+def test_theilslopes_bad_lengths():
+    theil.theilslopes([1, 2, 3], x=[1, 2])
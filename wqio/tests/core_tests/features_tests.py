@@ -1,8 +1,10 @@
 import os
+import pickle
 
 from nose.tools import *
 import numpy as np
 import numpy.testing as nptest
+import scipy.stats as stats
 
 from wqio import testing
 from wqio.testing.testutils import setup_prefix
@@ -22,10 +24,13 @@ from wqio.core.features import (
     DrainageArea,
     Location,
     Dataset,
-    DataCollection
+    DataCollection,
+    LocationSummary,
+    LocationArray,
 )
 
 from wqio import utils
+from wqio import algo
 import warnings
 
 @nottest
@@ -417,6 +422,13 @@ class test_Location_ROS(_base_LocationMixin):
         self.known_filtered_shape = (27,2)
         self.known_filtered_data_shape = (27,)
 
+    def test_ros_lean(self):
+        assert_true(self.loc.ros.lean)
+        nptest.assert_array_equal(self.loc.data, self.loc.ros.data['final_data'])
+
+    def test_data_writeable(self):
+        assert_true(self.loc.data.flags.writeable)
+
 
 class test_Location_noROS(_base_LocationMixin):
     def setup(self):
@@ -474,6 +486,396 @@ class test_Location_noROS(_base_LocationMixin):
                                    rtol=self.tolerance)
 
 
+class test_Location_strata(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.data['season'] = ['winter', 'summer', 'summer', 'spring', 'autumn'] * 7
+        self.loc = Location(self.data, station_type='inflow', bsIter=1000,
+                            rescol='res', qualcol='qual', useROS=True,
+                            stratacol='season')
+
+    def teardown(self):
+        plt.close('all')
+
+    def test_strata_ROS(self):
+        assert_true(hasattr(self.loc, 'strata'))
+        known_strata = self.data['season'].loc[self.loc.ros.data.index].values
+        nptest.assert_array_equal(self.loc.strata, known_strata)
+
+    def test_strata_noROS(self):
+        self.loc.useROS = False
+        nptest.assert_array_equal(self.loc.strata, self.data['season'].values)
+
+    def test_median_conf_interval(self):
+        ci = self.loc.median_conf_interval
+        assert_true(ci[0] <= self.loc.median <= ci[1])
+
+    def test_no_strata(self):
+        loc = Location(self.data, station_type='inflow', bsIter=1000)
+        assert_true(loc.strata is None)
+
+
+class test_Location_rosBootstrap(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=True,
+                            rosBootstrap=True)
+
+    def teardown(self):
+        plt.close('all')
+
+    def test_rosBootstrap(self):
+        assert_true(hasattr(self.loc, 'rosBootstrap'))
+        assert_true(self.loc.rosBootstrap)
+
+    def test_mean_conf_interval(self):
+        ci = self.loc.mean_conf_interval
+        assert_true(ci[0] < self.loc.mean < ci[1])
+
+    def test_logmean_conf_interval(self):
+        ci = self.loc.logmean_conf_interval
+        assert_true(ci[0] < self.loc.logmean < ci[1])
+
+    def test_setter_clears_cache(self):
+        self.loc.mean
+        self.loc.rosBootstrap = False
+        assert_true('_mean_boostrap' not in self.loc._cache)
+
+
+class test_Location_analytic(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=True,
+                            analyticN=30)
+
+    def teardown(self):
+        plt.close('all')
+
+    def test_analyticN(self):
+        assert_equal(self.loc.analyticN, 30)
+
+    def test_ci_method(self):
+        assert_equal(self.loc.ci_method, 'analytic')
+
+    def test_mean(self):
+        assert_almost_equal(self.loc.mean, self.loc.data.mean())
+
+    def test_mean_conf_interval(self):
+        known_ci = algo.bootstrap.t_interval(self.loc.data)[1]
+        nptest.assert_array_almost_equal(self.loc.mean_conf_interval, known_ci)
+
+    def test_median(self):
+        assert_almost_equal(self.loc.median, np.median(self.loc.data))
+
+    def test_median_conf_interval(self):
+        known_ci = algo.bootstrap.median_interval(self.loc.data)[1]
+        nptest.assert_array_almost_equal(self.loc.median_conf_interval, known_ci)
+
+    def test_logmean_conf_interval(self):
+        known_ci = algo.bootstrap.t_interval(np.log(self.loc.data))[1]
+        nptest.assert_array_almost_equal(self.loc.logmean_conf_interval, known_ci)
+
+    def test_setter_switches_method(self):
+        self.loc.mean_conf_interval
+        self.loc.analyticN = 100
+        assert_true('_mean_boostrap' not in self.loc._cache)
+        assert_equal(self.loc.ci_method, 'bootstrap')
+
+
+class test_Location_lean(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=False)
+
+    def test_slots(self):
+        assert_false(hasattr(self.loc, '__dict__'))
+
+    @raises(AttributeError)
+    def test_no_new_attributes(self):
+        self.loc.junk = 1
+
+    def test_pickle(self):
+        self.loc.median
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            loc = pickle.loads(pickle.dumps(self.loc, protocol))
+            assert_equal(loc.median, self.loc.median)
+            assert_true('median' in loc._cache)
+            pdtest.assert_frame_equal(loc.filtered_data, self.data)
+
+    def test_no_copies(self):
+        assert_true(self.loc.filtered_data is self.data)
+
+    def test_data_shared(self):
+        assert_true(self.loc.data.flags.writeable)
+        assert_true(np.may_share_memory(self.loc.data, self.data['res'].values))
+
+    def test_filter_copy_on_write(self):
+        self.loc.filtered_data = self.data[self.data['res'] > 5]
+        assert_equal(self.loc.N, (self.data['res'] > 5).sum())
+        assert_true(self.loc._raw_data is self.data)
+        assert_equal(self.data.shape[0], 35)
+
+
+class test_Location_modes(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=True)
+
+    def test_toggle_keeps_stats(self):
+        ros_median = self.loc.median
+        self.loc.useROS = False
+        assert_true('median' not in self.loc._cache)
+        raw_median = self.loc.median
+        assert_true(raw_median != ros_median)
+
+        self.loc.useROS = True
+        assert_true('median' in self.loc._cache)
+        assert_equal(self.loc.median, ros_median)
+
+        self.loc.useROS = False
+        assert_equal(self.loc.median, raw_median)
+
+    def test_useKM_mode(self):
+        self.loc.median
+        self.loc.useKM = True
+        assert_true('median' not in self.loc._cache)
+        self.loc.useKM = False
+        assert_true('median' in self.loc._cache)
+
+    def test_reset_all_modes(self):
+        self.loc.median
+        self.loc.useROS = False
+        self.loc.median
+        self.loc.bsIter = 100
+        assert_true('median' not in self.loc._cache)
+        self.loc.useROS = True
+        assert_true('median' not in self.loc._cache)
+
+    def test_append_keeps_ros(self):
+        ros = self.loc.ros
+        self.loc.useROS = False
+        newdata = self.data.iloc[:3].copy()
+        newdata.index = newdata.index + 100
+        self.loc.append(newdata)
+        self.loc.useROS = True
+        assert_true(self.loc.ros is ros)
+        assert_equal(self.loc.ros.N_tot, 38)
+
+
+class test_Location_describe(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=True)
+        self.known = Location(self.data, station_type='inflow', bsIter=500,
+                              rescol='res', qualcol='qual', useROS=True)
+
+    def test_summary(self):
+        summary = self.loc.describe()
+        assert_true(isinstance(summary, LocationSummary))
+        assert_equal(summary.N, 35)
+        assert_equal(summary.ND, 7)
+        assert_almost_equal(summary.median, np.median(self.known.data))
+        assert_almost_equal(summary.mean, np.mean(self.known.data))
+        for attr in ['NUnique', 'fractionND', 'min', 'max', 'pctl10',
+                     'pctl25', 'pctl75', 'pctl90', 'std', 'cov', 'skew',
+                     'logmean', 'logstd', 'geomean', 'geostd']:
+            assert_almost_equal(getattr(summary, attr),
+                                getattr(self.known, attr))
+
+    def test_fills_cache(self):
+        self.loc.describe()
+        for attr in ['N', 'ND', 'min', 'pctl25', 'pctl90', 'skew', 'geostd']:
+            assert_true(attr in self.loc._cache)
+        assert_true('median' not in self.loc._cache)
+
+    def test_analytic(self):
+        self.loc.analyticN = 10
+        summary = self.loc.describe()
+        assert_equal(self.loc.median, summary.median)
+        assert_equal(self.loc.mean, summary.mean)
+
+    def test_KM(self):
+        self.loc.useKM = True
+        summary = self.loc.describe()
+        assert_almost_equal(summary.median, self.loc.km.median)
+        assert_almost_equal(summary.pctl25, self.loc.km.percentile(25))
+        assert_almost_equal(summary.std, self.loc.km.std)
+
+    def test_nonpositive(self):
+        data = self.data.copy()
+        data['res'] -= 5
+        summary = Location(data, useROS=False).describe()
+        assert_true(summary.logmean is None)
+        assert_true(summary.geostd is None)
+
+    def test_no_data(self):
+        loc = Location(self.data[self.data['res'] < 0], useROS=False)
+        assert_true(loc.describe() is None)
+
+
+class test_Location_KM(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=True,
+                            useKM=True)
+
+    def test_useKM(self):
+        assert_true(self.loc.useKM)
+        self.loc.median
+        self.loc.useKM = False
+        assert_true('median' not in self.loc._cache)
+
+    def test_km(self):
+        assert_true(isinstance(self.loc.km, algo.km.KaplanMeier))
+        assert_equal(self.loc.km.N_tot, 35)
+        assert_equal(self.loc.km.N_nd, 7)
+
+    def test_stats(self):
+        assert_almost_equal(self.loc.mean, self.loc.km.mean)
+        assert_almost_equal(self.loc.std, self.loc.km.std)
+        assert_almost_equal(self.loc.median, 7.5)
+        assert_almost_equal(self.loc.pctl25, 5.57)
+        assert_almost_equal(self.loc.pctl90, 19.19)
+
+    def test_ci_from_km(self):
+        np.random.seed(0)
+        ci = self.loc.median_conf_interval
+        np.random.seed(0)
+        bs = algo.bootstrap.KMStat(self.data['res'].values,
+                                   (self.data['qual'] == 'ND').values,
+                                   statistic='median', NIter=500)
+        nptest.assert_array_almost_equal(ci, bs.BCA()[1])
+
+    def test_ci_contains_km(self):
+        np.random.seed(0)
+        data = pandas.DataFrame({'res': np.random.lognormal(size=60)})
+        data['qual'] = np.where(data['res'] < 1.5, 'ND', '=')
+        data.loc[data['qual'] == 'ND', 'res'] = 1.5
+
+        loc = Location(data, bsIter=500, useROS=True, useKM=True,
+                       analyticN=10)
+        assert_equal(loc.ci_method, 'bootstrap')
+        for stat in ['median', 'mean']:
+            lci, uci = getattr(loc, stat + '_conf_interval')
+            assert_true(lci <= getattr(loc, stat) <= uci)
+
+
+class test_Location_imputations(object):
+    def setup(self):
+        np.random.seed(0)
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=True,
+                            rosImputations=200)
+
+    def test_imputations(self):
+        assert_tuple_equal(self.loc.imputations.shape, (200, 35))
+
+    def test_pooled_stat(self):
+        stat, interval = self.loc.pooled_stat(np.median)
+        assert_almost_equal(stat, np.median(self.loc.imputations, axis=1).mean())
+        assert_true(interval[0] <= stat <= interval[1])
+        assert_almost_equal(stat, np.median(self.loc.data), places=0)
+
+    def test_setter(self):
+        self.loc.imputations
+        self.loc.rosImputations = 10
+        assert_tuple_equal(self.loc.imputations.shape, (10, 35))
+
+    @raises(ValueError)
+    def test_no_imputations(self):
+        self.loc.useROS = False
+        self.loc.pooled_stat(np.mean)
+
+
+class test_Location_ndsymbols(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        flags = np.array(['ND', '<', 'U'] * 12)[:self.data.shape[0]]
+        self.data['qual'] = np.where(self.data['qual'] == 'ND', flags,
+                                     self.data['qual'])
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=True,
+                            ndval=['ND', '<', 'U'])
+        self.known = Location(testing.getTestROSData(), station_type='inflow',
+                              bsIter=500, rescol='res', qualcol='qual',
+                              useROS=True)
+
+    def test_censored(self):
+        assert_equal(self.loc.censored.dtype, np.bool_)
+        nptest.assert_array_equal(self.loc.censored, self.known.censored)
+
+    def test_ND(self):
+        assert_equal(self.loc.ND, 7)
+
+    def test_min_DL(self):
+        assert_equal(self.loc.min_DL, self.known.min_DL)
+        assert_equal(self.loc.min_detect, self.known.min_detect)
+
+    def test_data(self):
+        nptest.assert_array_almost_equal(self.loc.data, self.known.data)
+
+
+class test_Location_append(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data.iloc[:25], station_type='inflow',
+                            bsIter=500, rescol='res', qualcol='qual',
+                            useROS=True)
+        self.ros = self.loc.ros
+        self.loc.append(self.data.iloc[25:])
+        self.known = Location(self.data, station_type='inflow', bsIter=500,
+                              rescol='res', qualcol='qual', useROS=True)
+
+    def test_N(self):
+        assert_equal(self.loc.N, self.known.N)
+        assert_equal(self.loc.ND, self.known.ND)
+
+    def test_ros_updated_in_place(self):
+        assert_true(self.loc.ros is self.ros)
+        assert_equal(self.loc.ros.N_tot, 35)
+
+    def test_data(self):
+        nptest.assert_array_almost_equal(self.loc.data, self.known.data)
+
+    def test_stats(self):
+        np.random.seed(0)
+        mean = self.loc.mean
+        np.random.seed(0)
+        assert_almost_equal(mean, self.known.mean)
+
+    def test_noROS(self):
+        loc = Location(self.data.iloc[:25], station_type='inflow',
+                       rescol='res', qualcol='qual', useROS=False)
+        loc.append(self.data.iloc[25:])
+        nptest.assert_array_equal(loc.data, self.data['res'].values)
+
+    def test_overlapping_index(self):
+        median = self.loc.median
+        for useROS in [True, False]:
+            self.loc.useROS = useROS
+            assert_raises(ValueError, self.loc.append, self.data.iloc[30:])
+            assert_equal(self.loc.N, 35)
+            assert_true(self.loc._raw_data.index.is_unique)
+
+        self.loc.useROS = True
+        assert_equal(self.loc.median, median)
+
+    def test_bad_values_unchanged(self):
+        bad = self.data.iloc[:2].copy()
+        bad.index = bad.index + 100
+        bad['res'] = -1.0
+        assert_raises(ValueError, self.loc.append, bad)
+        assert_equal(self.loc.N, 35)
+        assert_equal(self.loc.ros.N_tot, 35)
+
+
 @nottest
 def setup_location(station_type):
     data = testing.getTestROSData()
@@ -640,6 +1042,77 @@ def test_location_verticalScatter():
     loc.verticalScatter(markersize=8, xlims=xlims)
 
 
+class test_LocationArray(object):
+    def setup(self):
+        self.data = testing.getTestROSData()
+        self.locations = []
+        for n, scale in enumerate([1, 2, 10]):
+            data = self.data.copy()
+            data['res'] *= scale
+            data.loc[data.index[0], 'res'] = 250. * scale
+            loc = Location(data, station_type='inflow', bsIter=500,
+                           rescol='res', qualcol='qual', useROS=False)
+            loc.name = 'loc{}'.format(n)
+            self.locations.append(loc)
+
+        self.empty = Location(self.data[self.data['res'] < 0], useROS=False)
+        self.la = LocationArray.from_locations(self.locations + [self.empty])
+
+    def test_basics(self):
+        assert_equal(len(self.la), 4)
+        nptest.assert_array_equal(self.la.N, [35, 35, 35, 0])
+        assert_list_equal(self.la.labels[:3], ['loc0', 'loc1', 'loc2'])
+        nptest.assert_array_equal(self.la.data(1),
+                                  np.sort(self.locations[1].data))
+
+    def test_percentile(self):
+        pctl = self.la.percentile(25)
+        for n, loc in enumerate(self.locations):
+            assert_almost_equal(pctl[n], loc.pctl25)
+        assert_true(np.isnan(pctl[3]))
+
+    def _check_bxp(self, log):
+        bxpstats = self.la.boxplot_stats(log=log)
+        assert_equal(len(bxpstats), 3)
+        for bxp, loc in zip(bxpstats, self.locations):
+            known = loc.boxplot_stats(log=log)[0]
+            assert_equal(bxp['label'], known['label'])
+            for key in ['q1', 'q3', 'whislo', 'whishi']:
+                assert_almost_equal(bxp[key], known[key])
+            nptest.assert_array_almost_equal(bxp['fliers'],
+                                             np.sort(known['fliers']))
+            assert_almost_equal(bxp['med'], np.median(loc.data))
+            assert_almost_equal(bxp['mean'], np.mean(loc.data))
+            assert_true(bxp['cilo'] < bxp['med'] < bxp['cihi'])
+
+    def test_boxplot_stats_log(self):
+        self._check_bxp(True)
+
+    def test_boxplot_stats_linear(self):
+        self._check_bxp(False)
+
+    def test_boxplot_stats_bacteria(self):
+        bxpstats = self.la.boxplot_stats(bacteria=True)
+        for bxp, loc in zip(bxpstats, self.locations):
+            assert_almost_equal(bxp['mean'], loc.geomean)
+
+    def test_from_dataframe(self):
+        frames = []
+        for loc in self.locations:
+            frame = loc.filtered_data.copy()
+            frame['site'] = loc.name
+            frames.append(frame)
+
+        df = pandas.concat(frames)
+        la = LocationArray.from_dataframe(df, 'site', rescol='res')
+        assert_list_equal(la.labels, ['loc0', 'loc1', 'loc2'])
+        nptest.assert_array_equal(la.values, self.la.values)
+
+    @raises(ValueError)
+    def test_bad_offsets(self):
+        LocationArray([1, 2, 3], [0, 2])
+
+
 class test_Dataset(object):
     def setup(self):
         self.maxDiff = None
@@ -700,6 +1173,16 @@ class test_Dataset(object):
         self.fig.clf()
         plt.close('all')
 
+    def test_useROS_keeps_stats(self):
+        self.ds.useROS = False
+        wilcoxon_p = self.ds.wilcoxon_p
+        self.ds.useROS = True
+        assert_true('wilcoxon_p' not in self.ds._cache)
+        assert_true(self.ds.influent.useROS)
+        self.ds.useROS = False
+        assert_true('wilcoxon_p' in self.ds._cache)
+        assert_equal(self.ds.wilcoxon_p, wilcoxon_p)
+
     @nottest
     def makePath(self, filename):
         return os.path.join(self.prefix, filename)
@@ -1109,6 +1592,55 @@ def make_dc_data():
     return data
 
 
+class test_Dataset_pairing(object):
+    def setup(self):
+        in_data = testing.getTestROSData()
+        in_data = in_data.iloc[::-1].copy()
+        in_data.loc[in_data.index[3], 'res'] = np.nan
+
+        out_data = testing.getTestROSData()
+        out_data.index = out_data.index + 10
+        out_data['res'] -= 1.5
+
+        self.influent = Location(in_data, station_type='inflow',
+                                 useROS=False)
+        self.effluent = Location(out_data, station_type='outflow',
+                                 useROS=False)
+        self.ds = Dataset(self.influent, self.effluent)
+
+    def test_matches_join(self):
+        known = self.ds.data.dropna()
+        pdtest.assert_frame_equal(self.ds.paired_data, known)
+        assert_equal(self.ds.n_pairs, 24)
+
+    def test_paired_res(self):
+        infl, effl = self.ds.paired_res
+        known = self.ds.data.dropna()
+        nptest.assert_array_equal(infl, known[('inflow', 'res')].values)
+        nptest.assert_array_equal(effl, known[('outflow', 'res')].values)
+
+    def test_paired_qual(self):
+        infl, effl = self.ds.paired_qual
+        known = self.ds.data.dropna()
+        nptest.assert_array_equal(infl, known[('inflow', 'qual')].values)
+        nptest.assert_array_equal(effl, known[('outflow', 'qual')].values)
+
+    def test_no_influent(self):
+        influent = Location(self.influent._raw_data.iloc[:0],
+                            station_type='inflow', useROS=False)
+        ds = Dataset(influent, self.effluent)
+        assert_equal(ds.n_pairs, 0)
+        assert_equal(ds.paired_data.shape, (0, 4))
+        assert_equal(ds.paired_res[0].shape[0], 0)
+
+    def test_duplicate_labels(self):
+        data = self.effluent._raw_data
+        effluent = Location(pandas.concat([data, data.iloc[:2]]),
+                            station_type='outflow', useROS=False)
+        ds = Dataset(self.influent, effluent)
+        pdtest.assert_frame_equal(ds.paired_data, ds.data.dropna())
+
+
 class _base_DataCollecionMixin(object):
     @nottest
     def _base_setup(self):
@@ -1320,3 +1852,240 @@ class test_DataCollection_baseline(_base_DataCollecionMixin):
                 'D': 0.4790, 'E': 0.7710, 'F': 0.6370, 'G': 0.3070
             }
         })
+
+
+class test_DataCollection_analytic(object):
+    def setup(self):
+        self.dc = DataCollection(make_dc_data(), paramcol='param',
+                                 stationcol='loc', analyticN=25)
+
+    def teardown(self):
+        plt.close('all')
+
+    def test_analyticN(self):
+        assert_equal(self.dc.analyticN, 25)
+
+    def test_means(self):
+        means = self.dc.means
+        known = self.dc.tidy.groupby(by=['param', 'loc'])['ros_res'].mean().unstack()
+        nptest.assert_array_almost_equal(
+            means.xs('stat', level=1, axis=1)[known.columns].values,
+            known.values
+        )
+
+    def test_methods(self):
+        methods = self.dc.medians.xs('method', level=1, axis=1)
+        assert_true((methods == 'analytic').all().all())
+
+    def test_std_devs_method(self):
+        np.random.seed(0)
+        dc = DataCollection(make_dc_data(), paramcol='param',
+                            stationcol='loc', analyticN=25, bsIter=100)
+        methods = dc.std_devs.xs('method', level=1, axis=1)
+        assert_true((methods == 'bootstrap').all().all())
+
+    def test_geomean(self):
+        geomean = self.dc.geomean
+        nptest.assert_array_almost_equal(
+            geomean.xs('stat', level=1, axis=1).values,
+            np.exp(self.dc.logmean.xs('stat', level=1, axis=1).values)
+        )
+        methods = geomean.xs('method', level=1, axis=1)
+        assert_true((methods == 'analytic').all().all())
+
+
+class test_DataCollection_KM(object):
+    def setup(self):
+        self.dc = DataCollection(make_dc_data(), paramcol='param',
+                                 stationcol='loc', useKM=True,
+                                 analyticN=25)
+
+    def teardown(self):
+        plt.close('all')
+
+    def test_km_stats(self):
+        stats = self.dc.km_stats
+        assert_equal(stats.shape[0], 24)
+        for (loc, param), group in self.dc.tidy.groupby(by=['loc', 'param']):
+            km = algo.km.KaplanMeier(group['res'].values,
+                                     (group['qual'] == 'ND').values)
+            assert_almost_equal(stats.loc[(loc, param), 'median'], km.median)
+            assert_almost_equal(stats.loc[(loc, param), 'mean'], km.mean)
+
+    def test_medians(self):
+        medians = self.dc.medians.xs('stat', level=1, axis=1)
+        known = self.dc.km_stats['median'].unstack(level='loc')
+        nptest.assert_array_almost_equal(medians[known.columns].values,
+                                         known.values)
+
+    def test_median_intervals(self):
+        medians = self.dc.medians
+        assert_true((medians.xs('method', level=1, axis=1) == 'bootstrap').all().all())
+        lower = medians.xs('lower', level=1, axis=1)
+        stat = medians.xs('stat', level=1, axis=1)
+        upper = medians.xs('upper', level=1, axis=1)
+        assert_true((lower <= stat).all().all())
+        assert_true((stat <= upper).all().all())
+
+    def test_percentiles(self):
+        pctl = self.dc.percentiles(30).xs('ros_res', level=1, axis=1)
+        loc = self.dc.selectLocations(squeeze=True, loc='Inflow', param='A')
+        assert_almost_equal(pctl.loc['A', 'Inflow'], loc.km.percentile(30))
+
+    def test_locations(self):
+        loc = self.dc.locations[0]
+        assert_true(loc.useKM)
+        assert_almost_equal(loc.median, loc.km.median)
+
+
+class test_DataCollection_MLE(object):
+    def setup(self):
+        self.dc = DataCollection(make_dc_data(), paramcol='param',
+                                 stationcol='loc')
+
+    def test_mle_stats(self):
+        stats = self.dc.mle_stats
+        assert_equal(stats.shape[0], 24)
+        assert_list_equal(stats.index.names, ['loc', 'param'])
+
+        group = self.dc.tidy[(self.dc.tidy['loc'] == 'Inflow') &
+                             (self.dc.tidy['param'] == 'A')]
+        known = algo.mle.CensoredMLE(group['res'].values,
+                                     (group['qual'] == 'ND').values)
+        assert_almost_equal(stats.loc[('Inflow', 'A'), 'mean'], known.mean)
+        assert_almost_equal(stats.loc[('Inflow', 'A'), 'std'], known.std)
+
+
+class test_DataCollection_location_array(object):
+    def setup(self):
+        self.dc = DataCollection(make_dc_data(), paramcol='param',
+                                 stationcol='loc')
+
+    def test_location_array(self):
+        la = self.dc.location_array
+        assert_equal(len(la), 24)
+        assert_equal(la.labels[0], ('Inflow', 'A'))
+        known_N = self.dc.tidy.groupby(['loc', 'param']).size().values
+        nptest.assert_array_equal(la.N, known_N)
+
+        group = self.dc.tidy[(self.dc.tidy['loc'] == 'Inflow') &
+                             (self.dc.tidy['param'] == 'A')]
+        nptest.assert_array_almost_equal(la.data(0), np.sort(group['ros_res']))
+
+        bxpstats = la.boxplot_stats()
+        assert_equal(len(bxpstats), 24)
+        assert_almost_equal(bxpstats[0]['med'], group['ros_res'].median())
+
+
+class test_DataCollection_dataset_stats(object):
+    def setup(self):
+        np.random.seed(0)
+        frames = []
+        for param in ['A', 'B', 'C']:
+            for station in ['inflow', 'outflow']:
+                data = testing.getTestROSData()
+                if station == 'outflow':
+                    data['res'] *= np.random.uniform(0.3, 1.1, data.shape[0])
+                data['station'] = station
+                data['parameter'] = param
+                frames.append(data.reset_index())
+
+        # C has no outflow data
+        data = pandas.concat(frames[:-1])
+        data = data.set_index(['station', 'parameter', 'index'])
+        self.dc = DataCollection(data, useROS=False)
+        self.stats = self.dc.dataset_stats()
+
+    def test_shape(self):
+        assert_list_equal(self.stats.index.tolist(), ['A', 'B', 'C'])
+        assert_equal(self.stats.index.name, 'parameter')
+        assert_true('wilcoxon_p' in self.stats.columns)
+        assert_true('theil_medslope' in self.stats.columns)
+
+    def test_matches_datasets(self):
+        for ds in self.dc.datasets[:2]:
+            row = self.stats.loc[ds.definition['parameter']]
+            for col in ['n_pairs', 'wilcoxon_z', 'wilcoxon_p',
+                        'mannwhitney_u', 'mannwhitney_p', 'kendall_tau',
+                        'kendall_p', 'spearman_rho', 'spearman_p',
+                        'ttest_t', 'ttest_p', 'levene_ks', 'levene_p',
+                        'theil_medslope', 'theil_intercept',
+                        'theil_loslope', 'theil_hislope']:
+                assert_almost_equal(row[col], getattr(ds, col), places=10)
+
+    def test_welch_ttest(self):
+        ds = self.dc.datasets[0]
+        row = self.stats.loc[ds.definition['parameter']]
+        known = stats.ttest_ind(ds.influent.data, ds.effluent.data,
+                                equal_var=False)
+        assert_almost_equal(row['ttest_t'], known[0])
+        assert_almost_equal(row['ttest_p'], known[1])
+
+    def test_missing_outflow(self):
+        assert_equal(self.stats.loc['C', 'n_pairs'], 0)
+        assert_true(self.stats.loc['C'].drop('n_pairs').isnull().all())
+
+    def test_processes(self):
+        pdtest.assert_frame_equal(self.dc.dataset_stats(processes=2),
+                                  self.stats)
+
+
+class test_DataCollection_imputations(object):
+    def setup(self):
+        np.random.seed(0)
+        self.dc = DataCollection(make_dc_data(), paramcol='param',
+                                 stationcol='loc', rosImputations=50)
+
+    def teardown(self):
+        plt.close('all')
+
+    def test_imputations(self):
+        assert_tuple_equal(self.dc.imputations.shape,
+                           (50, self.dc.tidy.shape[0]))
+
+    def test_pooled_stat(self):
+        pooled = self.dc.pooled_stat(np.mean, statname='mean')
+        assert_list_equal(pooled.columns.names, ['station', 'mean'])
+
+        stat = pooled.xs('stat', level=1, axis=1)
+        known = self.dc.tidy.groupby(by=['param', 'loc'])['ros_res'].mean().unstack()
+        nptest.assert_allclose(stat[known.columns].values, known.values,
+                               rtol=0.05)
+
+    def test_locations(self):
+        assert_equal(self.dc.locations[0].rosImputations, 50)
+
+
+class test_DataCollection_rosMemo(object):
+    def setup(self):
+        self.memo = algo.ros.ROSMemo(maxsize=1000)
+        self.dc = DataCollection(make_dc_data(), paramcol='param',
+                                 stationcol='loc', rosMemo=self.memo)
+        self.known_dc = DataCollection(make_dc_data(), paramcol='param',
+                                       stationcol='loc')
+
+    def teardown(self):
+        plt.close('all')
+
+    def test_tidy(self):
+        pdtest.assert_frame_equal(self.dc.tidy, self.known_dc.tidy)
+        assert_equal(self.memo.misses, 24)
+
+    def test_locations_reuse_tidy(self):
+        self.dc.tidy
+        for loc, known in zip(self.dc.locations, self.known_dc.locations):
+            assert_true(loc.rosMemo is self.memo)
+            nptest.assert_array_almost_equal(loc.data, known.data)
+        assert_equal(self.memo.misses, 24)
+        assert_equal(self.memo.hits, 24)
+
+    def test_useROS_toggle(self):
+        loc = self.dc.locations[0]
+        loc.data
+        hits = self.memo.hits
+        ros = loc.ros
+        loc.useROS = False
+        loc.useROS = True
+        loc.data
+        assert_equal(self.memo.hits, hits)
+        assert_true(loc.ros is ros)
@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import *
+import numpy as np
+import numpy.testing as nptest
+
+import pandas
+import pandas.util.testing as pdtest
+
+from wqio import testing
+from wqio import algo
+from wqio.core.features import Location, Dataset, DataCollection
+from wqio.core.snapshot import save_snapshot, load_snapshot
+
+
+class test_snapshot_Location(object):
+    def setup(self):
+        self.dirname = tempfile.mkdtemp()
+        self.data = testing.getTestROSData()
+        self.loc = Location(self.data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=True)
+        self.loc.definition = {'site': 'A'}
+
+        np.random.seed(0)
+        self.loc.median
+        self.loc.mean_conf_interval
+        self.loc.describe()
+        self.loc.useROS = False
+        self.loc.median
+        self.loc.useROS = True
+
+    def teardown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_manifest(self):
+        save_snapshot(self.loc, self.dirname)
+        assert_true('manifest.json' in os.listdir(self.dirname))
+
+    def test_restore_stats(self):
+        save_snapshot(self.loc, self.dirname)
+        loc = load_snapshot(self.dirname)
+        assert_true(isinstance(loc, Location))
+        assert_true('median' in loc._cache)
+        assert_equal(loc.median, self.loc.median)
+        assert_equal(loc.pctl25, self.loc.pctl25)
+        nptest.assert_array_equal(loc.mean_conf_interval,
+                                  self.loc.mean_conf_interval)
+        assert_dict_equal(loc.definition, {'site': 'A'})
+
+    def test_served_from_cache(self):
+        save_snapshot(self.loc, self.dirname)
+        loc = load_snapshot(self.dirname)
+        assert_true(isinstance(loc._cache['mean_conf_interval'], np.memmap))
+        assert_true(loc.mean_conf_interval is loc._cache['mean_conf_interval'])
+
+    def test_new_stats_after_restore(self):
+        save_snapshot(self.loc, self.dirname)
+        loc = load_snapshot(self.dirname)
+        assert_false('logmean_conf_interval' in loc._cache)
+        np.random.seed(0)
+        loc.logmean_conf_interval
+        assert_true('logmean_conf_interval' in loc._cache)
+
+    def test_restore_ros(self):
+        save_snapshot(self.loc, self.dirname)
+        loc = load_snapshot(self.dirname)
+        assert_true(isinstance(loc.ros, algo.ros.MR))
+        assert_true(isinstance(loc.ros.final, np.memmap))
+        nptest.assert_array_equal(loc.data, self.loc.data)
+        pdtest.assert_frame_equal(loc.ros.data, self.loc.ros.data)
+
+    def test_restored_data_writeable(self):
+        save_snapshot(self.loc, self.dirname)
+        loc = load_snapshot(self.dirname)
+        assert_true(loc.data.flags.writeable)
+        assert_equal(loc.NUnique, self.loc.NUnique)
+
+        loc.data[0] = -1
+        loc = load_snapshot(self.dirname)
+        assert_equal(loc.data[0], self.loc.data[0])
+
+    def test_restore_modes(self):
+        save_snapshot(self.loc, self.dirname)
+        loc = load_snapshot(self.dirname)
+        loc.useROS = False
+        assert_true('median' in loc._cache)
+        self.loc.useROS = False
+        assert_equal(loc.median, self.loc.median)
+
+    def test_no_mmap(self):
+        save_snapshot(self.loc, self.dirname)
+        loc = load_snapshot(self.dirname, mmap=False)
+        assert_false(isinstance(loc.ros.final, np.memmap))
+        pdtest.assert_frame_equal(loc.filtered_data, self.data)
+
+
+class test_snapshot_Dataset(object):
+    def setup(self):
+        self.dirname = tempfile.mkdtemp()
+        in_data = testing.getTestROSData()
+        in_data['res'] += 3
+
+        out_data = testing.getTestROSData()
+        out_data['res'] -= 1.5
+
+        influent = Location(in_data, station_type='inflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=False)
+        effluent = Location(out_data, station_type='outflow', bsIter=500,
+                            rescol='res', qualcol='qual', useROS=False)
+        self.ds = Dataset(influent, effluent, useROS=False, name='test')
+        self.ds.wilcoxon_p
+        self.ds.theil_medslope
+
+    def teardown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_restore(self):
+        save_snapshot(self.ds, self.dirname)
+        ds = load_snapshot(self.dirname)
+        assert_true(isinstance(ds, Dataset))
+        assert_equal(ds.name, 'test')
+        assert_true('wilcoxon_p' in ds._cache)
+        assert_equal(ds.wilcoxon_p, self.ds.wilcoxon_p)
+        assert_equal(ds.theil_medslope, self.ds.theil_medslope)
+        pdtest.assert_frame_equal(ds.paired_data, self.ds.paired_data)
+
+    def test_theilSlopes(self):
+        save_snapshot(self.ds, self.dirname)
+        ds = load_snapshot(self.dirname)
+        known = self.ds.theilSlopes(log_infl=True)
+        result = ds.theilSlopes(log_infl=True)
+        for key in ['medslope', 'intercept', 'loslope', 'hislope']:
+            nptest.assert_almost_equal(result[key], known[key])
+
+
+class test_snapshot_DataCollection(object):
+    def setup(self):
+        np.random.seed(0)
+        self.dirname = tempfile.mkdtemp()
+        self.data = testing.getTestROSData()
+        self.data['station'] = np.random.choice(['inflow', 'outflow'],
+                                                self.data.shape[0])
+        self.data['parameter'] = 'A'
+        self.data = self.data.reset_index().set_index(
+            ['station', 'parameter', 'index']
+        )
+        self.dc = DataCollection(self.data, bsIter=100, useROS=True)
+        self.dc.medians
+        self.dc.datasets
+        self.dc.locations[0].median
+
+    def teardown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_restore(self):
+        save_snapshot(self.dc, self.dirname)
+        dc = load_snapshot(self.dirname)
+        assert_true(isinstance(dc, DataCollection))
+        assert_true('medians' in dc._cache)
+        pdtest.assert_frame_equal(dc.tidy, self.dc.tidy)
+        nptest.assert_array_equal(dc.medians.values, self.dc.medians.values)
+
+    def test_shared_locations(self):
+        save_snapshot(self.dc, self.dirname)
+        dc = load_snapshot(self.dirname)
+        assert_equal(len(dc.locations), len(self.dc.locations))
+        assert_true(dc.datasets[0].influent is dc.locations[0])
+        assert_equal(dc.locations[0].median, self.dc.locations[0].median)
+
+
+@raises(ValueError)
+def test_snapshot_bad_type():
+    save_snapshot('junk', tempfile.gettempdir())